@@ -1,13 +1,85 @@
 # Author: Toshio Kuratomi <tkuratom@redhat.com>
 # License: GPLv3+
 # Copyright: Ansible Project, 2020
-"""Augment data from plugin documenation with additional values."""
+"""
+Augment data from plugin documenation with additional values.
+
+Augmentations run on one plugin record at a time (see :func:`augment_plugin`) so that they can be
+applied in the worker processes right after a record is normalized.  New augmentations are added
+with :func:`register_record_augmentation` (for something computed from the whole record) or
+:func:`register_entry_augmentation` (for something computed from each option or return value).
+All of the augmentations share a single walk over each record.
+"""
 
 import typing as t
 
 
+#: Signature of an augmentation of a whole plugin record.  It is called with the plugin_type and
+#: the normalized plugin record and modifies the record in place.
+RecordAugmentationT = t.Callable[[str, t.MutableMapping[str, t.Any]], None]
+
+#: Signature of an augmentation of an option or return value.  It is called with the entry, the
+#: keys which lead to it from the toplevel of the options or return values, and the name of the
+#: key which nests entries (``suboptions`` or ``contains``).  It modifies the entry in place.
+EntryAugmentationT = t.Callable[[t.MutableMapping[str, t.Any], t.Tuple[str, ...], str], None]
+
+_RECORD_AUGMENTATIONS: t.List[RecordAugmentationT] = []
+_ENTRY_AUGMENTATIONS: t.List[EntryAugmentationT] = []
+
+
+def register_record_augmentation(augmentation: RecordAugmentationT) -> RecordAugmentationT:
+    """
+    Add an augmentation which is run on every plugin record.
+
+    This can be used as a decorator.
+
+    :arg augmentation: The augmentation.
+    :returns: The augmentation.
+    """
+    _RECORD_AUGMENTATIONS.append(augmentation)
+    return augmentation
+
+
+def register_entry_augmentation(augmentation: EntryAugmentationT) -> EntryAugmentationT:
+    """
+    Add an augmentation which is run on every option and return value of every plugin.
+
+    This can be used as a decorator.  The entries of a record are visited parents first.
+
+    :arg augmentation: The augmentation.
+    :returns: The augmentation.
+    """
+    _ENTRY_AUGMENTATIONS.append(augmentation)
+    return augmentation
+
+
+def _walk_entries(options_data: t.Mapping[str, t.Any], suboption_entry: str,
+                  augmentations: t.Sequence[EntryAugmentationT],
+                  prefix: t.Tuple[str, ...] = ()) -> None:
+    """Run the entry augmentations on all of the (nested) entries of options or return values."""
+    # Iterate instead of recursing.  Each entry's key is a tuple which is shared as the prefix of
+    # the keys of its children.
+    stack = [(options_data, prefix)]
+    while stack:
+        entries, parent_key = stack.pop()
+        for key, entry in entries.items():
+            full_key = parent_key + (key, )
+            for augmentation in augmentations:
+                augmentation(entry, full_key, suboption_entry)
+
+            suboptions = entry.get(suboption_entry)
+            if suboptions:
+                stack.append((suboptions, full_key))
+
+
+@register_entry_augmentation
+def _set_full_key(entry: t.MutableMapping[str, t.Any], full_key: t.Tuple[str, ...],
+                  suboption_entry: str) -> None:  # pylint:disable=unused-argument
+    entry['full_key'] = full_key
+
+
 def add_full_key(options_data: t.Mapping[str, t.Any], suboption_entry: str,
-                 _full_key: t.Optional[list] = None) -> None:
+                 prefix: t.Tuple[str, ...] = ()) -> None:
     """
     Add information on the strucfture of a dict value in options or returns.
 
@@ -15,29 +87,34 @@ def add_full_key(options_data: t.Mapping[str, t.Any], suboption_entry: str,
     a deeply nested structure, for instance.)  They describe each entry into the dict.  When
     constructing documentation which uses that, it can be useful to know the hierarchy leads to
     that entry (for instance, to make a target for an html href).  This function adds that
-    information to a ``full_key`` field on the suboptions' entry.
+    information as a tuple of keys to a ``full_key`` field on the suboptions' entry.
 
     :arg options_data: The documentation data which is going to be analyzed and updated.
     :arg suboption_entry: The name of the suboptions key in the data.  For options data, this is
         ``suboptions``.  For returndocs, it is ``contains``.
-    :kwarg _full_key: This is a recursive function.  After we pass the first level of nesting,
-        ``_full_key`` is set to record the names of the upper levels of the hierarchy.
+    :kwarg prefix: The keys of the upper levels of the hierarchy if options_data is nested.
 
     .. warn:: This function operates by side-effect.  The options_data dictionay is modified
         directly.
     """
-    if _full_key is None:
-        _full_key = []
+    _walk_entries(options_data, suboption_entry, (_set_full_key, ), prefix)
+
 
-    for (key, entry) in options_data.items():
-        # Make sure that "full key" is contained
-        full_key_k = _full_key + [key]
-        entry['full_key'] = full_key_k
+def augment_plugin(plugin_type: str, plugin_record: t.MutableMapping[str, t.Any]) -> None:
+    """
+    Run all of the registered augmentations on one plugin record.
 
-        # Process suboptions
-        suboptions = entry.get(suboption_entry)
-        if suboptions:
-            add_full_key(suboptions, suboption_entry=suboption_entry, _full_key=full_key_k)
+    :arg plugin_type: The type of the plugin.
+    :arg plugin_record: The normalized plugin record.
+
+    .. warn:: This function operates by side-effect.  The plugin_record is modified directly.
+    """
+    if _ENTRY_AUGMENTATIONS:
+        _walk_entries(plugin_record['return'], 'contains', _ENTRY_AUGMENTATIONS)
+        _walk_entries(plugin_record['doc']['options'], 'suboptions', _ENTRY_AUGMENTATIONS)
+
+    for augmentation in _RECORD_AUGMENTATIONS:
+        augmentation(plugin_type, plugin_record)
 
 
 def augment_docs(plugin_info: t.MutableMapping[str, t.MutableMapping[str, t.Any]]) -> None:
@@ -49,12 +126,14 @@ def augment_docs(plugin_info: t.MutableMapping[str, t.MutableMapping[str, t.Any]
 
     * ``full_key`` allows displaying nested suboptions and return dicts.
 
+    The docs build runs :func:`augment_plugin` in the worker processes instead.  This is for data
+    which has been normalized some other way.
+
     :arg plugin_info: The plugin_info that will be analyzed and augmented.
 
     .. warn:: This function operates by side-effect.  The plugin_info dictionay is modified
         directly.
     """
     for plugin_type, plugin_map in plugin_info.items():
-        for plugin_name, plugin_record in plugin_map.items():
-            add_full_key(plugin_record['return'], 'contains')
-            add_full_key(plugin_record['doc']['options'], 'suboptions')
+        for plugin_record in plugin_map.values():
+            augment_plugin(plugin_type, plugin_record)
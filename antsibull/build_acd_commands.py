@@ -16,13 +16,13 @@ import aiofiles
 import aiohttp
 import asyncio_pool
 import sh
-from jinja2 import Template
 from packaging.version import Version as PypiVer
 
 from .collections import install_separately, install_together
 from .constants import THREAD_MAX
 from .dependency_files import BuildFile, DepsFile
 from .galaxy import CollectionDownloader
+from .jinja2.environment import get_data_template
 
 
 #
@@ -79,7 +79,7 @@ def write_manifest(package_dir, debian=False):
 def write_setup(acd_version, ansible_base_version, collection_deps, package_dir):
     setup_filename = os.path.join(package_dir, 'setup.py')
 
-    setup_tmpl = Template(pkgutil.get_data('antsibull.data', 'acd-setup_py.j2').decode('utf-8'))
+    setup_tmpl = get_data_template('acd-setup_py.j2')
     setup_contents = setup_tmpl.render(version=acd_version,
                                        ansible_base_version=ansible_base_version,
                                        collection_deps=collection_deps)
@@ -100,20 +100,20 @@ def write_debian_directory(acd_version, package_dir):
     os.mkdir(debian_dir, mode=0o700)
     debian_files = ('changelog.j2', 'control', 'copyright', 'rules')
     for filename in debian_files:
-        # Don't use os.path.join here, the get_data docs say it should be
+        # Don't use os.path.join here, the get_data and template loader docs say it should be
         # slash-separated.
         src_pkgfile = 'debian/' + filename
-        data = pkgutil.get_data('antsibull.data', src_pkgfile).decode('utf-8')
-
         if filename.endswith('.j2'):
             filename = filename.replace('.j2', '')
             # If the file is a template, send it in vars it might need
             # and update 'data' to be the result.
-            tmpl = Template(data)
+            tmpl = get_data_template(src_pkgfile)
             data = tmpl.render(
                 version=acd_version,
                 date=datetime.utcnow().strftime("%a, %d %b %Y %T +0000"),
             )
+        else:
+            data = pkgutil.get_data('antsibull.data', src_pkgfile).decode('utf-8')
 
         with open(os.path.join(debian_dir, filename), 'w') as f:
             f.write(data)
@@ -133,8 +133,7 @@ def write_build_script(acd_version, ansible_base_version, package_dir):
     """Write a build-script that tells how to build this tarball."""
     build_ansible_filename = os.path.join(package_dir, 'build-ansible.sh')
 
-    build_ansible_tmpl = Template(pkgutil.get_data('antsibull.data',
-                                                   'build-ansible.sh.j2').decode('utf-8'))
+    build_ansible_tmpl = get_data_template('build-ansible.sh.j2')
     build_ansible_contents = build_ansible_tmpl.render(version=acd_version,
                                                        ansible_base_version=ansible_base_version)
 
@@ -186,8 +185,7 @@ def build_single_command(args):
 
 
 async def write_collection_readme(collection_name, package_dir):
-    readme_tmpl = Template(pkgutil.get_data('antsibull.data',
-                                            'collection-readme.j2').decode('utf-8'))
+    readme_tmpl = get_data_template('collection-readme.j2')
     readme_contents = readme_tmpl.render(collection_name=collection_name)
 
     readme_filename = os.path.join(package_dir, 'README.rst')
@@ -198,8 +196,7 @@ async def write_collection_readme(collection_name, package_dir):
 async def write_collection_setup(name, version, package_dir):
     setup_filename = os.path.join(package_dir, 'setup.py')
 
-    setup_tmpl = Template(pkgutil.get_data('antsibull.data',
-                                           'collection-setup_py.j2').decode('utf-8'))
+    setup_tmpl = get_data_template('collection-setup_py.j2')
     setup_contents = setup_tmpl.render(version=version, name=name)
 
     async with aiofiles.open(setup_filename, 'w') as f:
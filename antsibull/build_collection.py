@@ -9,9 +9,8 @@ import pkgutil
 import tempfile
 
 import sh
-from jinja2 import Template
-
 from .dependency_files import DepsFile
+from .jinja2.environment import get_data_template
 
 
 def build_collection_command(args):
@@ -31,8 +30,7 @@ def build_collection_command(args):
         # Template the galaxy.yml file
         dep_string = json.dumps(deps)
         dep_string.replace(', ', ',\n    ')
-        galaxy_yml = pkgutil.get_data('antsibull.data', 'galaxy_yml.j2').decode('utf-8')
-        galaxy_yml_tmpl = Template(galaxy_yml)
+        galaxy_yml_tmpl = get_data_template('galaxy_yml.j2')
         galaxy_yml_contents = galaxy_yml_tmpl.render(version=args.acd_version,
                                                      dependencies=dep_string)
 
@@ -8,13 +8,15 @@ import argparse
 import os.path
 import stat
 import sys
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Tuple
 
 # import twiggy
 
 # from ..config import load_config
-from ..constants import DOCUMENTABLE_PLUGINS
+from ..constants import DOCUMENTABLE_PLUGINS, PROCESS_MAX
+from ..docs_parsing.ansible_doc_workers import WORKER_MAX_REQUESTS
 from ..filesystem import UnableToCheck, writable_via_acls
+from ..shared_records import HAS_SHARED_MEMORY
 from .doc_commands import collection, current, devel, plugin, stable
 
 
@@ -30,6 +32,10 @@ ARGS_MAP: Dict[str, Callable] = {'devel': devel.generate_docs,
 #: The filename for the file which lists raw collection names
 DEFAULT_PIECES_FILE: str = 'acd.in'
 
+#: The ways that documentation can be extracted from the plugins
+EXTRACTION_BACKENDS: Tuple[str, ...] = ('ansible-doc', 'ansible-doc-fused', 'ansible-doc-workers',
+                                        'static')
+
 
 class InvalidArgumentError(Exception):
     """A problem parsing or validating a command line argument."""
@@ -70,6 +76,30 @@ def _normalize_common_options(args: argparse.Namespace) -> None:
         pass
 
 
+def _normalize_extraction_options(args: argparse.Namespace) -> None:
+    if args.command not in ('stable', 'current'):
+        return
+
+    if args.doc_workers < 1:
+        raise InvalidArgumentError('--doc-workers must be at least 1')
+
+    if args.doc_worker_max_requests < 1:
+        raise InvalidArgumentError('--doc-worker-max-requests must be at least 1')
+
+    if args.shared_memory and not HAS_SHARED_MEMORY:
+        raise InvalidArgumentError('--shared-memory needs Python 3.8 or later')
+
+    if args.doc_cache and args.extraction_backend == 'ansible-doc-fused':
+        # The doc cache stores the raw docs but the fused backend never hands them back
+        raise InvalidArgumentError('--doc-cache cannot be used with the ansible-doc-fused'
+                                   ' extraction backend')
+
+    if args.link_report and args.incremental:
+        # Incremental builds only render the changed plugins so the other link targets are not
+        # known
+        raise InvalidArgumentError('--link-report cannot be used with --incremental')
+
+
 def _normalize_devel_options(args: argparse.Namespace) -> None:
     if args.command != 'devel':
         return
@@ -137,6 +167,60 @@ def parse_args(program_name: str, args: List[str]) -> argparse.Namespace:
                               ' of downloading fresh versions provided that they meet the criteria'
                               ' (Latest version of the collections known to galaxy).')
 
+    extraction_parser = argparse.ArgumentParser(add_help=False)
+    extraction_parser.add_argument('--extraction-backend', default='ansible-doc',
+                                   choices=EXTRACTION_BACKENDS,
+                                   help='How to extract documentation from the plugins.'
+                                   ' ansible-doc runs ansible-doc for batches of plugins.'
+                                   ' ansible-doc-fused does the same but the processes which'
+                                   ' run ansible-doc also normalize its output so that the raw'
+                                   ' docs are not copied between processes.  It cannot be used'
+                                   ' with --doc-cache.'
+                                   ' ansible-doc-workers keeps helper processes with ansible'
+                                   ' loaded running and asks them for the docs of each plugin.'
+                                   ' static reads the docs from the plugin source files without'
+                                   ' running ansible and uses ansible-doc only for the plugins'
+                                   ' that it cannot handle.')
+    extraction_parser.add_argument('--doc-workers', type=int, default=PROCESS_MAX,
+                                   help='Number of helper processes to run with the'
+                                   ' ansible-doc-workers backend.')
+    extraction_parser.add_argument('--doc-worker-max-requests', type=int,
+                                   default=WORKER_MAX_REQUESTS,
+                                   help='Number of plugins a helper process documents before it'
+                                   ' is replaced by a fresh one.  This limits the memory that the'
+                                   ' helpers can use.')
+    extraction_parser.add_argument('--doc-cache', default=None, metavar='DIR',
+                                   help='Directory to cache the documentation extracted from'
+                                   ' plugins in.  Plugins whose files, doc fragments, and'
+                                   ' ansible-base version are unchanged since they were cached'
+                                   ' are not extracted again.')
+    extraction_parser.add_argument('--normalization-cache', default=None, metavar='DIR',
+                                   help='Directory to cache the normalized documentation of'
+                                   ' plugins in.  Plugins whose documentation is unchanged since'
+                                   ' it was cached are not normalized again.')
+    extraction_parser.add_argument('--shared-memory', action='store_true', default=False,
+                                   help='Hand the normalized documentation back from the worker'
+                                   ' processes through shared memory.  The records are kept in'
+                                   ' a compact serialized form until the pages are written.'
+                                   ' This lowers the memory used by the main process for large'
+                                   ' numbers of plugins.')
+    extraction_parser.add_argument('--no-compact', dest='compact', action='store_false',
+                                   default=True,
+                                   help='Keep the normalized documentation in plain dicts'
+                                   ' instead of compact records.  The compact records need much'
+                                   ' less memory for large numbers of plugins.  This makes no'
+                                   ' difference with --shared-memory which keeps the records'
+                                   ' serialized instead.')
+    extraction_parser.add_argument('--incremental', action='store_true', default=False,
+                                   help='Only rebuild the pages of plugins which changed since'
+                                   ' the last build into --dest-dir and remove the pages of'
+                                   ' plugins which no longer exist.  A manifest of the build is'
+                                   ' kept in --dest-dir for this.')
+    extraction_parser.add_argument('--link-report', default=None, metavar='FILE',
+                                   help='Write a report of the M(), L(), and R() links in the'
+                                   ' plugin docs which point to plugins, labels, or anchors'
+                                   ' that do not exist to FILE.')
+
     parser = argparse.ArgumentParser(prog=program_name,
                                      description='Script to manage generated documentation for'
                                      ' ansible')
@@ -151,7 +235,8 @@ def parse_args(program_name: str, args: List[str]) -> argparse.Namespace:
                               help='File containing a list of collections to include')
 
     stable_parser = subparsers.add_parser('stable',
-                                          parents=[common_parser, cache_parser],
+                                          parents=[common_parser, cache_parser,
+                                                   extraction_parser],
                                           description='Generate documentation for a current'
                                           ' version of ansible')
     stable_parser.add_argument('--deps-file', required=True,
@@ -159,7 +244,7 @@ def parse_args(program_name: str, args: List[str]) -> argparse.Namespace:
                                ' versions which were included in this version of Ansible')
 
     current_parser = subparsers.add_parser('current',
-                                           parents=[common_parser],
+                                           parents=[common_parser, extraction_parser],
                                            description='Generate documentation for the current'
                                            ' installed version of ansible and the current installed'
                                            ' collections')
@@ -193,6 +278,7 @@ def parse_args(program_name: str, args: List[str]) -> argparse.Namespace:
 
     # Validation and coercion
     _normalize_common_options(args)
+    _normalize_extraction_options(args)
     _normalize_devel_options(args)
     _normalize_stable_options(args)
     _normalize_current_options(args)
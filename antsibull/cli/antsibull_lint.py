@@ -23,6 +23,9 @@ except ImportError:
 from antsibull_changelog.lint import lint_changelog_yaml
 from antsibull_changelog.logger import setup_logger
 
+from ..compat import asyncio_run
+from ..lint_plugin_docs import find_ansible_base_dir, lint_collection_docs
+
 
 def run(args: List[str]) -> int:
     """
@@ -52,6 +55,24 @@ def run(args: List[str]) -> int:
                                     metavar='/path/to/changelog.yaml',
                                     help='path to changelogs/changelog.yaml')
 
+        plugin_docs = subparsers.add_parser('plugin-docs',
+                                            parents=[common],
+                                            help='Collection plugin documentation linter')
+        plugin_docs.set_defaults(func=command_lint_plugin_docs)
+
+        plugin_docs.add_argument('collection_root_path',
+                                 metavar='/path/to/collection',
+                                 help='path to the root of the collection')
+
+        plugin_docs.add_argument('--ansible-base-dir', default=None, metavar='DIR',
+                                 help='directory of the ansible python package whose'
+                                 ' documentation fragments the plugins can use.  Defaults to'
+                                 ' the one installed for this python')
+
+        plugin_docs.add_argument('--cache', default=None, metavar='DIR',
+                                 help='directory to cache the results in.  Plugins which are'
+                                 ' unchanged since they were validated are not validated again')
+
         if HAS_ARGCOMPLETE:
             argcomplete.autocomplete(parser)
 
@@ -93,6 +114,30 @@ def command_lint_changelog(args: Any) -> int:
     return 3 if messages else 0
 
 
+def command_lint_plugin_docs(args: Any) -> int:
+    """
+    Validate the documentation of the plugins in a collection.
+
+    :arg args: Parsed arguments
+    """
+    ansible_base_dir = args.ansible_base_dir or find_ansible_base_dir()
+    if ansible_base_dir is None:
+        print('ERROR: ansible-base is not installed.  Use --ansible-base-dir to say where it is.')
+        return 2
+
+    errors = asyncio_run(lint_collection_docs(args.collection_root_path, ansible_base_dir,
+                                              cache_dir=args.cache))
+
+    messages = sorted(set(
+        '%s:%d:%d: %s' % (error[0], error[1], error[2], error[3])
+        for error in errors))
+
+    for message in messages:
+        print(message)
+
+    return 3 if messages else 0
+
+
 def main() -> int:
     """
     Entrypoint called from the script.
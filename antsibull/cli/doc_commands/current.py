@@ -6,11 +6,12 @@
 import typing as t
 
 from ...compat import asyncio_run
-from ...docs_parsing.ansible_doc import get_ansible_plugin_info
 from ...logging import log
+from ...process_pool import warm_process_pool
 from ...venv import FakeVenvRunner
-from ...write_docs import output_indexes, output_all_plugin_rst
-from .stable import normalize_all_plugin_info, get_collection_contents
+from ...write_docs import output_indexes
+from .stable import (build_docs_incrementally, get_collection_contents,
+                     get_normalized_plugin_info, write_plugin_docs)
 
 if t.TYPE_CHECKING:
     import argparse
@@ -33,50 +34,18 @@ def generate_docs(args: 'argparse.Namespace') -> int:
     flog = mlog.fields(func='generate_docs')
     flog.debug('Begin processing docs')
 
-    venv = FakeVenvRunner()
+    # Start the worker processes while the plugins are found
+    warm_process_pool()
 
-    # Get the list of plugins
-    plugin_info = asyncio_run(get_ansible_plugin_info(venv, args.collection_dir))
-    flog.debug('Finished parsing info from plugins')
+    if args.incremental:
+        build_docs_incrementally(FakeVenvRunner, args.collection_dir, args)
+        return 0
 
-    """
-    # Turn these into some sort of decorator that will load choose to dump or load the values
-    # if a command line arg is specified.
-    with open('dump_raw_plugin_info.json', 'w') as f:
-        import json
-        json.dump(plugin_info, f)
-    flog.debug('Finished dumping raw plugin_info')
-    """
-
-    plugin_info, nonfatal_errors = asyncio_run(normalize_all_plugin_info(plugin_info))
-    flog.debug('Finished normalizing data')
-    # calculate_additional_info(plugin_info) (full_path)
-
-    """
-    with open('dump_normalized_plugin_info.json', 'w') as f:
-        json.dump(plugin_info, f)
-    flog.debug('Finished dumping normalized data')
-
-    with open('dump_errors.json', 'w') as f:
-        json.dump(nonfatal_errors, f)
-    flog.debug('Finished dump errors')
-
-    with open('dump_normalized_plugin_info.json', 'r') as f:
-        import json
-        plugin_info = json.load(f)
-    flog.debug('Finished loading normalized data')
-
-    with open('dump_errors.json', 'r') as f:
-        from collections import defaultdict
-        nonfatal_errors = json.load(f)
-        nonfatal_errors = defaultdict(lambda: defaultdict(list), nonfatal_errors)
-        for key, value in nonfatal_errors.items():
-            nonfatal_errors[key] = defaultdict(list, value)
-    flog.debug('Finished loading errors')
-    """
+    plugin_info, nonfatal_errors = get_normalized_plugin_info(FakeVenvRunner, args.collection_dir,
+                                                              args)
+    flog.debug('Finished parsing and normalizing info from plugins')
 
-    asyncio_run(output_all_plugin_rst(plugin_info, nonfatal_errors, args.dest_dir))
-    flog.debug('Finished writing plugin docs')
+    write_plugin_docs(args, plugin_info, nonfatal_errors)
 
     collection_info = get_collection_contents(plugin_info, nonfatal_errors)
     flog.debug('Finished writing collection data')
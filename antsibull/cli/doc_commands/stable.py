@@ -4,30 +4,43 @@
 """Entrypoint to the antsibull-docs script."""
 
 import asyncio
+import functools
 import os
 import os.path
+import tarfile
 import tempfile
 import typing as t
 from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor
 
 import aiohttp
 import asyncio_pool
 from pydantic import ValidationError
 
 from ...ansible_base import get_ansible_base
-from ...augment_docs import augment_docs
+from ...augment_docs import augment_plugin
 from ...collections import install_together
 from ...compat import asyncio_run, best_get_loop
-from ...constants import PROCESS_MAX, THREAD_MAX
+from ...constants import THREAD_MAX
 from ...dependency_files import DepsFile
-from ...docs_parsing.ansible_doc import get_ansible_plugin_info
+from ...docs_parsing.ansible_doc import ansible_doc_name, get_ansible_plugin_info
+from ...docs_parsing.ansible_doc_workers import get_ansible_plugin_info_from_workers
+from ...docs_parsing.discovery import get_ansible_base_dir
+from ...docs_manifest import DocsManifest
+from ...docs_parsing.doc_cache import find_plugins_with_keys, get_cached_plugin_info
 from ...docs_parsing.fqcn import get_fqcn_parts
+from ...docs_parsing.static import get_static_plugin_info
 from ...galaxy import CollectionDownloader
+from ...link_index import LinkChecker, build_link_index
 from ...logging import log
+from ...normalization_cache import (NormalizationCache, normalization_cache_key,
+                                    restore_filename, schema_fingerprint)
+from ...process_pool import get_process_pool, warm_process_pool
+from ...schemas.compact import compact_values
 from ...schemas.docs import DOCS_SCHEMAS
-from ...venv import VenvRunner
-from ...write_docs import output_all_plugin_rst, output_indexes
+from ...schemas.normalize import normalize
+from ...shared_records import LazyRecordMap, share_records
+from ...venv import FakeVenvRunner, VenvRunner
+from ...write_docs import get_template_hash, output_all_plugin_rst, output_indexes
 
 if t.TYPE_CHECKING:
     import argparse
@@ -39,6 +52,9 @@ mlog = log.fields(mod=__name__)
 #: Mapping of plugins to nonfatal errors.  This is the type to use when returning the mapping.
 PluginErrorsRT = t.DefaultDict[str, t.DefaultDict[str, t.List[str]]]
 
+#: Approximate amount of plugin data (in bytes) to send to a worker for normalization at once
+NORMALIZE_CHUNK_SIZE: int = 256 * 1024
+
 
 async def retrieve(ansible_base_version: str,
                    collections: t.Mapping[str, str],
@@ -83,6 +99,148 @@ async def retrieve(ansible_base_version: str,
     return dict(zip(requestors, responses))
 
 
+def create_venv(ansible_base_path: str, tmp_dir: str) -> VenvRunner:
+    """
+    Create a venv and install ansible-base into it.
+
+    :arg ansible_base_path: Tarball, checkout, or expanded sdist of ansible-base.
+    :arg tmp_dir: The directory to create the venv inside of.
+    :returns: A VenvRunner for the venv.
+    """
+    venv = VenvRunner('ansible-base-venv', tmp_dir)
+    if os.path.isdir(ansible_base_path):
+        venv.install_package(ansible_base_path, from_project_path=True)
+    else:
+        venv.install_package(ansible_base_path)
+    return venv
+
+
+def unpack_ansible_base(ansible_base_path: str, tmp_dir: str) -> str:
+    """
+    Find the ansible python package inside of an ansible-base tarball or checkout.
+
+    :arg ansible_base_path: Tarball, checkout, or expanded sdist of ansible-base.
+    :arg tmp_dir: The directory to unpack a tarball inside of.
+    :returns: The directory of the ``ansible`` python package.
+    """
+    if not os.path.isdir(ansible_base_path):
+        unpack_dir = os.path.join(tmp_dir, 'ansible-base-source')
+        with tarfile.open(ansible_base_path) as tarball:
+            toplevel = tarball.getnames()[0].split('/', 1)[0]
+            tarball.extractall(unpack_dir)
+        ansible_base_path = os.path.join(unpack_dir, toplevel)
+
+    return os.path.join(ansible_base_path, 'lib', 'ansible')
+
+
+async def get_static_plugin_info_with_fallback(
+        get_venv: t.Callable[[], t.Union[VenvRunner, FakeVenvRunner]],
+        collection_dir: str,
+        ansible_base_dir: t.Optional[str] = None,
+        plugin_files: t.Optional[t.Mapping[str, t.Mapping[str, str]]] = None
+        ) -> t.Dict[str, t.Dict[str, t.Any]]:
+    """
+    Extract the documentation by reading the plugins' source and use ansible-doc as a fallback.
+
+    :arg get_venv: Function which returns a VenvRunner into which Ansible has been installed.
+        This is only called if it is needed.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :kwarg ansible_base_dir: The directory of the ``ansible`` python package.  If this is not
+        given, the ansible package in the venv is used.
+    :kwarg plugin_files: If given, only document these plugins.  This is a mapping of plugin_type
+        to fqcn to the file with the plugin's docs.
+    :returns: Mapping of plugin_type to plugin_name to the information from ansible-doc --json.
+    """
+    flog = mlog.fields(func='get_static_plugin_info_with_fallback')
+
+    venv = None
+    if ansible_base_dir is None:
+        venv = get_venv()
+        ansible_base_dir = get_ansible_base_dir(venv)
+
+    plugin_info, unhandled = await get_static_plugin_info(ansible_base_dir, collection_dir,
+                                                          plugin_files=plugin_files)
+    if not unhandled:
+        return plugin_info
+
+    flog.fields(plugins=unhandled).debug('Falling back to ansible-doc')
+    if venv is None:
+        venv = get_venv()
+
+    plugin_names = {plugin_type: [ansible_doc_name(fqcn) for fqcn in plugins]
+                    for plugin_type, plugins in unhandled.items()}
+    fallback_info = await get_ansible_plugin_info(venv, collection_dir, plugin_names=plugin_names)
+    for plugin_type, plugins in fallback_info.items():
+        plugin_info[plugin_type].update(plugins)
+
+    return plugin_info
+
+
+async def extract_plugin_info(get_venv: t.Callable[[], t.Union[VenvRunner, FakeVenvRunner]],
+                              collection_dir: str, args: 'argparse.Namespace',
+                              ansible_base_dir: t.Optional[str] = None,
+                              plugin_files: t.Optional[t.Mapping[str, t.Mapping[str, str]]] = None
+                              ) -> t.Dict[str, t.Dict[str, t.Any]]:
+    """
+    Extract the documentation from the plugins with the backend selected on the command line.
+
+    :arg get_venv: Function which returns a VenvRunner into which Ansible has been installed.
+        The static backend only calls this if it needs to fall back to ansible-doc.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :arg args: The parsed comand line args.  These select the backend which extracts the docs.
+    :kwarg ansible_base_dir: The directory of the ``ansible`` python package.  This lets the
+        static backend work without installing ansible-base into a venv.
+    :kwarg plugin_files: If given, only document these plugins.  This is a mapping of plugin_type
+        to fqcn to the file with the plugin's docs.
+    :returns: Mapping of plugin_type to plugin_name to the information from ansible-doc --json.
+    """
+    if args.extraction_backend == 'static':
+        return await get_static_plugin_info_with_fallback(get_venv, collection_dir,
+                                                          ansible_base_dir,
+                                                          plugin_files=plugin_files)
+
+    plugin_names = None
+    if plugin_files is not None:
+        plugin_names = {plugin_type: [ansible_doc_name(fqcn) for fqcn in plugins]
+                        for plugin_type, plugins in plugin_files.items()}
+
+    venv = get_venv()
+    if args.extraction_backend == 'ansible-doc-workers':
+        return await get_ansible_plugin_info_from_workers(
+            venv, collection_dir, num_workers=args.doc_workers,
+            max_requests=args.doc_worker_max_requests, plugin_names=plugin_names)
+
+    return await get_ansible_plugin_info(venv, collection_dir, plugin_names=plugin_names)
+
+
+def get_plugin_info(get_venv: t.Callable[[], t.Union[VenvRunner, FakeVenvRunner]],
+                    collection_dir: str, args: 'argparse.Namespace',
+                    ansible_base_dir: t.Optional[str] = None) -> t.Dict[str, t.Dict[str, t.Any]]:
+    """
+    Extract the documentation from all of the plugins.
+
+    If ``--doc-cache`` was given, only the plugins which are not in the cache are extracted.
+
+    :arg get_venv: Function which returns a VenvRunner into which Ansible has been installed.
+        This is only called if ansible-doc needs to be run.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :arg args: The parsed comand line args.  These select the backend which extracts the docs.
+    :kwarg ansible_base_dir: The directory of the ``ansible`` python package.  This lets the
+        static backend and the cache work without installing ansible-base into a venv.
+    :returns: Mapping of plugin_type to plugin_name to the information from ansible-doc --json.
+    """
+    extract = functools.partial(extract_plugin_info, get_venv, collection_dir, args,
+                                ansible_base_dir)
+    if not args.doc_cache:
+        return asyncio_run(extract())
+
+    if ansible_base_dir is None:
+        ansible_base_dir = get_ansible_base_dir(get_venv())
+
+    plugin_files, keys = asyncio_run(find_plugins_with_keys(ansible_base_dir, collection_dir))
+    return asyncio_run(get_cached_plugin_info(args.doc_cache, plugin_files, keys, extract))
+
+
 def normalize_plugin_info(plugin_type: str,
                           plugin_info: t.Mapping[str, t.Any]
                           ) -> t.Tuple[t.Dict[str, t.Any], t.List[str]]:
@@ -98,12 +256,17 @@ def normalize_plugin_info(plugin_type: str,
         in :mod:`antsibull.schemas`.  The nonfatal errors are strings representing the problems
         encountered.
     """
+    if 'error' in plugin_info:
+        # The docs could not be extracted (for instance, because ansible-doc timed out)
+        raise ValueError(plugin_info['error'])
+
     new_info = {}
     errors = []
     # Note: loop through "doc" before any other keys.
     for field in ('doc', 'examples', 'return'):
+        schema = DOCS_SCHEMAS[plugin_type][field]
         try:
-            field_model = DOCS_SCHEMAS[plugin_type][field].parse_obj({field: plugin_info[field]})
+            field_data = normalize(schema, {field: plugin_info[field]})
         except ValidationError as e:
             if field == 'doc':
                 # We can't recover if there's not a doc field
@@ -117,14 +280,187 @@ def normalize_plugin_info(plugin_type: str,
             errors.append(f'Unable to normalize {new_info["doc"]["name"]}: {field}'
                           f' due to: {str(e)}')
 
-            field_model = DOCS_SCHEMAS[plugin_type][field].parse_obj({})
+            field_data = normalize(schema, {})
 
-        new_info.update(field_model.dict(by_alias=True))
+        new_info.update(field_data)
 
     return (new_info, errors)
 
 
-async def normalize_all_plugin_info(plugin_info: t.Mapping[str, t.Mapping[str, t.Any]]
+def _normalize_with_cache(plugin_type: str, plugin_record: t.Mapping[str, t.Any],
+                          cache: t.Optional[NormalizationCache], fingerprint: str
+                          ) -> t.Union[t.Tuple[t.Dict[str, t.Any], t.List[str]], Exception]:
+    """
+    Normalize the docs of one plugin, using the normalization cache if one is given.
+
+    :returns: The result of :func:`normalize_plugin_info` or an exception if the plugin cannot be
+        normalized.
+    """
+    key = None
+    if cache is not None:
+        key = normalization_cache_key(plugin_type, plugin_record, fingerprint)
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            new_info, errors = cached
+            if new_info is None:
+                return ValueError(errors[0])
+            restore_filename(new_info, plugin_record)
+            return new_info, errors
+
+    try:
+        new_info, errors = normalize_plugin_info(plugin_type, plugin_record)
+    except Exception as e:  # pylint:disable=broad-except
+        # Not all exceptions can be pickled so send back one which can be
+        if key:
+            cache.set(key, None, [str(e)])
+        return ValueError(str(e))
+
+    if key:
+        cache.set(key, new_info, errors)
+    return new_info, errors
+
+
+def _share_normalized(results: t.List[t.Union[t.Tuple[t.Any, t.List[str]], Exception]]
+                      ) -> None:
+    """
+    Move the normalized records into shared memory.
+
+    :arg results: The results of normalizing plugins.  The records are replaced by
+        :class:`antsibull.shared_records.SharedRecord` references in place.
+    """
+    normalized = [index for index, result in enumerate(results)
+                  if not isinstance(result, Exception)]
+    shared = share_records([results[index][0] for index in normalized])
+    for index, record in zip(normalized, shared):
+        results[index] = (record, results[index][1])
+
+
+def _compact_normalized(plugin_types: t.Sequence[str],
+                        results: t.List[t.Union[t.Tuple[t.Any, t.List[str]], Exception]]) -> None:
+    """
+    Turn the normalized records into their compact representation.
+
+    :arg plugin_types: The plugin_type of each result.
+    :arg results: The results of normalizing plugins.  The records are replaced in place.  See
+        :mod:`antsibull.schemas.compact`.
+    """
+    for index, result in enumerate(results):
+        if not isinstance(result, Exception):
+            new_info, errors = result
+            results[index] = (compact_values(DOCS_SCHEMAS[plugin_types[index]]['top'], new_info),
+                              errors)
+
+
+def _normalize_plugin_batch(plugins: t.Sequence[t.Tuple[str, t.Mapping[str, t.Any]]],
+                            cache_dir: t.Optional[str] = None, fingerprint: str = '',
+                            shared_memory: bool = False, compact: bool = False
+                            ) -> t.List[t.Union[t.Tuple[t.Dict[str, t.Any], t.List[str]],
+                                                Exception]]:
+    """
+    Normalize and validate the docs of several plugins.
+
+    :arg plugins: Sequence of (plugin_type, plugin_info) tuples.
+    :kwarg cache_dir: If given, the directory of a
+        :class:`antsibull.normalization_cache.NormalizationCache` to look up and store the results
+        in.
+    :kwarg fingerprint: The fingerprint of the schemas.  See
+        :func:`antsibull.normalization_cache.schema_fingerprint`.
+    :kwarg shared_memory: If True, the normalized records are returned as
+        :class:`antsibull.shared_records.SharedRecord` references.
+    :kwarg compact: If True, the normalized records are returned in the compact representation
+        of :mod:`antsibull.schemas.compact`.  This is ignored if ``shared_memory`` is True.
+    :returns: A list with the result of :func:`normalize_plugin_info` for each of the plugins.  The
+        records have been augmented by :func:`antsibull.augment_docs.augment_plugin`.  If a plugin
+        cannot be normalized, its entry is an exception instead.
+    """
+    cache = NormalizationCache(cache_dir) if cache_dir else None
+    results = [_normalize_with_cache(plugin_type, plugin_record, cache, fingerprint)
+               for plugin_type, plugin_record in plugins]
+    plugin_types = [plugin_type for plugin_type, dummy_ in plugins]
+    if compact and not shared_memory:
+        _compact_normalized(plugin_types, results)
+
+    # Augment here rather than in the parent process so that the work is spread over the workers.
+    # The cache holds the records from before this step.
+    for plugin_type, result in zip(plugin_types, results):
+        if not isinstance(result, Exception):
+            augment_plugin(plugin_type, result[0])
+
+    if shared_memory:
+        _share_normalized(results)
+    return results
+
+
+def _uses_compact_records(shared_memory: bool, compact: bool) -> bool:
+    """
+    Return whether the normalized records are turned into compact records.
+
+    Records in shared memory stay serialized until they are looked up so they are never made
+    compact.  This is logged so that asking for both is not silently ignored.
+    """
+    if shared_memory and compact:
+        mlog.fields(func='_uses_compact_records').debug(
+            'The records are kept serialized in shared memory instead of in compact records')
+        return False
+    return compact
+
+
+def _record_size(record: t.Any) -> int:
+    """
+    Estimate how much data a plugin record contains without serializing it.
+
+    :arg record: The plugin record.
+    :returns: The approximate size of the record in bytes.
+    """
+    size = 0
+    stack = [record]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, str):
+            size += len(obj)
+        elif isinstance(obj, t.Mapping):
+            size += 8 * len(obj)
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            size += 8 * len(obj)
+            stack.extend(obj)
+        else:
+            size += 8
+    return size
+
+
+def _chunk_plugin_records(plugin_info: t.Mapping[str, t.Mapping[str, t.Any]],
+                          chunk_size: int) -> t.List[t.List[t.Tuple[str, str, t.Any]]]:
+    """
+    Split the plugin records into chunks which contain about the same amount of data.
+
+    :arg plugin_info: Mapping of plugin_type to plugin name to plugin record.
+    :arg chunk_size: Approximate number of bytes of plugin data in each chunk.  A record which is
+        larger than this gets a chunk of its own.
+    :returns: List of chunks.  Each chunk is a list of (plugin_type, plugin_name, plugin_record).
+    """
+    chunks: t.List[t.List[t.Tuple[str, str, t.Any]]] = []
+    chunk: t.List[t.Tuple[str, str, t.Any]] = []
+    current_size = 0
+    for plugin_type, plugin_list_for_type in plugin_info.items():
+        for plugin_name, plugin_record in plugin_list_for_type.items():
+            record_size = _record_size(plugin_record)
+            if chunk and current_size + record_size > chunk_size:
+                chunks.append(chunk)
+                chunk = []
+                current_size = 0
+            chunk.append((plugin_type, plugin_name, plugin_record))
+            current_size += record_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+async def normalize_all_plugin_info(plugin_info: t.Mapping[str, t.Mapping[str, t.Any]],
+                                    chunk_size: int = NORMALIZE_CHUNK_SIZE,
+                                    cache_dir: t.Optional[str] = None,
+                                    shared_memory: bool = False, compact: bool = False
                                     ) -> t.Tuple[t.Dict[str, t.Dict[str, t.Any]], PluginErrorsRT]:
     """
     Normalize the data in plugin_info so that it is ready to be passed to the templates.
@@ -132,8 +468,21 @@ async def normalize_all_plugin_info(plugin_info: t.Mapping[str, t.Mapping[str, t
     :arg plugin_info: Mapping of information about plugins.  This contains information about all of
         the plugins that are to be documented. See the schema in :mod:`antsibull.schemas` for the
         structure of the information.
+    :kwarg chunk_size: Approximate number of bytes of plugin data to send to a worker process at
+        once.  Sending many small plugins together saves the overhead of a task per plugin.
+    :kwarg cache_dir: If given, plugins whose docs were normalized by an earlier run (with the
+        same schemas) are taken from the normalization cache in this directory and new results
+        are added to it.
+    :kwarg shared_memory: If True, the workers hand the normalized records back through shared
+        memory.  The returned plugin_info then maps each plugin_type to a
+        :class:`antsibull.shared_records.LazyRecordMap` which deserializes a record each time it
+        is looked up.  Check :data:`antsibull.shared_records.HAS_SHARED_MEMORY` first.
+    :kwarg compact: If True, the workers turn the records into the compact representation of
+        :mod:`antsibull.schemas.compact` which behaves like the normalized dicts but needs much
+        less memory.  This is ignored (and logged) if ``shared_memory`` is True.
     :returns: A tuple of plugin_info (this is a "copy" of the input plugin_info with all of the
-        data normalized) and a mapping of errors.  The plugin_info may have less records than the
+        data normalized and augmented by :func:`antsibull.augment_docs.augment_plugin`) and a
+        mapping of errors.  The plugin_info may have less records than the
         input plugin_info if there were plugin records which failed to validate.  The mapping of
         errors takes the form of:
 
@@ -145,34 +494,147 @@ async def normalize_all_plugin_info(plugin_info: t.Mapping[str, t.Mapping[str, t
                     - error string
     """
     loop = best_get_loop()
-    executor = ProcessPoolExecutor(max_workers=PROCESS_MAX)
+    chunks = _chunk_plugin_records(plugin_info, chunk_size)
+    compact = _uses_compact_records(shared_memory, compact)
+
+    # Normalize the plugins in subprocesses since normalization is CPU bound
+    fingerprint = schema_fingerprint() if cache_dir else ''
+
+    executor = get_process_pool()
+    normalizers = [loop.run_in_executor(
+        executor, _normalize_plugin_batch,
+        [(plugin_type, plugin_record) for plugin_type, dummy_, plugin_record in chunk],
+        cache_dir, fingerprint, shared_memory, compact)
+        for chunk in chunks]
+    chunk_results = await asyncio.gather(*normalizers, return_exceptions=True)
+    if cache_dir:
+        NormalizationCache(cache_dir).prune()
+
+    new_plugin_info = defaultdict(LazyRecordMap if shared_memory else dict)
+    nonfatal_errors = defaultdict(lambda: defaultdict(list))
+    for chunk, results in zip(chunks, chunk_results):
+        if isinstance(results, Exception):
+            # The worker itself failed so every plugin in the chunk gets the error
+            results = [results] * len(chunk)
+
+        for (plugin_type, plugin_name, dummy_), plugin_record in zip(chunk, results):
+            # Errors which broke doc parsing (and therefore we won't have enough info to
+            # build a docs page)
+            if isinstance(plugin_record, Exception):
+                # An exception means there is no usable documentation for this plugin
+                # Record a nonfatal error and then move on
+                nonfatal_errors[plugin_type][plugin_name].append(str(plugin_record))
+                continue
+
+            # Errors where we have at least docs.  We can still create a docs page for these with
+            # some information left out
+            if plugin_record[1]:
+                nonfatal_errors[plugin_type][plugin_name].extend(plugin_record[1])
+
+            new_plugin_info[plugin_type][plugin_name] = plugin_record[0]
 
-    # Normalize each plugin in a subprocess since normalization is CPU bound
-    normalizers = {}
-    for plugin_type, plugin_list_for_type in plugin_info.items():
-        for plugin_name, plugin_record in plugin_list_for_type.items():
-            normalizers[(plugin_type, plugin_name)] = loop.run_in_executor(
-                executor, normalize_plugin_info, plugin_type, plugin_record)
+    return new_plugin_info, nonfatal_errors
 
-    results = await asyncio.gather(*normalizers.values(), return_exceptions=True)
 
-    new_plugin_info = defaultdict(dict)
-    nonfatal_errors = defaultdict(lambda: defaultdict(list))
-    for (plugin_type, plugin_name), plugin_record in zip(normalizers, results):
-        # Errors which broke doc parsing (and therefore we won't have enough info to
-        # build a docs page)
-        if isinstance(plugin_record, Exception):
-            # An exception means there is no usable documentation for this plugin
-            # Record a nonfatal error and then move on
-            nonfatal_errors[plugin_type][plugin_name].append(str(plugin_record))
+def _normalize_documented_plugins(plugin_type: str, plugin_docs: t.Mapping[str, t.Any],
+                                  cache_dir: t.Optional[str] = None, fingerprint: str = '',
+                                  shared_memory: bool = False, compact: bool = False
+                                  ) -> t.Dict[str, t.Dict[str, t.Any]]:
+    """
+    Normalize and augment the docs that one ansible-doc invocation returned.
+
+    This is the postprocessing step of :func:`extract_normalized_plugin_info`.  It runs in the
+    worker process which ran ansible-doc.
+
+    :arg plugin_type: The type of the plugins.
+    :arg plugin_docs: Mapping of plugin name to the information from ansible-doc --json.
+    :kwarg cache_dir: If given, the directory of the normalization cache.
+    :kwarg fingerprint: The fingerprint of the schemas.
+    :kwarg shared_memory: If True, the records are returned as
+        :class:`antsibull.shared_records.SharedRecord` references.
+    :kwarg compact: If True, the records are returned in their compact representation.
+    :returns: Mapping of plugin name to a dict with the ``normalized`` record (None if the docs
+        could not be normalized) and the nonfatal ``errors``.
+    """
+    results = _normalize_plugin_batch([(plugin_type, plugin_record)
+                                       for plugin_record in plugin_docs.values()],
+                                      cache_dir=cache_dir, fingerprint=fingerprint,
+                                      shared_memory=shared_memory, compact=compact)
+    processed = {}
+    for plugin_name, result in zip(plugin_docs, results):
+        if isinstance(result, Exception):
+            processed[plugin_name] = {'normalized': None, 'errors': [str(result)]}
             continue
 
-        # Errors where we have at least docs.  We can still create a docs page for these with some
-        # information left out
-        if plugin_record[1]:
-            nonfatal_errors[plugin_type][plugin_name].extend(plugin_record[1])
+        new_info, errors = result
+        processed[plugin_name] = {'normalized': new_info, 'errors': errors}
+    return processed
+
+
+def uses_fused_extraction(args: 'argparse.Namespace') -> bool:
+    """
+    Return whether the docs are normalized by the same processes that extract them.
+
+    The doc cache stores the raw docs so it cannot be used together with the fused workers.
+    :func:`antsibull.cli.antsibull_docs.parse_args` rejects ``--doc-cache`` with the
+    ansible-doc-fused backend.
+
+    :arg args: The parsed comand line args.
+    """
+    return args.extraction_backend == 'ansible-doc-fused'
 
-        new_plugin_info[plugin_type][plugin_name] = plugin_record[0]
+
+async def extract_normalized_plugin_info(
+        venv: t.Union[VenvRunner, FakeVenvRunner], collection_dir: str,
+        plugin_files: t.Optional[t.Mapping[str, t.Mapping[str, str]]] = None,
+        cache_dir: t.Optional[str] = None, shared_memory: bool = False, compact: bool = False
+        ) -> t.Tuple[t.Dict[str, t.Dict[str, t.Any]], PluginErrorsRT]:
+    """
+    Extract, normalize, and augment the docs of the plugins in a single pass.
+
+    Each worker process runs ansible-doc for a batch of plugins, normalizes and augments the
+    output, and only sends the normalized records back.  This saves copying the raw docs to
+    another worker for normalization and lets normalization overlap with extraction.
+
+    :arg venv: A VenvRunner into which Ansible has been installed.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :kwarg plugin_files: If given, only document these plugins.  This is a mapping of plugin_type
+        to fqcn to the file with the plugin's docs.
+    :kwarg cache_dir: If given, the directory of the normalization cache.
+    :kwarg shared_memory: If True, the records are handed back through shared memory.  See
+        :func:`normalize_all_plugin_info`.
+    :kwarg compact: If True, the records are returned in their compact representation.  See
+        :func:`normalize_all_plugin_info`.
+    :returns: The same as :func:`normalize_all_plugin_info`.
+    """
+    plugin_names = None
+    if plugin_files is not None:
+        plugin_names = {plugin_type: [ansible_doc_name(fqcn) for fqcn in plugins]
+                        for plugin_type, plugins in plugin_files.items()}
+
+    fingerprint = schema_fingerprint() if cache_dir else ''
+    compact = _uses_compact_records(shared_memory, compact)
+    postprocess = functools.partial(_normalize_documented_plugins, cache_dir=cache_dir,
+                                    fingerprint=fingerprint, shared_memory=shared_memory,
+                                    compact=compact)
+    results = await get_ansible_plugin_info(venv, collection_dir, plugin_names=plugin_names,
+                                            postprocess=postprocess)
+    if cache_dir:
+        NormalizationCache(cache_dir).prune()
+
+    new_plugin_info = defaultdict(LazyRecordMap if shared_memory else dict)
+    nonfatal_errors = defaultdict(lambda: defaultdict(list))
+    for plugin_type, plugin_results in results.items():
+        for plugin_name, result in plugin_results.items():
+            if 'error' in result:
+                # ansible-doc timed out while documenting the plugin
+                nonfatal_errors[plugin_type][plugin_name].append(result['error'])
+                continue
+
+            if result['errors']:
+                nonfatal_errors[plugin_type][plugin_name].extend(result['errors'])
+            if result['normalized'] is not None:
+                new_plugin_info[plugin_type][plugin_name] = result['normalized']
 
     return new_plugin_info, nonfatal_errors
 
@@ -210,6 +672,193 @@ def get_collection_contents(plugin_info: t.Mapping[str, t.Mapping[str, t.Any]],
     return collection_plugins
 
 
+def _update_manifest(old_manifest: DocsManifest,
+                     plugin_files: t.Mapping[str, t.Mapping[str, str]],
+                     changed_files: t.Mapping[str, t.Mapping[str, str]],
+                     input_hashes: t.Mapping[str, t.Mapping[str, t.Optional[str]]],
+                     template_hash: str,
+                     plugin_info: t.Mapping[str, t.Mapping[str, t.Any]],
+                     written: t.Mapping[str, t.Mapping[str, t.Tuple[str, str]]]) -> DocsManifest:
+    """
+    Create the manifest for the plugin pages after an incremental build.
+
+    Plugins which were not rebuilt keep their old records.  Plugins which were rebuilt but did not
+    produce a page and plugins which no longer exist are left out.
+    """
+    manifest = DocsManifest(old_manifest.dest_dir)
+    for plugin_type, plugin_map in plugin_files.items():
+        new_records = manifest.plugins[plugin_type] = {}
+        for plugin_name in plugin_map:
+            if plugin_name not in changed_files.get(plugin_type, {}):
+                new_records[plugin_name] = old_manifest.plugins[plugin_type][plugin_name]
+                continue
+
+            if plugin_name not in written.get(plugin_type, {}):
+                continue
+
+            output_file, output_hash = written[plugin_type][plugin_name]
+            new_records[plugin_name] = {
+                'input': input_hashes[plugin_type][plugin_name],
+                'template': template_hash,
+                'output': output_hash,
+                'file': os.path.relpath(output_file, manifest.dest_dir),
+                'short_description': plugin_info[plugin_type][plugin_name]['doc'][
+                    'short_description'],
+            }
+
+    return manifest
+
+
+def _extract_and_normalize_changed(get_venv: t.Callable[[], t.Union[VenvRunner, FakeVenvRunner]],
+                                   collection_dir: str, args: 'argparse.Namespace',
+                                   ansible_base_dir: str,
+                                   changed_files: t.Mapping[str, t.Mapping[str, str]],
+                                   input_hashes: t.Mapping[str, t.Mapping[str, t.Optional[str]]]
+                                   ) -> t.Tuple[t.Dict[str, t.Dict[str, t.Any]], PluginErrorsRT]:
+    """Extract the docs of the changed plugins and then normalize and augment them."""
+    extract = functools.partial(extract_plugin_info, get_venv, collection_dir, args,
+                                ansible_base_dir)
+    plugin_info: t.Dict[str, t.Dict[str, t.Any]] = {}
+    if args.doc_cache:
+        plugin_info = asyncio_run(get_cached_plugin_info(args.doc_cache, changed_files,
+                                                         input_hashes, extract))
+    elif changed_files:
+        plugin_info = asyncio_run(extract(changed_files))
+
+    plugin_info, nonfatal_errors = asyncio_run(normalize_all_plugin_info(
+        plugin_info, cache_dir=args.normalization_cache, shared_memory=args.shared_memory,
+        compact=args.compact))
+    return plugin_info, nonfatal_errors
+
+
+def build_docs_incrementally(get_venv: t.Callable[[], t.Union[VenvRunner, FakeVenvRunner]],
+                             collection_dir: str, args: 'argparse.Namespace',
+                             ansible_base_dir: t.Optional[str] = None) -> None:
+    """
+    Only rebuild the plugin pages in ``args.dest_dir`` whose inputs have changed.
+
+    The manifest in ``args.dest_dir`` records the inputs that each page was built from.  Plugins
+    whose files, doc fragments, ansible-base version, and templates are unchanged since the last
+    build are not extracted, normalized, or rendered again.  Pages of plugins which no longer
+    exist are removed.  The plugins to document are found by looking at the plugin directories of
+    ansible-base and the collections.
+
+    :arg get_venv: Function which returns a VenvRunner into which Ansible has been installed.
+        This is only called if ansible-doc needs to be run.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :arg args: The parsed comand line args.
+    :kwarg ansible_base_dir: The directory of the ``ansible`` python package.  If this is not
+        given, the ansible package in the venv is used.
+    """
+    flog = mlog.fields(func='build_docs_incrementally')
+
+    if ansible_base_dir is None:
+        ansible_base_dir = get_ansible_base_dir(get_venv())
+
+    old_manifest = DocsManifest.load(args.dest_dir)
+    template_hash = get_template_hash()
+    plugin_files, input_hashes = asyncio_run(find_plugins_with_keys(ansible_base_dir,
+                                                                    collection_dir))
+    changed_files = old_manifest.changed_plugins(plugin_files, input_hashes, template_hash)
+    flog.fields(changed=sum(len(p) for p in changed_files.values())).debug(
+        'Finished finding changed plugins')
+
+    if changed_files and uses_fused_extraction(args):
+        plugin_info, nonfatal_errors = asyncio_run(extract_normalized_plugin_info(
+            get_venv(), collection_dir, plugin_files=changed_files,
+            cache_dir=args.normalization_cache, shared_memory=args.shared_memory,
+            compact=args.compact))
+    else:
+        plugin_info, nonfatal_errors = _extract_and_normalize_changed(
+            get_venv, collection_dir, args, ansible_base_dir, changed_files, input_hashes)
+    flog.debug('Finished parsing info from plugins')
+    written = asyncio_run(output_all_plugin_rst(plugin_info, nonfatal_errors, args.dest_dir))
+    flog.debug('Finished writing plugin docs')
+
+    manifest = _update_manifest(old_manifest, plugin_files, changed_files, input_hashes,
+                                template_hash, plugin_info, written)
+
+    # The indexes list every plugin so they are always rewritten
+    all_plugins = {plugin_type: {plugin_name: {'doc': {
+                                     'short_description': record['short_description']}}
+                                 for plugin_name, record in records.items()}
+                   for plugin_type, records in manifest.plugins.items()}
+    collection_info = get_collection_contents(all_plugins, nonfatal_errors)
+    index_files = asyncio_run(output_indexes(collection_info, args.dest_dir))
+    manifest.index_files = [os.path.relpath(index_file, args.dest_dir)
+                            for index_file in index_files]
+    flog.debug('Finished writing indexes')
+
+    removed = manifest.remove_stale_files(old_manifest)
+    manifest.save()
+    flog.fields(removed=len(removed)).debug('Finished updating the manifest')
+
+
+def get_normalized_plugin_info(get_venv: t.Callable[[], t.Union[VenvRunner, FakeVenvRunner]],
+                               collection_dir: str, args: 'argparse.Namespace',
+                               ansible_base_dir: t.Optional[str] = None
+                               ) -> t.Tuple[t.Dict[str, t.Dict[str, t.Any]], PluginErrorsRT]:
+    """
+    Extract the documentation from all of the plugins and then normalize and augment it.
+
+    With the ansible-doc-fused backend, both happen in the same worker processes.  See
+    :func:`extract_normalized_plugin_info`.
+
+    :arg get_venv: Function which returns a VenvRunner into which Ansible has been installed.
+        This is only called if ansible-doc needs to be run.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :arg args: The parsed comand line args.
+    :kwarg ansible_base_dir: The directory of the ``ansible`` python package.
+    :returns: The same as :func:`normalize_all_plugin_info`.
+    """
+    flog = mlog.fields(func='get_normalized_plugin_info')
+
+    if uses_fused_extraction(args):
+        plugin_info, nonfatal_errors = asyncio_run(extract_normalized_plugin_info(
+            get_venv(), collection_dir, cache_dir=args.normalization_cache,
+            shared_memory=args.shared_memory, compact=args.compact))
+        flog.debug('Finished parsing and normalizing info from plugins')
+        return plugin_info, nonfatal_errors
+
+    # Get the list of plugins
+    plugin_info = get_plugin_info(get_venv, collection_dir, args,
+                                  ansible_base_dir=ansible_base_dir)
+    flog.debug('Finished parsing info from plugins')
+
+    plugin_info, nonfatal_errors = asyncio_run(normalize_all_plugin_info(
+        plugin_info, cache_dir=args.normalization_cache, shared_memory=args.shared_memory,
+        compact=args.compact))
+    flog.debug('Finished normalizing data')
+    return plugin_info, nonfatal_errors
+
+
+def write_plugin_docs(args: 'argparse.Namespace',
+                      plugin_info: t.Mapping[str, t.Mapping[str, t.Any]],
+                      nonfatal_errors: PluginErrorsRT) -> None:
+    """
+    Write the plugin pages and report the links in them which do not resolve.
+
+    :arg args: The parsed comand line args.
+    :arg plugin_info: The normalized plugin_info.
+    :arg nonfatal_errors: Mapping of plugin type to plugin name to list of error messages.
+    """
+    flog = mlog.fields(func='write_plugin_docs')
+
+    link_checker = LinkChecker(build_link_index(plugin_info))
+    flog.debug('Finished indexing the link targets')
+
+    asyncio_run(output_all_plugin_rst(plugin_info, nonfatal_errors, args.dest_dir,
+                                      link_checker=link_checker))
+    flog.debug('Finished writing plugin docs')
+
+    if link_checker.count():
+        flog.fields(broken_links=link_checker.count()).warning(
+            'Some links in the plugin docs do not resolve')
+    if args.link_report:
+        with open(args.link_report, 'w') as f:
+            f.write(link_checker.report())
+
+
 def generate_docs(args: 'argparse.Namespace') -> int:
     """
     Create documentation for the stable subcommand.
@@ -230,6 +879,9 @@ def generate_docs(args: 'argparse.Namespace') -> int:
     dummy_, ansible_base_version, collections = deps_file.parse()
     flog.debug('Finished parsing deps file')
 
+    # Start the worker processes while the tarballs are downloaded
+    warm_process_pool()
+
     with tempfile.TemporaryDirectory() as tmp_dir:
         # Retrieve ansible-base and the collections
         collection_tarballs = asyncio_run(retrieve(ansible_base_version, collections, tmp_dir,
@@ -258,60 +910,24 @@ def generate_docs(args: 'argparse.Namespace') -> int:
         asyncio_run(install_together(collection_tarballs.values(), collection_install_dir))
         flog.debug('Finished installing collections')
 
-        # Create venv for ansible-base
-        venv = VenvRunner('ansible-base-venv', tmp_dir)
-        if os.path.isdir(ansible_base_path):
-            venv.install_package(ansible_base_path, from_project_path=True)
-        else:
-            venv.install_package(ansible_base_path)
-        flog.debug('Finished installing ansible-base')
-
-        # Get the list of plugins
-        plugin_info = asyncio_run(get_ansible_plugin_info(venv, collection_dir))
-        flog.debug('Finished parsing info from plugins')
-
-        """
-        # Turn these into some sort of decorator that will load choose to dump or load the values
-        # if a command line arg is specified.
-        with open('dump_raw_plugin_info.json', 'w') as f:
-            import json
-            json.dump(plugin_info, f)
-        flog.debug('Finished dumping raw plugin_info')
-
-        with open('dump_formatted_plugin_info.json', 'r') as f:
-            import json
-            plugin_info = json.load(f)
-        """
-
-        plugin_info, nonfatal_errors = asyncio_run(normalize_all_plugin_info(plugin_info))
-        flog.debug('Finished normalizing data')
-        augment_docs(plugin_info)
-
-        """
-        with open('dump_normalized_plugin_info.json', 'w') as f:
-            json.dump(plugin_info, f)
-        flog.debug('Finished dumping normalized data')
-
-        with open('dump_errors.json', 'w') as f:
-            json.dump(nonfatal_errors, f)
-        flog.debug('Finished dump errors')
-
-        with open('dump_normalized_plugin_info.json', 'r') as f:
-            import json
-            plugin_info = json.load(f)
-        flog.debug('Finished loading normalized data')
-
-        with open('dump_errors.json', 'r') as f:
-            from collections import defaultdict
-            nonfatal_errors = json.load(f)
-            nonfatal_errors = defaultdict(lambda: defaultdict(list), nonfatal_errors)
-            for key, value in nonfatal_errors.items():
-                nonfatal_errors[key] = defaultdict(list, value)
-        flog.debug('Finished loading errors')
-        """
-
-        asyncio_run(output_all_plugin_rst(plugin_info, nonfatal_errors, args.dest_dir))
-        flog.debug('Finished writing plugin docs')
+        # The static backend, the doc cache, and incremental builds read the ansible-base
+        # sources.  ansible-base only needs to be installed into a venv if ansible-doc has to be
+        # run.
+        ansible_base_dir = None
+        if args.extraction_backend == 'static' or args.doc_cache or args.incremental:
+            ansible_base_dir = unpack_ansible_base(ansible_base_path, tmp_dir)
+        get_venv = functools.lru_cache(maxsize=None)(
+            functools.partial(create_venv, ansible_base_path, tmp_dir))
+
+        if args.incremental:
+            build_docs_incrementally(get_venv, collection_dir, args,
+                                     ansible_base_dir=ansible_base_dir)
+            return 0
+
+        plugin_info, nonfatal_errors = get_normalized_plugin_info(
+            get_venv, collection_dir, args, ansible_base_dir=ansible_base_dir)
+
+        write_plugin_docs(args, plugin_info, nonfatal_errors)
 
         collection_info = get_collection_contents(plugin_info, nonfatal_errors)
         flog.debug('Finished writing collection data')
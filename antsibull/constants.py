@@ -4,6 +4,7 @@
 # Copyright: Ansible Project, 2020
 """Constant values for use throughout the antsibull codebase."""
 
+import os
 from typing import FrozenSet
 
 
@@ -21,8 +22,12 @@ DOCUMENTABLE_PLUGINS: FrozenSet[str] = frozenset(('become', 'cache', 'callback',
                                                   'netconf', 'shell', 'vars', 'module',
                                                   'strategy',))
 
+#: Number of CPUs that this process is allowed to run on
+CPU_COUNT: int = (len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity')
+                  else os.cpu_count() or 1)
+
 #: A good maximum number of concurrent threads to allow
 THREAD_MAX: int = 128
 
 #: A good maximum number of concurrent processes to allow
-PROCESS_MAX: int = 7
+PROCESS_MAX: int = CPU_COUNT
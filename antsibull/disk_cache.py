@@ -0,0 +1,115 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""A persistent, size limited, key-value cache stored in a directory."""
+
+import os
+import os.path
+import tempfile
+import typing as t
+
+
+#: Default maximum size of a cache directory in bytes
+DEFAULT_MAX_SIZE: int = 512 * 1024 * 1024
+
+
+class DiskCache:
+    """
+    Store blobs of data in a directory, keyed by a string.
+
+    Keys should be hex digests of the data that the value was computed from.  When the data in the
+    cache grows larger than ``max_size``, the least recently used entries are removed by
+    :meth:`prune`.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """
+        Create the cache.
+
+        :arg directory: Directory to store the cache in.  It will be created if it doesn't exist.
+        :kwarg max_size: The size in bytes that the cache is pruned to.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> t.Optional[bytes]:
+        """
+        Retrieve a value from the cache.
+
+        :arg key: The key to look up.
+        :returns: The value or None if the key is not in the cache.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Record that the entry was used so that it is not pruned soon
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return data
+
+    def set(self, key: str, value: bytes) -> None:
+        """
+        Store a value in the cache.
+
+        :arg key: The key to store the value under.
+        :arg value: The data to store.
+        """
+        path = self._path(key)
+        entry_dir = os.path.dirname(path)
+        os.makedirs(entry_dir, mode=0o700, exist_ok=True)
+
+        # Write to a temporary file and then rename it so that concurrent readers never see a
+        # partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _entries(self) -> t.Iterator[t.Tuple[float, int, str]]:
+        """Yield the modification time, size, and path of each entry in the cache."""
+        for entry_dir in os.scandir(self.directory):
+            if not entry_dir.is_dir():
+                continue
+            for entry in os.scandir(entry_dir.path):
+                if entry.name.startswith('.tmp'):
+                    continue
+                try:
+                    stat_results = entry.stat()
+                except FileNotFoundError:
+                    # Another process pruned the entry while we were scanning
+                    continue
+                yield stat_results.st_mtime, stat_results.st_size, entry.path
+
+    def prune(self) -> int:
+        """
+        Remove the least recently used entries until the cache is smaller than ``max_size``.
+
+        :returns: The number of entries which were removed.
+        """
+        entries = sorted(self._entries())
+        total_size = sum(size for dummy_, size, dummy2_ in entries)
+
+        removed = 0
+        for dummy_, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            removed += 1
+
+        return removed
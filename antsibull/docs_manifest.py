@@ -0,0 +1,181 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Record what was used to build each page of a docsite so that it can be rebuilt incrementally.
+
+The manifest is stored in the destination directory.  For each plugin it records the hash of the
+plugin's inputs (see :func:`antsibull.docs_parsing.doc_cache.plugin_cache_key`), the hash of the
+templates and the code which renders them, and the hash of the rst file which was written.  A page
+only needs to be rebuilt when one of those has changed.
+"""
+
+import hashlib
+import json
+import os
+import os.path
+import typing as t
+
+from .logging import log
+
+
+mlog = log.fields(mod=__name__)
+
+#: Name of the manifest file inside of the destination directory
+MANIFEST_FILENAME: str = '.antsibull-docs-manifest.json'
+
+#: Change this when the format of the manifest changes.  Older manifests are ignored.
+_MANIFEST_VERSION: int = 1
+
+
+def hash_output_file(filename: str) -> t.Optional[str]:
+    """
+    Return the sha256 hex digest of an output file or None if it does not exist.
+
+    :arg filename: The file to hash.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+class DocsManifest:
+    """The inputs and outputs of each plugin page written to a destination directory."""
+
+    def __init__(self, dest_dir: str,
+                 plugins: t.Optional[t.Dict[str, t.Dict[str, t.Dict[str, str]]]] = None,
+                 index_files: t.Optional[t.List[str]] = None) -> None:
+        """
+        Create the manifest.
+
+        :arg dest_dir: The directory that the documentation is written to.
+        :kwarg plugins: Mapping of plugin_type to fqcn to the record for that plugin's page.
+            The record has the keys ``input``, ``template``, ``output``, ``file`` (relative to
+            ``dest_dir``), and ``short_description``.
+        :kwarg index_files: Index pages which were written, relative to ``dest_dir``.
+        """
+        self.dest_dir = dest_dir
+        self.plugins = plugins or {}
+        self.index_files = index_files or []
+
+    @classmethod
+    def load(cls, dest_dir: str) -> 'DocsManifest':
+        """
+        Read the manifest of a destination directory.
+
+        :arg dest_dir: The directory that the documentation is written to.
+        :returns: The manifest.  It is empty if there was no usable manifest in ``dest_dir``.
+        """
+        try:
+            with open(os.path.join(dest_dir, MANIFEST_FILENAME), 'rb') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(dest_dir)
+
+        if not isinstance(data, dict) or data.get('version') != _MANIFEST_VERSION:
+            return cls(dest_dir)
+
+        return cls(dest_dir, plugins=data['plugins'], index_files=data['index_files'])
+
+    def save(self) -> None:
+        """Write the manifest to the destination directory."""
+        data = {'version': _MANIFEST_VERSION,
+                'plugins': self.plugins,
+                'index_files': self.index_files}
+        manifest_file = os.path.join(self.dest_dir, MANIFEST_FILENAME)
+        tmp_file = f'{manifest_file}.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, sort_keys=True)
+        os.replace(tmp_file, manifest_file)
+
+    def is_current(self, plugin_type: str, plugin_name: str, input_hash: t.Optional[str],
+                   template_hash: str) -> bool:
+        """
+        Check whether a plugin's page is up to date.
+
+        :arg plugin_type: The type of the plugin.
+        :arg plugin_name: FQCN for the plugin.
+        :arg input_hash: The hash of the plugin's inputs.  None means that the inputs could not be
+            hashed so the page is never up to date.
+        :arg template_hash: The hash of the templates and code used to render the page.  See
+            :func:`antsibull.write_docs.get_template_hash`.
+        :returns: True if the page was built from the same inputs and has not been modified since.
+        """
+        record = self.plugins.get(plugin_type, {}).get(plugin_name)
+        if record is None or input_hash is None:
+            return False
+
+        if record['input'] != input_hash or record['template'] != template_hash:
+            return False
+
+        return hash_output_file(os.path.join(self.dest_dir, record['file'])) == record['output']
+
+    def changed_plugins(self, plugin_files: t.Mapping[str, t.Mapping[str, str]],
+                        input_hashes: t.Mapping[str, t.Mapping[str, t.Optional[str]]],
+                        template_hash: str) -> t.Dict[str, t.Dict[str, str]]:
+        """
+        Find the plugins whose pages have to be rebuilt.
+
+        :arg plugin_files: Mapping of plugin_type to fqcn to the file with the plugin's docs.
+        :arg input_hashes: Mapping of plugin_type to fqcn to the hash of the plugin's inputs.
+        :arg template_hash: The hash of the templates and code used to render the pages.
+        :returns: The subset of ``plugin_files`` which is not up to date.
+        """
+        changed: t.Dict[str, t.Dict[str, str]] = {}
+        for plugin_type, plugin_map in plugin_files.items():
+            for plugin_name, filename in plugin_map.items():
+                if not self.is_current(plugin_type, plugin_name,
+                                       input_hashes[plugin_type][plugin_name], template_hash):
+                    changed.setdefault(plugin_type, {})[plugin_name] = filename
+        return changed
+
+    def files(self) -> t.Set[str]:
+        """Return all of the files recorded in the manifest, relative to the destination dir."""
+        files = set(self.index_files)
+        for plugin_map in self.plugins.values():
+            files.update(record['file'] for record in plugin_map.values())
+        return files
+
+    def remove_stale_files(self, old_manifest: 'DocsManifest') -> t.List[str]:
+        """
+        Remove the files which were written for an old manifest but are not part of this one.
+
+        Directories which become empty are removed as well.  Entries which point outside of the
+        destination dir (for instance ``../x`` or an absolute path in a tampered manifest) are
+        skipped.
+
+        :arg old_manifest: The manifest of the previous build.
+        :returns: The removed files, relative to the destination dir.
+        """
+        flog = mlog.fields(func='DocsManifest.remove_stale_files')
+
+        dest_root = os.path.realpath(self.dest_dir)
+        removed = []
+        for stale_file in sorted(old_manifest.files() - self.files()):
+            # Resolve the directory but not the file itself so that a symlink is removed rather
+            # than its target
+            path = os.path.normpath(os.path.join(dest_root, stale_file))
+            directory = os.path.realpath(os.path.dirname(path))
+            if os.path.commonpath([dest_root, directory]) != dest_root:
+                flog.fields(file=stale_file).warning('Not removing a file outside of dest_dir')
+                continue
+            path = os.path.join(directory, os.path.basename(path))
+
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            removed.append(stale_file)
+
+            while directory != dest_root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    # Not empty
+                    break
+                directory = os.path.dirname(directory)
+
+        return removed
@@ -4,24 +4,51 @@
 """Parse documentation from ansible plugins using anible-doc."""
 
 import asyncio
-import json
+import functools
 import os
 import sys
+import tempfile
 import traceback
-from concurrent.futures import ThreadPoolExecutor
-from typing import TYPE_CHECKING, Any, Dict, Union
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import (TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Sequence,
+                    Tuple, Union)
 
 import sh
 
 from ..compat import best_get_loop
-from ..constants import DOCUMENTABLE_PLUGINS, THREAD_MAX
-from ..vendored.json_utils import _filter_non_json_lines
+from ..constants import CPU_COUNT, DOCUMENTABLE_PLUGINS
+from ..logging import log
+from ..process_pool import get_process_pool
 from .fqcn import get_fqcn_parts
+from .json_output import parse_json_output
+from .discovery import discover_plugins, get_ansible_base_dir
 
 if TYPE_CHECKING:
     from ..venv import VenvRunner, FakeVenvRunner
 
 
+mlog = log.fields(mod=__name__)
+
+#: Maximum number of plugins to document with a single ansible-doc invocation.
+BATCH_MAX: int = 64
+
+#: Number of seconds after which an ansible-doc invocation which documents a single plugin is
+#: killed.
+PLUGIN_TIMEOUT: float = 180
+
+#: Number of seconds that an ansible-doc invocation is given for each further plugin in its batch.
+PLUGIN_TIMEOUT_PER_PLUGIN: float = 10
+
+#: Number of finished ansible-doc invocations needed before slow ones are hedged.
+_HEDGE_MIN_SAMPLES: int = 20
+
+#: Number of seconds between checks of whether a running job should be hedged.
+_HEDGE_POLL_INTERVAL: float = 1
+
+#: Cost given to hedged jobs so that they run before all other jobs.
+_HEDGE_PRIORITY: float = float('inf')
+
+
 #: Clear Ansible environment variables that set paths where plugins could be found.
 ANSIBLE_PATH_ENVVARS: Dict[str, str] = {'ANSIBLE_COLLECTIONS_PATHS': "/dev/null",
                                         'ANSIBLE_ACTION_PLUGINS': "/dev/null",
@@ -45,100 +72,583 @@ ANSIBLE_PATH_ENVVARS: Dict[str, str] = {'ANSIBLE_COLLECTIONS_PATHS': "/dev/null"
                                         }
 
 
+#: Function which turns the parsed output of ansible-doc for a batch of plugins of one type into
+#: the data to return for each of those plugins
+PostprocessT = Callable[[str, Dict[str, Any]], Dict[str, Mapping[str, Any]]]
+
+
 class ParsingError(Exception):
     """Error raised while parsing plugins for documentation."""
 
 
-async def _get_plugin_info(plugin_type: str, ansible_doc: 'sh.Command',
-                           max_workers: int = THREAD_MAX) -> Dict[str, Any]:
+class PluginTimeoutError(ParsingError):
+    """Error raised when ansible-doc takes too long to document a plugin."""
+
+
+def get_plugin_list(plugin_type: str, ansible_doc: 'sh.Command') -> List[str]:
     """
-    Retrieve info about all Ansible plugins of a particular type.
+    Retrieve the names of all Ansible plugins of a particular type.
 
     :arg plugin_type: The type of plugin.  See :attr:`DOCUMENTABLE_PLUGINS` for a list
         of allowed types.
     :arg ansible_doc: An :sh:obj:`sh.Command` object that will run the ansible-doc command.
         This command should already have been baked with any necessary environment and
         common arguments.
-        :returns: A nested dictionary structure that looks like::
-            Dictionary mapping to plugin information.  The dictionary looks like::
-
-                plugin_name:  # This is the canonical name for the plugin and includes
-                              # namespace.collection_name unless the plugin comes from
-                              # ansible-base.
-                    {information from ansible-doc --json.  See the ansible-doc documentation for
-                     more info.}
-    :kwarg max_workers: The maximum number of threads that should be run in parallel by this
-        function.
-    :returns: Mapping of fqcn's to plugin_info.
-    """
-    # Get the list of plugins
+    :returns: List of the plugin names as returned by ansible-doc.
+    """
     ansible_doc_list_cmd = ansible_doc('--list', '--t', plugin_type, '--json')
-    raw_plugin_list = ansible_doc_list_cmd.stdout.decode('utf-8', errors='surrogateescape')
     # Note: Keep ansible_doc_list_cmd around until we know if we need to use it in an error message.
-    plugin_map = json.loads(_filter_non_json_lines(raw_plugin_list)[0])
-    del raw_plugin_list
+    plugin_map = parse_json_output(ansible_doc_list_cmd.stdout)
     del ansible_doc_list_cmd
 
-    loop = best_get_loop()
+    return list(plugin_map.keys())
 
-    # For each plugin, get its documentation
-    extractors = {}
-    executor = ThreadPoolExecutor(max_workers=max_workers)
-    for plugin_name in plugin_map.keys():
-        extractors[plugin_name] = loop.run_in_executor(executor, ansible_doc, '-t', plugin_type,
-                                                       '--json', plugin_name)
-    plugin_info = await asyncio.gather(*extractors.values(), return_exceptions=True)
-
-    results = {}
-    for plugin_name, ansible_doc_results in zip(extractors, plugin_info):
-        err_msg = []
-
-        if isinstance(ansible_doc_results, Exception):
-            formatted_exception = traceback.format_exception(None, ansible_doc_results,
-                                                             ansible_doc_results.__traceback__)
-            err_msg.append(f'Exception while parsing documentation for {plugin_type} plugin:'
-                           f' {plugin_name}.  Will not document this plugin.')
-            err_msg.append(f'Exception:\n{"".join(formatted_exception)}')
-
-        # Note: Exception will also be True.
-        if isinstance(ansible_doc_results, sh.ErrorReturnCode):
-            stdout = ansible_doc_results.stdout.decode("utf-8", errors="surrogateescape")
-            stderr = ansible_doc_results.stderr.decode("utf-8", errors="surrogateescape")
-
-            err_msg.append(f'Full process stdout:\n{stdout}')
-            err_msg.append(f'Full process stderr:\n{stderr}')
-
-        if err_msg:
-            sys.stderr.write('\n'.join(err_msg))
-            continue
 
-        stdout = ansible_doc_results.stdout.decode("utf-8", errors="surrogateescape")
+def canonical_fqcn(plugin_name: str) -> str:
+    """
+    Return the fqcn for a plugin name returned by ansible-doc.
+
+    ansible-doc returns plugins shipped with ansible-base using no namespace and collection.
+    For now, we fix these entries to use the ansible.builtin collection here.  The reason we
+    do it here instead of as part of a general normalization step is that other plugins
+    (site-specific ones from ANSIBLE_LIBRARY, for instance) will also be returned with no
+    collection name.  We know that we don't have any of those in this code (because we set
+    ANSIBLE_LIBRARY and other plugin path variables to /dev/null) so we can safely fix this
+    here but not outside the ansible-doc backends.
+
+    :arg plugin_name: The name of the plugin as returned by ansible-doc.
+    :returns: The fqcn of the plugin.
+    """
+    try:
+        get_fqcn_parts(plugin_name)
+    except ValueError:
+        return f'ansible.builtin.{plugin_name}'
+    return plugin_name
+
+
+def ansible_doc_name(fqcn: str) -> str:
+    """
+    Return the name that ansible-doc knows a plugin by.
+
+    This is the inverse of :func:`canonical_fqcn`.
+
+    :arg fqcn: The fqcn of the plugin.
+    :returns: The name to pass to ansible-doc.  Plugins from ansible-base use their short name.
+    """
+    if fqcn.startswith('ansible.builtin.'):
+        return fqcn[len('ansible.builtin.'):]
+    return fqcn
+
+
+def ansible_doc_env(collection_dir: str) -> Dict[str, str]:
+    """
+    Create the environment to run ansible-doc in.
+
+    :arg collection_dir: Directory in which the collections have been installed.
+    :returns: A copy of the environment with only the collections in ``collection_dir`` as
+        providers of extra plugins.
+    """
+    env = os.environ.copy()
+    env.update(ANSIBLE_PATH_ENVVARS)
+    env['ANSIBLE_COLLECTIONS_PATHS'] = collection_dir
+    return env
+
+
+def _chunk_size(num_plugins: int, max_workers: int) -> int:
+    """
+    Choose how many plugins to document with one ansible-doc invocation.
+
+    The chunks should be big enough to amortize the startup cost of ansible-doc but small enough
+    that there are at least as many chunks as there are workers to run them.
+
+    :arg num_plugins: The number of plugins that need to be documented.
+    :arg max_workers: The number of ansible-doc processes that may run in parallel.
+    :returns: The number of plugins to put into each chunk.
+    """
+    size = -(-num_plugins // max(max_workers, 1))
+    return max(1, min(size, BATCH_MAX))
+
+
+def _format_plugin_error(plugin_type: str, plugin_name: str, error: Exception) -> str:
+    """
+    Format an error encountered while extracting the docs for a single plugin.
+
+    :arg plugin_type: The type of the plugin.
+    :arg plugin_name: The name of the plugin as given by ansible-doc.
+    :arg error: The exception which was raised while extracting the documentation.
+    :returns: A message to display to the user.
+    """
+    err_msg = []
+    formatted_exception = traceback.format_exception(None, error, error.__traceback__)
+    err_msg.append(f'Exception while parsing documentation for {plugin_type} plugin:'
+                   f' {plugin_name}.  Will not document this plugin.')
+    err_msg.append(f'Exception:\n{"".join(formatted_exception)}')
+
+    # Note: Exception will also be True.
+    if isinstance(error, sh.ErrorReturnCode):
+        stdout = error.stdout.decode("utf-8", errors="surrogateescape")
+        stderr = error.stderr.decode("utf-8", errors="surrogateescape")
+
+        err_msg.append(f'Full process stdout:\n{stdout}')
+        err_msg.append(f'Full process stderr:\n{stderr}')
+
+    return '\n'.join(err_msg)
+
+
+def _document_and_postprocess(ansible_doc: 'sh.Command', plugin_type: str,
+                              plugin_names: Sequence[str], plugin_timeout: float,
+                              postprocess: PostprocessT) -> Dict[str, Mapping[str, Any]]:
+    """
+    Run ansible-doc for a batch of plugins and postprocess its output in the same process.
+
+    This runs in a worker of the shared process pool.  Only the postprocessed data is sent back to
+    the main process instead of the full output of ansible-doc.
+
+    :arg ansible_doc: An :sh:obj:`sh.Command` object that will run the ansible-doc command.
+    :arg plugin_type: The type of the plugins.
+    :arg plugin_names: The names of the plugins as ansible-doc knows them.
+    :arg plugin_timeout: Number of seconds after which ansible-doc is killed.
+    :arg postprocess: Function to process the parsed output of ansible-doc with.
+    :returns: The data returned by ``postprocess``.
+    :raises PluginTimeoutError: if ansible-doc took too long.
+    """
+    try:
+        ansible_doc_results = ansible_doc('-t', plugin_type, '--json', *plugin_names,
+                                          _timeout=plugin_timeout)
+    except sh.TimeoutException:
+        # sh's TimeoutException cannot be pickled to send it back to the main process
+        raise PluginTimeoutError(f'ansible-doc did not finish documenting'
+                                 f' {", ".join(plugin_names)} within {plugin_timeout} seconds')
+    return postprocess(plugin_type, parse_json_output(ansible_doc_results.stdout))
+
+
+class AnsibleDocScheduler:
+    """
+    Run all of the ansible-doc invocations of a docs build from a single queue.
+
+    Plugins of all types are put into batches which are documented with one ansible-doc invocation
+    each.  The batches are run by a fixed number of workers in the order of their expected cost so
+    that the expensive batches start first and the cheap ones fill in the gaps at the end.
+
+    ansible-doc fails the whole invocation if any one of the plugins cannot be documented.  When
+    that happens, the batch is split in half and each half is put back into the queue until the
+    broken plugin has been isolated.
+
+    Some plugins make ansible-doc crawl or hang.  An invocation which documents a single plugin is
+    killed when it runs longer than ``plugin_timeout`` and batches get
+    :data:`PLUGIN_TIMEOUT_PER_PLUGIN` more for each further plugin.  A batch which timed out is
+    split in half like a batch which failed so that only the plugin which is actually slow times
+    out.  Once enough jobs have finished to know how long a plugin normally takes, a job which
+    runs longer than the 95th percentile of that for its number of plugins is hedged: its plugins
+    are queued again (in two halves if there is more than one), ahead of everything else, and
+    whichever run finishes first provides the documentation.  Jobs are only hedged once.
+
+    If a ``postprocess`` function is given, ansible-doc is run from the workers of the shared
+    process pool and each worker postprocesses the output of its own invocation.  That way the
+    work on the output overlaps with the ansible-doc invocations and the full output never has to
+    be copied between processes.
+    """
+
+    def __init__(self, ansible_doc: 'sh.Command', max_workers: int = CPU_COUNT,
+                 costs: Optional[Mapping[str, Mapping[str, int]]] = None,
+                 plugin_timeout: float = PLUGIN_TIMEOUT,
+                 postprocess: Optional[PostprocessT] = None) -> None:
+        """
+        Create the scheduler.
+
+        :arg ansible_doc: An :sh:obj:`sh.Command` object that will run the ansible-doc command.
+            This command should already have been baked with any necessary environment and
+            common arguments.
+        :kwarg max_workers: The number of ansible-doc processes to run in parallel.  ansible-doc
+            is mostly CPU bound so this defaults to the number of CPUs.
+        :kwarg costs: Mapping of plugin_type to plugin name to the expected cost of documenting
+            the plugin (for instance, the size of the plugin's file).  Plugins without a cost are
+            assumed to cost the average.
+        :kwarg plugin_timeout: Number of seconds after which an ansible-doc invocation which
+            documents a single plugin is killed.  Batches of plugins get longer.
+        :kwarg postprocess: A picklable function which takes the plugin_type and the parsed output
+            of an ansible-doc invocation and returns a mapping of plugin name to the data to
+            return for that plugin.  The data must be a mapping.  ansible_doc must be picklable
+            as well when this is given.
+        """
+        self.ansible_doc = ansible_doc
+        self.max_workers = max(max_workers, 1)
+        self.costs = costs or {}
+        self.plugin_timeout = plugin_timeout
+        self.postprocess = postprocess
+        #: Seconds per plugin that each of the finished jobs took
+        self._plugin_durations: List[float] = []
+
+    def _cost(self, plugin_type: str, plugin_name: str, default: int) -> int:
+        return self.costs.get(plugin_type, {}).get(plugin_name, default)
+
+    def _queue_jobs(self, queue: 'asyncio.PriorityQueue',
+                    plugin_names: Mapping[str, Sequence[str]]) -> None:
+        """Put the plugins into cost ordered batches."""
+        known_costs = [cost for type_costs in self.costs.values() for cost in type_costs.values()]
+        default_cost = sum(known_costs) // len(known_costs) if known_costs else 1
+
+        # Use several batches per worker so that there is work left to balance at the end
+        total = sum(len(names) for names in plugin_names.values())
+        chunk_size = _chunk_size(total, self.max_workers * 4)
+
+        for plugin_type, names in plugin_names.items():
+            by_cost = sorted(((self._cost(plugin_type, name, default_cost), name)
+                              for name in names), reverse=True)
+            for start in range(0, len(by_cost), chunk_size):
+                batch = by_cost[start:start + chunk_size]
+                self._put(queue, plugin_type, [name for dummy_, name in batch],
+                          sum(cost for cost, dummy_ in batch))
+
+    @staticmethod
+    def _put(queue: 'asyncio.PriorityQueue', plugin_type: str, plugin_names: List[str],
+             cost: float) -> None:
+        # The queue returns the smallest entry first.  The plugin names break ties between jobs
+        # with the same cost.
+        queue.put_nowait((-cost, plugin_type, plugin_names))
+
+    def _timeout(self, num_plugins: int) -> float:
+        """Return the number of seconds after which an invocation for a batch is killed."""
+        return self.plugin_timeout + PLUGIN_TIMEOUT_PER_PLUGIN * (num_plugins - 1)
+
+    def _hedge_after(self, num_plugins: int) -> Optional[float]:
+        """Return how long a job may run before it is hedged or None if it is too early to know."""
+        if len(self._plugin_durations) < _HEDGE_MIN_SAMPLES:
+            return None
+        # Batches have different sizes so compare the time per plugin
+        durations = sorted(self._plugin_durations)
+        return durations[int(len(durations) * .95)] * num_plugins
+
+    def _hedge(self, queue: 'asyncio.PriorityQueue', plugin_type: str,
+               plugin_names: List[str]) -> None:
+        """Queue the plugins of a straggler again ahead of everything else."""
+        if len(plugin_names) == 1:
+            self._put(queue, plugin_type, plugin_names, _HEDGE_PRIORITY)
+            return
+
+        middle = len(plugin_names) // 2
+        self._put(queue, plugin_type, plugin_names[:middle], _HEDGE_PRIORITY)
+        self._put(queue, plugin_type, plugin_names[middle:], _HEDGE_PRIORITY)
+
+    def _start_job(self, executor: Executor, plugin_type: str, plugin_names: List[str]
+                   ) -> 'asyncio.Future':
+        loop = best_get_loop()
+        timeout = self._timeout(len(plugin_names))
+        if self.postprocess is not None:
+            return loop.run_in_executor(get_process_pool(), functools.partial(
+                _document_and_postprocess, self.ansible_doc, plugin_type, plugin_names,
+                timeout, self.postprocess))
+
+        return loop.run_in_executor(executor, functools.partial(
+            self.ansible_doc, '-t', plugin_type, '--json', *plugin_names, _timeout=timeout))
+
+    async def _run_ansible_doc(self, queue: 'asyncio.PriorityQueue', executor: Executor,
+                               plugin_type: str, plugin_names: List[str],
+                               hedge: bool = True) -> Dict[str, Any]:
+        """Run ansible-doc for a batch of plugins, hedging the job if it takes too long."""
+        loop = best_get_loop()
+        started = loop.time()
+        job = self._start_job(executor, plugin_type, plugin_names)
+
+        # The first jobs start before we know how long a job normally takes so keep checking
+        # until either the job is done or it is known to be a straggler
+        while hedge:
+            hedge_after = self._hedge_after(len(plugin_names))
+            if hedge_after is None:
+                timeout = _HEDGE_POLL_INTERVAL
+            else:
+                timeout = max(started + hedge_after - loop.time(), 0)
+
+            done, dummy_ = await asyncio.wait({job}, timeout=timeout)
+            if done:
+                break
+
+            if hedge_after is not None and loop.time() - started >= hedge_after:
+                self._hedge(queue, plugin_type, plugin_names)
+                break
+
+        ansible_doc_results = await job
+        self._plugin_durations.append((loop.time() - started) / len(plugin_names))
+        if self.postprocess is not None:
+            return ansible_doc_results
+        return parse_json_output(ansible_doc_results.stdout)
+
+    def _handle_failure(self, queue: 'asyncio.PriorityQueue', plugin_type: str,
+                        plugin_names: List[str], cost: float, error: Exception,
+                        type_results: Dict[str, Union[Dict[str, Any], Exception]]) -> None:
+        """Record the error for a single plugin or split up a batch which failed."""
+        if len(plugin_names) == 1:
+            if isinstance(error, (sh.TimeoutException, PluginTimeoutError)):
+                error = PluginTimeoutError(f'ansible-doc did not finish documenting'
+                                           f' {plugin_names[0]} within {self.plugin_timeout}'
+                                           f' seconds')
+            # A hedged run of this plugin may have already succeeded or failed
+            type_results.setdefault(plugin_names[0], error)
+            return
+
+        # Bisect until the plugin which is broken or slow has been isolated
+        middle = len(plugin_names) // 2
+        self._put(queue, plugin_type, plugin_names[:middle], cost / 2)
+        self._put(queue, plugin_type, plugin_names[middle:], cost / 2)
+
+    async def _run_job(self, queue: 'asyncio.PriorityQueue', executor: Executor,
+                       plugin_type: str, plugin_names: List[str], cost: float,
+                       results: Dict[str, Dict[str, Union[Dict[str, Any], Exception]]]) -> None:
+        type_results = results[plugin_type]
+        # Hedged jobs may have already been documented by another run
+        plugin_names = [name for name in plugin_names
+                        if not isinstance(type_results.get(name), Mapping)]
+        if not plugin_names:
+            return
 
-        # ansible-doc returns plugins shipped with ansible-base using no namespace and collection.
-        # For now, we fix these entries to use the ansible.builtin collection here.  The reason we
-        # do it here instead of as part of a general normalization step is that other plugins
-        # (site-specific ones from ANSIBLE_LIBRARY, for instance) will also be returned with no
-        # collection name.  We know that we don't have any of those in this code (because we set
-        # ANSIBLE_LIBRARY and other plugin path variables to /dev/null) so we can safely fix this
-        # here but not outside the ansible-doc backend.
-        fqcn = plugin_name
         try:
-            get_fqcn_parts(fqcn)
-        except ValueError:
-            fqcn = f'ansible.builtin.{plugin_name}'
+            plugin_docs = await self._run_ansible_doc(queue, executor, plugin_type, plugin_names,
+                                                      hedge=cost != _HEDGE_PRIORITY)
+        except Exception as e:  # pylint:disable=broad-except
+            self._handle_failure(queue, plugin_type, plugin_names, cost, e, type_results)
+            return
+
+        for plugin_name in plugin_names:
+            try:
+                type_results[plugin_name] = plugin_docs[plugin_name]
+            except KeyError:
+                type_results.setdefault(plugin_name, ParsingError(
+                    f'ansible-doc did not return documentation for {plugin_name}'))
+
+    async def _worker(self, queue: 'asyncio.PriorityQueue', executor: Executor,
+                      results: Dict[str, Dict[str, Union[Dict[str, Any], Exception]]]) -> None:
+        while True:
+            neg_cost, plugin_type, plugin_names = await queue.get()
+            try:
+                await self._run_job(queue, executor, plugin_type, plugin_names, -neg_cost,
+                                    results)
+            except Exception as e:  # pylint:disable=broad-except
+                for plugin_name in plugin_names:
+                    results[plugin_type].setdefault(plugin_name, e)
+            finally:
+                queue.task_done()
+
+    async def run(self, plugin_names: Mapping[str, Sequence[str]]
+                  ) -> Dict[str, Dict[str, Union[Dict[str, Any], Exception]]]:
+        """
+        Document plugins.
+
+        :arg plugin_names: Mapping of plugin_type to the names of the plugins to document as
+            ansible-doc knows them.
+        :returns: Mapping of plugin_type to plugin name to either the information from
+            ansible-doc --json or the exception that prevented us from retrieving it.  Plugins
+            which took too long to document have a :exc:`PluginTimeoutError`.
+        """
+        results: Dict[str, Dict[str, Union[Dict[str, Any], Exception]]] = {
+            plugin_type: {} for plugin_type in plugin_names}
+        queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._queue_jobs(queue, plugin_names)
+        self._plugin_durations = []
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        workers = [asyncio.create_task(self._worker(queue, executor, results))
+                   for dummy_ in range(self.max_workers)]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            executor.shutdown(wait=True)
+
+        return results
+
+
+async def _list_plugins(ansible_doc: 'sh.Command', plugin_types: Sequence[str]
+                        ) -> Tuple[Dict[str, List[str]], bool]:
+    """
+    Retrieve the names of all of the plugins of several types.
+
+    :arg ansible_doc: An :sh:obj:`sh.Command` object that will run the ansible-doc command.
+    :arg plugin_types: The types of plugins to list.
+    :returns: A tuple of a mapping of plugin_type to the names of the plugins and whether listing
+        the plugins of any of the types failed.  Failures are reported on stderr.
+    """
+    loop = best_get_loop()
+    with ThreadPoolExecutor(max_workers=CPU_COUNT) as executor:
+        listers = [loop.run_in_executor(executor, get_plugin_list, plugin_type, ansible_doc)
+                   for plugin_type in plugin_types]
+        results = await asyncio.gather(*listers, return_exceptions=True)
+
+    plugin_names = {}
+    failed = False
+    for plugin_type, result in zip(plugin_types, results):
+        if isinstance(result, Exception):
+            failed = True
+            formatted_exception = traceback.format_exception(None, result, result.__traceback__)
+            sys.stderr.write(f'Exception while parsing documentation for {plugin_type} plugins\n'
+                             f'Exception:\n{"".join(formatted_exception)}\n')
+            if isinstance(result, sh.ErrorReturnCode):
+                sys.stderr.write(f'Full process stderr:\n'
+                                 f'{result.stderr.decode("utf-8", errors="surrogateescape")}\n')
+            continue
+        plugin_names[plugin_type] = result
+
+    return plugin_names, failed
+
+
+def _discover_plugins(venv: Union['VenvRunner', 'FakeVenvRunner'], collection_dir: str
+                      ) -> Optional[Tuple[Dict[str, List[str]], Dict[str, Dict[str, int]]]]:
+    """
+    Find the plugins by walking the plugin directories instead of running ansible-doc --list.
+
+    :arg venv: A VenvRunner into which Ansible has been installed.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :returns: A tuple of a mapping of plugin_type to the names of the plugins and a mapping of
+        plugin_type to plugin name to how expensive the plugin is to document (estimated from the
+        size of its file).  Plugin names are the names that ansible-doc knows the plugins by.
+        None is returned if the plugins could not be found this way.
+    """
+    flog = mlog.fields(func='_discover_plugins')
+    try:
+        inventory = discover_plugins(get_ansible_base_dir(venv), collection_dir)
+    except Exception as e:  # pylint:disable=broad-except
+        flog.fields(error=str(e)).warning('Unable to find plugins on the filesystem')
+        return None
+
+    plugin_names: Dict[str, List[str]] = {}
+    costs: Dict[str, Dict[str, int]] = {}
+    for plugin_type, plugins in inventory.plugins.items():
+        plugin_names[plugin_type] = [ansible_doc_name(fqcn) for fqcn in plugins]
+        costs[plugin_type] = {ansible_doc_name(fqcn): plugin_file.size
+                              for fqcn, plugin_file in plugins.items()}
+    return plugin_names, costs
+
+
+async def find_plugins(venv: Union['VenvRunner', 'FakeVenvRunner'], ansible_doc: 'sh.Command',
+                       collection_dir: str
+                       ) -> Tuple[Dict[str, List[str]], Dict[str, Dict[str, int]], bool]:
+    """
+    Find all of the plugins that should be documented.
+
+    The plugin directories are walked directly.  If that fails, ansible-doc --list is run for
+    each plugin type instead.
+
+    :arg venv: A VenvRunner into which Ansible has been installed.
+    :arg ansible_doc: An :sh:obj:`sh.Command` object that will run the ansible-doc command.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :returns: A tuple of a mapping of plugin_type to the names of the plugins, a mapping of
+        plugin_type to plugin name to the estimated cost of documenting it (empty if unknown),
+        and whether listing the plugins of any of the types failed.
+    """
+    discovered = _discover_plugins(venv, collection_dir)
+    if discovered is not None:
+        return discovered[0], discovered[1], False
+
+    plugin_names, list_failed = await _list_plugins(ansible_doc, sorted(DOCUMENTABLE_PLUGINS))
+    return plugin_names, {}, list_failed
+
+
+async def _can_dump_metadata(ansible_doc: 'sh.Command') -> Tuple[bool, bool]:
+    """
+    Probe whether ansible-doc is able to dump the docs for all plugins at once.
+
+    :arg ansible_doc: An :sh:obj:`sh.Command` object that will run the ansible-doc command.
+    :returns: A tuple of whether ansible-doc supports ``--metadata-dump`` and whether it supports
+        ``--no-fail-on-errors`` to keep going when a plugin cannot be documented.
+    """
+    loop = best_get_loop()
+    try:
+        help_cmd = await loop.run_in_executor(None, ansible_doc, '--help')
+    except sh.ErrorReturnCode:
+        return (False, False)
+
+    help_text = help_cmd.stdout.decode('utf-8', errors='surrogateescape')
+    return ('--metadata-dump' in help_text, '--no-fail-on-errors' in help_text)
 
-        results[fqcn] = json.loads(_filter_non_json_lines(stdout)[0])[plugin_name]
 
-    return results
+async def _get_all_plugin_info_from_dump(ansible_doc: 'sh.Command', no_fail_on_errors: bool
+                                         ) -> Dict[str, Dict[str, Any]]:
+    """
+    Retrieve information about all of the Ansible Plugins with one ansible-doc invocation.
+
+    :arg ansible_doc: An :sh:obj:`sh.Command` object that will run the ansible-doc command.
+        This command should already have been baked with any necessary environment and
+        common arguments.
+    :arg no_fail_on_errors: Whether to ask ansible-doc to record errors for plugins that cannot be
+        documented rather than failing.
+    :returns: The same nested structure that :func:`get_ansible_plugin_info` returns.  Plugins
+        which ansible-doc was unable to document have a record with only an ``error`` key so that
+        they are reported with the other nonfatal errors.
+    """
+    dump_args = ['--metadata-dump']
+    if no_fail_on_errors:
+        dump_args.append('--no-fail-on-errors')
+
+    loop = best_get_loop()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The dump for a whole distribution is very large.  Redirect it to a file so that sh does
+        # not keep its own copy of the output in addition to the one that we parse.  The dump is
+        # a single JSON document so it is still parsed in one piece.
+        dump_file = os.path.join(tmp_dir, 'metadata-dump.json')
+        await loop.run_in_executor(None, functools.partial(ansible_doc, *dump_args,
+                                                           _out=dump_file))
+        with open(dump_file, 'rb') as f:
+            raw_dump = f.read()
+
+    all_plugin_info = parse_json_output(raw_dump)['all']
+    del raw_dump
+
+    plugin_map: Dict[str, Dict[str, Any]] = {}
+    for plugin_type in DOCUMENTABLE_PLUGINS:
+        results = plugin_map[plugin_type] = {}
+        for plugin_name, plugin_record in all_plugin_info.get(plugin_type, {}).items():
+            if 'error' in plugin_record:
+                plugin_record = {'error': f'ansible-doc was unable to document {plugin_name}:'
+                                          f' {plugin_record["error"]}'}
+
+            results[canonical_fqcn(plugin_name)] = plugin_record
+
+    return plugin_map
+
+
+async def _try_metadata_dump(ansible_doc: 'sh.Command') -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Retrieve information about all of the Ansible Plugins if ansible-doc can dump it all at once.
+
+    :arg ansible_doc: An :sh:obj:`sh.Command` object that will run the ansible-doc command.
+    :returns: The same nested structure that :func:`get_ansible_plugin_info` returns or None if
+        the installed ansible-doc could not dump the documentation.
+    """
+    flog = mlog.fields(func='_try_metadata_dump')
+
+    can_dump_metadata, no_fail_on_errors = await _can_dump_metadata(ansible_doc)
+    if not can_dump_metadata:
+        return None
+
+    try:
+        return await _get_all_plugin_info_from_dump(ansible_doc, no_fail_on_errors)
+    except Exception as e:  # pylint:disable=broad-except
+        flog.fields(error=str(e)).warning('ansible-doc --metadata-dump failed.  Falling back to'
+                                          ' documenting plugins with separate invocations')
+    return None
 
 
 async def get_ansible_plugin_info(venv: Union['VenvRunner', 'FakeVenvRunner'],
-                                  collection_dir: str) -> Dict[str, Dict[str, Any]]:
+                                  collection_dir: str,
+                                  plugin_names: Optional[Mapping[str, Sequence[str]]] = None,
+                                  postprocess: Optional[PostprocessT] = None
+                                  ) -> Dict[str, Dict[str, Any]]:
     """
     Retrieve information about all of the Ansible Plugins.
 
+    If the installed ansible-doc supports ``--metadata-dump``, the documentation for all of the
+    plugins is retrieved with a single invocation.  Otherwise, ansible-doc is run for batches of
+    plugins by an :class:`AnsibleDocScheduler`.
+
     :arg venv: A VenvRunner into which Ansible has been installed.
     :arg collection_dir: Directory in which the collections have been installed.
+    :kwarg plugin_names: If given, only document these plugins.  This is a mapping of plugin_type
+        to the names of the plugins as ansible-doc knows them.
+    :kwarg postprocess: If given, the worker processes which run ansible-doc pass its output
+        through this function and the information for each plugin is what the function returns
+        for it.  See :class:`AnsibleDocScheduler`.  ``--metadata-dump`` is not used in this case
+        because its output could only be processed by a single worker.
     :returns: A nested directory structure that looks like::
 
         plugin_type:
@@ -146,67 +656,55 @@ async def get_ansible_plugin_info(venv: Union['VenvRunner', 'FakeVenvRunner'],
                 {information from ansible-doc --json.  See the ansible-doc documentation for more
                  info.}
     """
+    flog = mlog.fields(func='get_ansible_plugin_info')
+
     # Setup an sh.Command to run ansible-doc from the venv with only the collections we
     # found as providers of extra plugins.
-    env = os.environ.copy()
-    env.update(ANSIBLE_PATH_ENVVARS)
-    env['ANSIBLE_COLLECTIONS_PATHS'] = collection_dir
+    env = ansible_doc_env(collection_dir)
 
     venv_ansible_doc = venv.get_command('ansible-doc')
     venv_ansible_doc = venv_ansible_doc.bake('-vvv', _env=env)
 
-    # We invoke _get_plugin_info once for each documentable plugin type.  Within _get_plugin_info,
-    # new threads are spawned to handle waiting for ansible-doc to parse files and give us results.
-    # To keep ourselves under THREAD_MAX, we need to divide the number of threads we're allowed over
-    # each call of _get_plugin_info.
-    # Why use THREAD_MAX instead of process max?  Even though this ultimately invokes separate
-    # ansible-doc processes, the limiting factor is IO as ansible-doc reads from disk.  So it makes
-    # sense to scale up to THREAD_MAX instead of PROCESS_MAX.
-
-    # Allocate more for modules because the vast majority of plugins are modules
-    module_workers = max(int(.7 * THREAD_MAX), 1)
-    other_workers = int((THREAD_MAX - module_workers) / (len(DOCUMENTABLE_PLUGINS) - 1))
-    if other_workers < 1:
-        other_workers = 1
-
-    extractors = {}
-    for plugin_type in DOCUMENTABLE_PLUGINS:
-        if plugin_type == 'module':
-            max_workers = module_workers
-        else:
-            max_workers = other_workers
-        extractors[plugin_type] = asyncio.create_task(
-            _get_plugin_info(plugin_type, venv_ansible_doc, max_workers))
-
-    results = await asyncio.gather(*extractors.values(), return_exceptions=True)
+    list_failed = False
+    if plugin_names is None:
+        # Newer versions of ansible-doc can document every plugin with a single invocation
+        dumped_plugin_info = None
+        if postprocess is None:
+            dumped_plugin_info = await _try_metadata_dump(venv_ansible_doc)
+        if dumped_plugin_info is not None:
+            return dumped_plugin_info
+
+        plugin_names, costs, list_failed = await find_plugins(venv, venv_ansible_doc,
+                                                              collection_dir)
+        flog.debug('Finished listing plugins')
+    else:
+        discovered = _discover_plugins(venv, collection_dir)
+        costs = discovered[1] if discovered is not None else {}
+    flog.debug('Documenting plugins with separate ansible-doc invocations')
+
+    # A single queue for the plugins of all types keeps every worker busy until the last plugin
+    # has been documented.
+    scheduler = AnsibleDocScheduler(venv_ansible_doc, costs=costs, postprocess=postprocess)
+    results = await scheduler.run(plugin_names)
 
     plugin_map = {}
-    err_msg = []
-    an_exception = None
-    for plugin_type, extraction_result in zip(extractors, results):
-
-        if isinstance(extraction_result, Exception):
-            an_exception = extraction_result
-            formatted_exception = traceback.format_exception(None, extraction_result,
-                                                             extraction_result.__traceback__)
-            err_msg.append(f'Exception while parsing documentation for {plugin_type} plugins')
-            err_msg.append(f'Exception:\n{"".join(formatted_exception)}')
-
-        # Note: Exception will also be True.
-        if isinstance(extraction_result, sh.ErrorReturnCode):
-            stdout = extraction_result.stdout.decode("utf-8", errors="surrogateescape")
-            stderr = extraction_result.stderr.decode("utf-8", errors="surrogateescape")
-            err_msg.append(f'Full process stdout:\n{stdout}')
-            err_msg.append(f'Full process stderr:\n{stderr}')
-
-        if err_msg:
-            sys.stderr.write('\n'.join(err_msg))
-            sys.stderr.write('\n')
-            continue
-
-        plugin_map[plugin_type] = extraction_result
-
-    if an_exception:
+    for plugin_type, plugin_results in results.items():
+        plugin_map[plugin_type] = {}
+        for plugin_name, ansible_doc_results in plugin_results.items():
+            if isinstance(ansible_doc_results, PluginTimeoutError):
+                # Record the timeout so that it is reported with the other nonfatal errors
+                plugin_map[plugin_type][canonical_fqcn(plugin_name)] = {
+                    'error': str(ansible_doc_results)}
+                continue
+
+            if isinstance(ansible_doc_results, Exception):
+                sys.stderr.write(_format_plugin_error(plugin_type, plugin_name,
+                                                      ansible_doc_results))
+                continue
+
+            plugin_map[plugin_type][canonical_fqcn(plugin_name)] = ansible_doc_results
+
+    if list_failed:
         # We wanted to print out all of the exceptions raised by parsing the output but once we've
         # done so, we want to then fail by raising one of the exceptions.
         raise ParsingError('Parsing of plugins failed')
@@ -0,0 +1,307 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Parse documentation from ansible plugins using long-lived ansible-doc workers.
+
+Starting ansible-doc means starting python, importing ansible, and scanning all of the collections
+for plugins.  The workers in this module pay that cost once and then answer requests for the
+documentation of individual plugins over a pipe.  The protocol is one JSON document per line.  See
+:file:`antsibull/data/ansible-doc-worker_py.txt` for the worker side of it.
+"""
+
+import asyncio
+import json
+import pkgutil
+import sys
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Set, Union
+
+from ..constants import PROCESS_MAX
+from ..logging import log
+from .ansible_doc import (PLUGIN_TIMEOUT, ParsingError, _format_plugin_error, ansible_doc_env,
+                          canonical_fqcn, find_plugins)
+from .json_output import loads_json
+
+if TYPE_CHECKING:
+    from ..venv import VenvRunner, FakeVenvRunner
+
+
+mlog = log.fields(mod=__name__)
+
+#: Number of requests a worker answers before it is replaced with a fresh process.  This caps the
+#: memory that a worker can accumulate from loading plugins.
+WORKER_MAX_REQUESTS: int = 500
+
+#: Largest response that we'll read from a worker.  The docs for some network modules are huge.
+_READ_LIMIT: int = 256 * 1024 * 1024
+
+
+class WorkerError(Exception):
+    """Error raised when an ansible-doc worker stops responding to requests."""
+
+
+class AnsibleDocWorker:
+    """A single long-lived python process which answers requests for plugin documentation."""
+
+    def __init__(self, python: str, env: Mapping[str, str],
+                 timeout: float = PLUGIN_TIMEOUT) -> None:
+        """
+        Create the worker.  The process is not started until :meth:`start` is called.
+
+        :arg python: Path to the python interpreter which ansible-base is installed into.
+        :arg env: The environment to run the worker in.
+        :kwarg timeout: Number of seconds to wait for the answer to one request.  A worker which
+            takes longer is killed.
+        """
+        self.python = python
+        self.env = env
+        self.timeout = timeout
+        #: Number of requests this worker has answered.
+        self.requests: int = 0
+        self._process: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self) -> None:
+        """Start the worker process."""
+        worker_source = pkgutil.get_data('antsibull.data', 'ansible-doc-worker_py.txt')
+        self._process = await asyncio.create_subprocess_exec(
+            self.python, '-c', worker_source.decode('utf-8'),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL, env=self.env, limit=_READ_LIMIT)
+
+    async def get_doc(self, plugin_type: str, plugin_name: str) -> Dict[str, Any]:
+        """
+        Retrieve the documentation for one plugin.
+
+        :arg plugin_type: The type of the plugin.
+        :arg plugin_name: The name of the plugin as given by ansible-doc.
+        :returns: The information from ansible-doc --json for this plugin.
+        :raises WorkerError: if the worker process exited, returned garbage, or did not answer
+            within ``timeout`` seconds.  The worker cannot be used after that.
+        :raises ParsingError: if the worker was unable to document the plugin.
+        """
+        # close() may be called while we wait for the answer so work on our own reference
+        process = self._process
+        if process is None:
+            raise WorkerError('The ansible-doc worker has not been started')
+
+        self.requests += 1
+        request = json.dumps({'plugin_type': plugin_type, 'plugin_name': plugin_name})
+        try:
+            process.stdin.write(request.encode('utf-8') + b'\n')
+            await process.stdin.drain()
+            raw_response = await asyncio.wait_for(process.stdout.readline(), self.timeout)
+        except asyncio.TimeoutError:
+            await self.terminate()
+            raise WorkerError(f'The ansible-doc worker did not document {plugin_name} within'
+                              f' {self.timeout} seconds')
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            raise WorkerError(f'Unable to communicate with the ansible-doc worker: {e}')
+
+        if not raw_response:
+            returncode = await process.wait()
+            raise WorkerError(f'The ansible-doc worker exited unexpectedly with code {returncode}')
+
+        try:
+            response = loads_json(raw_response)
+        except ValueError as e:
+            raise WorkerError(f'The ansible-doc worker returned an invalid response: {e}')
+
+        if 'error' in response:
+            raise ParsingError(response['error'])
+
+        return response['result']
+
+    async def close(self) -> None:
+        """Stop the worker process."""
+        if self._process is None:
+            return
+
+        process = self._process
+        self._process = None
+        if process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), 5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+    async def terminate(self) -> None:
+        """Kill the worker process without waiting for it to finish its current request."""
+        if self._process is None:
+            return
+
+        process = self._process
+        self._process = None
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+class AnsibleDocWorkerPool:
+    """
+    A pool of :class:`AnsibleDocWorker`.
+
+    Workers are started lazily and are recycled after they have answered ``max_requests``
+    requests or when they fail.
+    """
+
+    def __init__(self, python: str, env: Mapping[str, str], num_workers: int = PROCESS_MAX,
+                 max_requests: int = WORKER_MAX_REQUESTS,
+                 timeout: float = PLUGIN_TIMEOUT) -> None:
+        """
+        Create the pool.
+
+        :arg python: Path to the python interpreter which ansible-base is installed into.
+        :arg env: The environment to run the workers in.
+        :kwarg num_workers: The number of worker processes to run in parallel.
+        :kwarg max_requests: The number of requests a worker answers before it is replaced.
+        :kwarg timeout: Number of seconds to wait for the answer to one request.  A worker which
+            takes longer is killed and replaced.
+        """
+        self.python = python
+        self.env = env
+        self.max_requests = max_requests
+        self.timeout = timeout
+        #: The workers which have been started, whether they are idle or busy
+        self._workers: Set[AnsibleDocWorker] = set()
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for dummy_ in range(max(num_workers, 1)):
+            self._idle.put_nowait(None)
+
+    async def _acquire(self) -> AnsibleDocWorker:
+        worker = await self._idle.get()
+        if worker is None:
+            worker = AnsibleDocWorker(self.python, self.env, timeout=self.timeout)
+            try:
+                await worker.start()
+            except Exception:
+                self._idle.put_nowait(None)
+                raise
+            self._workers.add(worker)
+        return worker
+
+    async def _release(self, worker: AnsibleDocWorker, healthy: bool = True) -> None:
+        if not healthy or worker.requests >= self.max_requests:
+            self._workers.discard(worker)
+            await worker.close()
+            self._idle.put_nowait(None)
+        else:
+            self._idle.put_nowait(worker)
+
+    async def get_doc(self, plugin_type: str, plugin_name: str) -> Dict[str, Any]:
+        """
+        Retrieve the documentation for one plugin from the next available worker.
+
+        :arg plugin_type: The type of the plugin.
+        :arg plugin_name: The name of the plugin as given by ansible-doc.
+        :returns: The information from ansible-doc --json for this plugin.
+        """
+        worker = await self._acquire()
+        healthy = True
+        try:
+            return await worker.get_doc(plugin_type, plugin_name)
+        except WorkerError:
+            healthy = False
+            raise
+        finally:
+            await self._release(worker, healthy)
+
+    async def close(self) -> None:
+        """Stop all of the worker processes.  Workers which are busy with a request are killed."""
+        idle = set()
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if worker is not None:
+                idle.add(worker)
+
+        workers = self._workers
+        self._workers = set()
+        for worker in workers:
+            if worker in idle:
+                await worker.close()
+            else:
+                await worker.terminate()
+
+
+async def _get_plugin_info_from_workers(plugin_type: str, plugin_names: List[str],
+                                        pool: AnsibleDocWorkerPool) -> Dict[str, Any]:
+    """
+    Retrieve info about all Ansible plugins of a particular type from the worker pool.
+
+    :arg plugin_type: The type of plugin.  See :attr:`DOCUMENTABLE_PLUGINS` for a list
+        of allowed types.
+    :arg plugin_names: The names of the plugins as returned by ansible-doc --list.
+    :arg pool: The pool of workers to retrieve the documentation from.
+    :returns: Mapping of fqcn's to plugin_info.
+    """
+    extractors = [pool.get_doc(plugin_type, plugin_name) for plugin_name in plugin_names]
+    plugin_info = await asyncio.gather(*extractors, return_exceptions=True)
+
+    results = {}
+    for plugin_name, worker_results in zip(plugin_names, plugin_info):
+        if isinstance(worker_results, Exception):
+            sys.stderr.write(_format_plugin_error(plugin_type, plugin_name, worker_results))
+            continue
+
+        results[canonical_fqcn(plugin_name)] = worker_results
+
+    return results
+
+
+async def get_ansible_plugin_info_from_workers(venv: Union['VenvRunner', 'FakeVenvRunner'],
+                                               collection_dir: str,
+                                               num_workers: int = PROCESS_MAX,
+                                               max_requests: int = WORKER_MAX_REQUESTS,
+                                               timeout: float = PLUGIN_TIMEOUT,
+                                               plugin_names: Optional[
+                                                   Mapping[str, Sequence[str]]] = None
+                                               ) -> Dict[str, Dict[str, Any]]:
+    """
+    Retrieve information about all of the Ansible Plugins using long-lived ansible-doc workers.
+
+    This returns the same data as :func:`antsibull.docs_parsing.ansible_doc.get_ansible_plugin_info`
+    but loads ansible and the collections only once per worker instead of once per plugin.
+
+    :arg venv: A VenvRunner into which Ansible has been installed.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :kwarg num_workers: The number of worker processes to run in parallel.
+    :kwarg max_requests: The number of requests a worker answers before it is replaced.
+    :kwarg timeout: Number of seconds after which a worker which is documenting a plugin is killed
+        and replaced.
+    :kwarg plugin_names: If given, only document these plugins.  This is a mapping of plugin_type
+        to the names of the plugins as ansible-doc knows them.
+    :returns: A nested directory structure that looks like::
+
+        plugin_type:
+            plugin_name:  # Includes namespace and collection.
+                {information from ansible-doc --json.  See the ansible-doc documentation for more
+                 info.}
+    """
+    flog = mlog.fields(func='get_ansible_plugin_info_from_workers')
+    env = ansible_doc_env(collection_dir)
+
+    venv_ansible_doc = venv.get_command('ansible-doc')
+    venv_ansible_doc = venv_ansible_doc.bake('-vvv', _env=env)
+    python = str(venv.get_command('python'))
+
+    list_failed = False
+    if plugin_names is None:
+        plugin_names, dummy_, list_failed = await find_plugins(venv, venv_ansible_doc,
+                                                               collection_dir)
+        flog.debug('Finished listing plugins')
+
+    pool = AnsibleDocWorkerPool(python, env, num_workers=num_workers, max_requests=max_requests,
+                                timeout=timeout)
+    try:
+        extractors = [_get_plugin_info_from_workers(plugin_type, names, pool)
+                      for plugin_type, names in plugin_names.items()]
+        results = await asyncio.gather(*extractors)
+    finally:
+        await pool.close()
+
+    if list_failed:
+        raise ParsingError('Parsing of plugins failed')
+
+    return dict(zip(plugin_names, results))
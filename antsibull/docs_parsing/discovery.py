@@ -0,0 +1,286 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Find the plugins in ansible-base and the installed collections without running ansible.
+
+``ansible-doc --list`` has to start python, import ansible, and scan every installed collection
+for each plugin type that it lists.  Walking the plugin directories ourselves finds the same
+plugins in a single pass over the filesystem.  The resulting inventory also records the size and
+modification time of each plugin file so that later stages can use them without calling
+:python:func:`os.stat` again.
+"""
+
+import os
+import os.path
+import typing as t
+
+import yaml
+
+from ..constants import DOCUMENTABLE_PLUGINS
+from ..logging import log
+from ..yaml import load_yaml_file
+
+if t.TYPE_CHECKING:
+    from ..venv import VenvRunner, FakeVenvRunner
+
+
+mlog = log.fields(mod=__name__)
+
+#: Location of the plugin routing for ansible.builtin inside of the ansible package
+_BUILTIN_RUNTIME: t.Tuple[str, ...] = ('config', 'ansible_builtin_runtime.yml')
+
+#: Plugins which ansible-doc --list never lists because they are not documented.  This is the same
+#: as ``REJECTLIST`` in :mod:`ansible.utils.plugin_docs` (keyed on plugin_type).
+REJECTLIST: t.Dict[str, t.FrozenSet[str]] = {
+    'module': frozenset(('async_wrapper', )),
+    'cache': frozenset(('base', )),
+}
+
+
+class PluginFile(t.NamedTuple):
+    """A file which contains the documentation of a plugin."""
+
+    #: Path to the file
+    path: str
+    #: Size of the file in bytes
+    size: int
+    #: Modification time of the file
+    mtime: float
+
+
+class PluginInventory(t.NamedTuple):
+    """All of the plugins and documentation fragments that were found."""
+
+    #: Mapping of plugin_type to fqcn to the file with the plugin's documentation
+    plugins: t.Dict[str, t.Dict[str, PluginFile]]
+    #: Mapping of the names that plugins can use in ``extends_documentation_fragment`` to the
+    #: files which contain those fragments
+    doc_fragments: t.Dict[str, str]
+    #: Mapping of plugin_type to the fqcns which are redirected to the fqcns that they are
+    #: redirected to
+    redirects: t.Dict[str, t.Dict[str, str]]
+
+    def plugin_files(self) -> t.Dict[str, t.Dict[str, str]]:
+        """Return a mapping of plugin_type to fqcn to the path of the plugin's file."""
+        return {plugin_type: {fqcn: plugin_file.path for fqcn, plugin_file in plugins.items()}
+                for plugin_type, plugins in self.plugins.items()}
+
+
+def plugin_dir_name(plugin_type: str) -> str:
+    """
+    Return the name of the directory that plugins of a type are stored in.
+
+    :arg plugin_type: The type of plugin.
+    :returns: The name of the directory inside of ``plugins/`` (or the ansible package for
+        modules).
+    """
+    if plugin_type == 'module':
+        return 'modules'
+    return plugin_type
+
+
+def _scan_plugin_dir(plugin_dir: str, plugin_type: t.Optional[str] = None
+                     ) -> t.Dict[str, PluginFile]:
+    """
+    Find the plugins in one plugin directory the same way that ansible-doc --list does.
+
+    :arg plugin_dir: The directory to search.
+    :kwarg plugin_type: The type of the plugins in the directory.  Plugins of this type which are
+        in :data:`REJECTLIST` are left out.
+    :returns: Mapping of plugin short name to the file containing its documentation.
+    """
+    rejected = REJECTLIST.get(plugin_type, frozenset())
+    plugins = {}
+    try:
+        entries = sorted(os.scandir(plugin_dir), key=lambda entry: entry.name)
+    except OSError:
+        return plugins
+
+    for entry in entries:
+        name, ext = os.path.splitext(entry.name)
+        if ext != '.py' or entry.name.startswith(('.', '__')):
+            continue
+        # Symlinks with a leading underscore are aliases of deprecated names
+        if entry.name.startswith('_') and entry.is_symlink():
+            continue
+        try:
+            if not entry.is_file():
+                continue
+            stat_results = entry.stat()
+        except OSError:
+            # Broken symlink
+            continue
+
+        # Deprecated plugins have a leading underscore
+        name = name.lstrip('_')
+        if name in rejected:
+            continue
+        plugins[name] = PluginFile(entry.path, stat_results.st_size, stat_results.st_mtime)
+
+    return plugins
+
+
+def _find_collections(collection_dir: str) -> t.List[t.Tuple[str, str, str]]:
+    """
+    Find the collections installed into a directory.
+
+    :arg collection_dir: Directory in which the collections have been installed.
+    :returns: List of (namespace, collection name, path to the collection).
+    """
+    collections = []
+    toplevel = os.path.join(collection_dir, 'ansible_collections')
+    try:
+        namespaces = sorted(os.scandir(toplevel), key=lambda entry: entry.name)
+    except OSError:
+        return collections
+
+    for namespace in namespaces:
+        if not namespace.is_dir():
+            continue
+        for collection in sorted(os.scandir(namespace.path), key=lambda entry: entry.name):
+            if collection.is_dir():
+                collections.append((namespace.name, collection.name, collection.path))
+
+    return collections
+
+
+def _load_plugin_routing(runtime_file: str) -> t.Dict[str, t.Any]:
+    """
+    Read the ``plugin_routing`` section of a collection's runtime metadata.
+
+    :arg runtime_file: Path to the ``meta/runtime.yml`` file.
+    :returns: The plugin_routing data.  This is empty if the file doesn't exist or is invalid.
+    """
+    flog = mlog.fields(func='_load_plugin_routing')
+    try:
+        runtime = load_yaml_file(runtime_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, yaml.YAMLError) as e:
+        flog.fields(filename=runtime_file, error=str(e)).warning('Unable to read plugin routing')
+        return {}
+
+    if not isinstance(runtime, dict) or not isinstance(runtime.get('plugin_routing'), dict):
+        return {}
+    return runtime['plugin_routing']
+
+
+def _apply_routing(collection_name: str, plugin_type: str,
+                   plugins: t.Dict[str, PluginFile],
+                   plugin_routing: t.Mapping[str, t.Any],
+                   redirects: t.Dict[str, t.Dict[str, str]]) -> None:
+    """
+    Remove plugins which the collection's plugin routing sends somewhere else.
+
+    Plugins which are redirected are documented under the name that they are redirected to.
+    Plugins which are tombstoned have been removed.  Neither is documented under its own name.
+
+    :arg collection_name: The name of the collection the plugins are in.
+    :arg plugin_type: The type of the plugins.
+    :arg plugins: Mapping of plugin short name to plugin file.  This is modified in place.
+    :arg plugin_routing: The plugin_routing of the collection.
+    :arg redirects: Mapping of plugin_type to fqcn to the fqcn it is redirected to.  Redirects
+        which are found are added to it.
+    """
+    routes = plugin_routing.get(plugin_dir_name(plugin_type))
+    if not isinstance(routes, dict):
+        return
+
+    for name, route in routes.items():
+        if not isinstance(route, dict):
+            continue
+        if route.get('redirect'):
+            redirects.setdefault(plugin_type, {})[f'{collection_name}.{name}'] = route['redirect']
+        if route.get('redirect') or route.get('tombstone'):
+            plugins.pop(name, None)
+
+
+def _builtin_plugin_dir(ansible_base_dir: str, plugin_type: str) -> str:
+    if plugin_type == 'module':
+        return os.path.join(ansible_base_dir, plugin_dir_name(plugin_type))
+    return os.path.join(ansible_base_dir, 'plugins', plugin_dir_name(plugin_type))
+
+
+def discover_plugins(ansible_base_dir: str, collection_dir: str) -> PluginInventory:
+    """
+    Find all of the documentable plugins in ansible-base and the installed collections.
+
+    :arg ansible_base_dir: The directory of the ``ansible`` python package.
+    :arg collection_dir: Directory in which the collections have been installed.  The collections
+        are in the ``ansible_collections`` subdirectory of it.
+    :returns: A :class:`PluginInventory` of the plugins and documentation fragments.
+    """
+    plugins: t.Dict[str, t.Dict[str, PluginFile]] = {plugin_type: {}
+                                                     for plugin_type in DOCUMENTABLE_PLUGINS}
+    doc_fragments: t.Dict[str, str] = {}
+    redirects: t.Dict[str, t.Dict[str, str]] = {}
+
+    builtin_routing = _load_plugin_routing(os.path.join(ansible_base_dir, *_BUILTIN_RUNTIME))
+    for plugin_type in DOCUMENTABLE_PLUGINS:
+        found = _scan_plugin_dir(_builtin_plugin_dir(ansible_base_dir, plugin_type),
+                                 plugin_type)
+        _apply_routing('ansible.builtin', plugin_type, found, builtin_routing, redirects)
+        for name, plugin_file in found.items():
+            plugins[plugin_type][f'ansible.builtin.{name}'] = plugin_file
+
+    fragment_dir = os.path.join(ansible_base_dir, 'plugins', 'doc_fragments')
+    for name, plugin_file in _scan_plugin_dir(fragment_dir).items():
+        doc_fragments[name] = plugin_file.path
+        doc_fragments[f'ansible.builtin.{name}'] = plugin_file.path
+
+    for namespace, collection, collection_path in _find_collections(collection_dir):
+        collection_name = f'{namespace}.{collection}'
+        plugin_routing = _load_plugin_routing(os.path.join(collection_path, 'meta',
+                                                           'runtime.yml'))
+        plugins_dir = os.path.join(collection_path, 'plugins')
+        for plugin_type in DOCUMENTABLE_PLUGINS:
+            found = _scan_plugin_dir(os.path.join(plugins_dir, plugin_dir_name(plugin_type)),
+                                     plugin_type)
+            _apply_routing(collection_name, plugin_type, found, plugin_routing, redirects)
+            for name, plugin_file in found.items():
+                plugins[plugin_type][f'{collection_name}.{name}'] = plugin_file
+
+        fragment_dir = os.path.join(plugins_dir, 'doc_fragments')
+        for name, plugin_file in _scan_plugin_dir(fragment_dir).items():
+            doc_fragments[f'{collection_name}.{name}'] = plugin_file.path
+
+    return PluginInventory(plugins, doc_fragments, redirects)
+
+
+def find_plugin_files(ansible_base_dir: str, collection_dir: str
+                      ) -> t.Dict[str, t.Dict[str, str]]:
+    """
+    Find all of the documentable plugins in ansible-base and the installed collections.
+
+    :arg ansible_base_dir: The directory of the ``ansible`` python package.
+    :arg collection_dir: Directory in which the collections have been installed.  The collections
+        are in the ``ansible_collections`` subdirectory of it.
+    :returns: Mapping of plugin_type to a mapping of fqcn to the file with the plugin's docs.
+    """
+    return discover_plugins(ansible_base_dir, collection_dir).plugin_files()
+
+
+def find_doc_fragments(ansible_base_dir: str, collection_dir: str) -> t.Dict[str, str]:
+    """
+    Build an index of all of the documentation fragments.
+
+    :arg ansible_base_dir: The directory of the ``ansible`` python package.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :returns: Mapping of the names that plugins can use in ``extends_documentation_fragment`` to
+        the files which contain those fragments.
+    """
+    return discover_plugins(ansible_base_dir, collection_dir).doc_fragments
+
+
+def get_ansible_base_dir(venv: t.Union['VenvRunner', 'FakeVenvRunner']) -> str:
+    """
+    Find the directory of the ``ansible`` python package installed into a venv.
+
+    :arg venv: A VenvRunner into which Ansible has been installed.
+    :returns: The directory that the ``ansible`` package is in.
+    """
+    python = venv.get_command('python')
+    output = python('-c', 'import os.path, ansible; print(os.path.dirname(ansible.__file__))')
+    return output.stdout.decode('utf-8', errors='surrogateescape').strip()
@@ -0,0 +1,339 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Cache the documentation extracted from plugins between runs.
+
+The documentation of a plugin only depends on the plugin's source file, the documentation
+fragments that it extends, and the version of ansible-base which merges them.  The cache key is a
+hash of all of those so that an entry can be used whenever a plugin is byte-identical to one that
+was documented before, no matter which release it was shipped in.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import os.path
+import typing as t
+import zlib
+from collections.abc import Mapping
+from functools import lru_cache
+
+import yaml
+
+from ..compat import best_get_loop
+from ..disk_cache import DEFAULT_MAX_SIZE, DiskCache
+from ..logging import log
+from ..process_pool import process_pool
+from ..yaml import load_yaml
+from .discovery import discover_plugins
+from .static import StaticParsingError, read_doc_variables
+
+
+mlog = log.fields(mod=__name__)
+
+#: Change this when the format of the cached records changes to invalidate the old entries
+_CACHE_FORMAT: str = '1'
+
+#: Number of plugins to compute keys for in each task sent to the process pool
+_BATCH_SIZE: int = 64
+
+#: Signature of a function that extracts the documentation of the given plugins.  It is passed a
+#: mapping of plugin_type to fqcn to the file the plugin is in.
+ExtractorT = t.Callable[[t.Mapping[str, t.Mapping[str, str]]],
+                        t.Awaitable[t.Mapping[str, t.Mapping[str, t.Any]]]]
+
+
+def hash_file(filename: str) -> str:
+    """
+    Return the sha256 hex digest of a file.
+
+    Results are memoized because many plugins share the same doc fragments.  The memo is keyed on
+    the modification time and size of the file as well because the worker processes outlive a
+    single run.
+    """
+    stat_results = os.stat(filename)
+    return _hash_file(filename, stat_results.st_mtime_ns, stat_results.st_size)
+
+
+@lru_cache(maxsize=None)
+def _hash_file(filename: str, mtime: int, size: int) -> str:  # pylint:disable=unused-argument
+    file_hash = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_ansible_base_version(ansible_base_dir: str) -> str:
+    """
+    Read the version of ansible-base from its sources.
+
+    :arg ansible_base_dir: The directory of the ``ansible`` python package.
+    :returns: The version of ansible-base.
+    """
+    release_file = os.path.join(ansible_base_dir, 'release.py')
+    return str(read_doc_variables(release_file, ['__version__'])['__version__'])
+
+
+def referenced_fragments(filename: str) -> t.Optional[t.List[str]]:
+    """
+    Find the documentation fragments that a plugin extends.
+
+    :arg filename: The file that contains the plugin's documentation.
+    :returns: The names of the fragments or None if they cannot be found without running the
+        plugin's code.
+    """
+    try:
+        documentation = read_doc_variables(filename, ['DOCUMENTATION']).get('DOCUMENTATION')
+    except StaticParsingError:
+        return None
+
+    if not isinstance(documentation, str):
+        return None
+
+    # Parsing the YAML is expensive so skip it when the answer is obvious
+    if 'extends_documentation_fragment' not in documentation:
+        return []
+
+    try:
+        doc = load_yaml(documentation)
+    except yaml.YAMLError:
+        return None
+
+    if not isinstance(doc, Mapping):
+        return None
+
+    fragments = doc.get('extends_documentation_fragment') or []
+    if isinstance(fragments, str):
+        fragments = [fragments]
+    return [str(fragment) for fragment in fragments]
+
+
+def _fragment_file(fragment_slug: str, fragment_index: t.Mapping[str, str]) -> t.Optional[str]:
+    """Find the file for a fragment name the way that ansible-doc resolves it."""
+    if fragment_slug in fragment_index:
+        return fragment_index[fragment_slug]
+
+    if '.' in fragment_slug:
+        return fragment_index.get(fragment_slug.rsplit('.', 1)[0])
+
+    return None
+
+
+def plugin_cache_key(plugin_type: str, fqcn: str, filename: str,
+                     fragment_index: t.Mapping[str, str],
+                     ansible_base_version: str) -> t.Optional[str]:
+    """
+    Compute the key that a plugin's documentation is cached under.
+
+    :arg plugin_type: The type of the plugin.
+    :arg fqcn: The fqcn of the plugin.
+    :arg filename: The file that contains the plugin's documentation.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.  See
+        :func:`antsibull.docs_parsing.discovery.find_doc_fragments`.
+    :arg ansible_base_version: The version of ansible-base that the docs are extracted with.
+    :returns: A hex digest or None if the plugin's documentation cannot be cached.
+    """
+    fragments = referenced_fragments(filename)
+    if fragments is None:
+        return None
+
+    key = hashlib.sha256()
+    key.update('\0'.join((_CACHE_FORMAT, ansible_base_version, plugin_type, fqcn,
+                          hash_file(filename))).encode('utf-8'))
+    for fragment in sorted(frozenset(fragments)):
+        fragment_file = _fragment_file(fragment, fragment_index)
+        # Unknown fragments are part of the key by name so that the entry is not used once the
+        # fragment appears
+        fragment_hash = hash_file(fragment_file) if fragment_file else ''
+        key.update(f'\0{fragment}\0{fragment_hash}'.encode('utf-8'))
+
+    return key.hexdigest()
+
+
+def _plugin_cache_keys(plugins: t.Sequence[t.Tuple[str, str, str]],
+                       fragment_index: t.Mapping[str, str],
+                       ansible_base_version: str) -> t.List[t.Optional[str]]:
+    """
+    Compute the cache keys for a batch of plugins.  This runs in a worker process.
+
+    :arg plugins: Sequence of (plugin_type, fqcn, filename) for the plugins.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.
+    :arg ansible_base_version: The version of ansible-base that the docs are extracted with.
+    :returns: List with the key (or None if it could not be computed) for each plugin.
+    """
+    keys = []
+    for plugin_type, fqcn, filename in plugins:
+        try:
+            keys.append(plugin_cache_key(plugin_type, fqcn, filename, fragment_index,
+                                         ansible_base_version))
+        except OSError:
+            keys.append(None)
+    return keys
+
+
+async def get_plugin_cache_keys(plugin_files: t.Mapping[str, t.Mapping[str, str]],
+                                fragment_index: t.Mapping[str, str],
+                                ansible_base_version: str,
+                                max_workers: t.Optional[int] = None
+                                ) -> t.Dict[str, t.Dict[str, t.Optional[str]]]:
+    """
+    Compute the cache keys for many plugins.
+
+    :arg plugin_files: Mapping of plugin_type to fqcn to the file with the plugin's docs.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.
+    :arg ansible_base_version: The version of ansible-base that the docs are extracted with.
+    :kwarg max_workers: The number of processes to compute the keys in.  By default, the
+        process pool shared by the whole run is used.
+    :returns: Mapping of plugin_type to fqcn to the cache key of the plugin.  The key is None for
+        plugins which cannot be cached.
+    """
+    plugins = [(plugin_type, fqcn, filename)
+               for plugin_type, plugin_map in plugin_files.items()
+               for fqcn, filename in plugin_map.items()]
+
+    loop = best_get_loop()
+    with process_pool(max_workers) as executor:
+        hashers = [loop.run_in_executor(executor, _plugin_cache_keys,
+                                        plugins[start:start + _BATCH_SIZE], fragment_index,
+                                        ansible_base_version)
+                   for start in range(0, len(plugins), _BATCH_SIZE)]
+        batch_results = await asyncio.gather(*hashers)
+
+    keys: t.Dict[str, t.Dict[str, t.Optional[str]]] = {plugin_type: {}
+                                                       for plugin_type in plugin_files}
+    results = (key for batch in batch_results for key in batch)
+    for (plugin_type, fqcn, dummy_), key in zip(plugins, results):
+        keys[plugin_type][fqcn] = key
+
+    return keys
+
+
+class PluginDocCache:
+    """Store the documentation records of plugins in a :class:`antsibull.disk_cache.DiskCache`."""
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """
+        Create the cache.
+
+        :arg directory: Directory to store the cache in.
+        :kwarg max_size: The size in bytes that the cache is pruned to.
+        """
+        self._cache = DiskCache(directory, max_size=max_size)
+
+    def get(self, key: str, filename: t.Optional[str] = None) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        Retrieve a plugin record.
+
+        :arg key: The cache key of the plugin.  See :func:`plugin_cache_key`.
+        :kwarg filename: The file that the plugin is in now.  The key only depends on the
+            contents of the file so the record may have been stored for a copy of the plugin in
+            another place.  If given, the record's ``filename`` is set to this.
+        :returns: The information from ansible-doc --json for the plugin or None if the plugin
+            is not in the cache.
+        """
+        data = self._cache.get(key)
+        if data is None:
+            return None
+
+        try:
+            plugin_record = json.loads(zlib.decompress(data))
+        except (zlib.error, ValueError):
+            # A corrupted entry is the same as a missing one.  It will be overwritten.
+            return None
+
+        if filename is not None and isinstance(plugin_record.get('doc'), dict):
+            plugin_record['doc']['filename'] = filename
+        return plugin_record
+
+    def set(self, key: str, plugin_record: t.Mapping[str, t.Any]) -> None:
+        """
+        Store a plugin record.
+
+        :arg key: The cache key of the plugin.  See :func:`plugin_cache_key`.
+        :arg plugin_record: The information from ansible-doc --json for the plugin.
+        """
+        self._cache.set(key, zlib.compress(json.dumps(plugin_record).encode('utf-8')))
+
+    def prune(self) -> int:
+        """
+        Remove the least recently used records until the cache is small enough.
+
+        :returns: The number of records which were removed.
+        """
+        return self._cache.prune()
+
+
+async def find_plugins_with_keys(ansible_base_dir: str, collection_dir: str
+                                 ) -> t.Tuple[t.Dict[str, t.Dict[str, str]],
+                                              t.Dict[str, t.Dict[str, t.Optional[str]]]]:
+    """
+    Find all of the documentable plugins and compute their cache keys.
+
+    :arg ansible_base_dir: The directory of the ``ansible`` python package.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :returns: A tuple of the plugin files (see
+        :func:`antsibull.docs_parsing.discovery.find_plugin_files`) and a mapping of plugin_type to
+        fqcn to the cache key of the plugin (see :func:`get_plugin_cache_keys`).
+    """
+    inventory = discover_plugins(ansible_base_dir, collection_dir)
+    plugin_files = inventory.plugin_files()
+    keys = await get_plugin_cache_keys(plugin_files, inventory.doc_fragments,
+                                       get_ansible_base_version(ansible_base_dir))
+    return plugin_files, keys
+
+
+async def get_cached_plugin_info(cache_dir: str,
+                                 plugin_files: t.Mapping[str, t.Mapping[str, str]],
+                                 keys: t.Mapping[str, t.Mapping[str, t.Optional[str]]],
+                                 extract: ExtractorT,
+                                 max_size: int = DEFAULT_MAX_SIZE
+                                 ) -> t.Dict[str, t.Dict[str, t.Any]]:
+    """
+    Retrieve information about Ansible Plugins, extracting only the ones which are not cached.
+
+    :arg cache_dir: Directory to store the cache in.
+    :arg plugin_files: Mapping of plugin_type to fqcn to the file with the plugin's docs.  These
+        are the plugins to document.
+    :arg keys: Mapping of plugin_type to fqcn to the cache key of the plugin.  See
+        :func:`find_plugins_with_keys`.
+    :arg extract: Async function which extracts the documentation for the plugins which are not
+        in the cache.  It is passed a mapping of plugin_type to fqcn to the file the plugin is in
+        and returns the plugin information for them.
+    :kwarg max_size: The size in bytes that the cache is pruned to.
+    :returns: A nested directory structure with the same format as the return value of
+        :func:`antsibull.docs_parsing.ansible_doc.get_ansible_plugin_info`.
+    """
+    flog = mlog.fields(func='get_cached_plugin_info')
+
+    cache = PluginDocCache(cache_dir, max_size=max_size)
+    plugin_info: t.Dict[str, t.Dict[str, t.Any]] = {}
+    missing: t.Dict[str, t.Dict[str, str]] = {}
+    for plugin_type, plugin_map in plugin_files.items():
+        plugin_info[plugin_type] = {}
+        for fqcn, filename in plugin_map.items():
+            key = keys[plugin_type][fqcn]
+            plugin_record = cache.get(key, filename=filename) if key else None
+            if plugin_record is None:
+                missing.setdefault(plugin_type, {})[fqcn] = filename
+            else:
+                plugin_info[plugin_type][fqcn] = plugin_record
+
+    flog.fields(missing=sum(len(p) for p in missing.values())).debug('Finished reading cache')
+    if missing:
+        extracted_info = await extract(missing)
+        for plugin_type, plugin_map in extracted_info.items():
+            for fqcn, plugin_record in plugin_map.items():
+                key = keys.get(plugin_type, {}).get(fqcn)
+                # Errors (like timeouts) may not happen the next time so they are not cached
+                if key and 'error' not in plugin_record:
+                    cache.set(key, plugin_record)
+                plugin_info.setdefault(plugin_type, {})[fqcn] = plugin_record
+
+    cache.prune()
+    flog.debug('Finished updating cache')
+
+    return plugin_info
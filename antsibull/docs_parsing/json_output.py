@@ -0,0 +1,97 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Parse the JSON that ansible-doc prints.
+
+ansible-doc may print warnings and other messages around the JSON document.  The functions here
+find the document in the raw bytes of the output the same way that
+:func:`antsibull.vendored.json_utils._filter_non_json_lines` does it, but without decoding the
+output to a string and splitting it into lines first.  The docs of some network modules are
+hundreds of kilobytes so those copies add up.
+"""
+
+import json
+import re
+import typing as t
+
+try:
+    # orjson is much faster than the stdlib json module for big documents
+    import orjson
+except ImportError:
+    orjson = None
+
+
+#: Finds the first line that starts a JSON object or array
+_JSON_START = re.compile(rb'^[ \t\r\f\v]*([{\[])', flags=re.MULTILINE)
+
+_END_CHARS: t.Dict[int, bytes] = {ord('{'): b'}', ord('['): b']'}
+
+
+def find_json_payload(data: bytes) -> t.Tuple[int, int]:
+    """
+    Find the JSON document inside of command output.
+
+    Lines before the first line that starts with ``{`` or ``[`` and lines after the last line
+    which ends with the matching closing character are not part of the document.
+
+    :arg data: The output of the command.
+    :returns: The start and end offsets of the document in ``data``.
+    :raises ValueError: if there is no JSON document in ``data``.
+    """
+    match = _JSON_START.search(data)
+    if match is None:
+        raise ValueError('No start of json char found')
+    start = match.start()
+    end_char = _END_CHARS[data[match.start(1)]]
+
+    end = len(data)
+    while True:
+        end = data.rfind(end_char, start, end)
+        if end < 0:
+            raise ValueError('No end of json char found')
+
+        # The closing character has to be the last thing on its line
+        line_end = data.find(b'\n', end)
+        if line_end < 0:
+            line_end = len(data)
+        if not data[end + 1:line_end].strip():
+            return start, end + 1
+
+
+def loads_json(data: bytes) -> t.Any:
+    """
+    Parse a JSON document from bytes.
+
+    orjson is used if it is installed.  Documents which orjson rejects (for instance, because they
+    contain invalid UTF-8 or integers larger than 64 bits) are parsed with the stdlib json module
+    instead.  Invalid UTF-8 is decoded with ``surrogateescape``.
+
+    :arg data: The JSON document.
+    :returns: The parsed document.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+
+    try:
+        return json.loads(data)
+    except UnicodeDecodeError:
+        return json.loads(data.decode('utf-8', errors='surrogateescape'))
+
+
+def parse_json_output(data: bytes) -> t.Any:
+    """
+    Parse the JSON document in the output of a command.
+
+    :arg data: The output of the command.
+    :returns: The parsed document.
+    :raises ValueError: if there is no valid JSON document in ``data``.
+    """
+    start, end = find_json_payload(data)
+    if start != 0 or end != len(data):
+        data = data[start:end]
+    return loads_json(data)
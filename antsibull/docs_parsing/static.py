@@ -0,0 +1,337 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Parse documentation from ansible plugins without running ansible.
+
+The documentation of most plugins consists of string literals assigned to ``DOCUMENTATION``,
+``EXAMPLES``, and ``RETURN`` at the toplevel of the plugin's source file.  These can be read with
+:python:mod:`ast` and parsed as YAML without importing the plugin (or ansible) at all.  The
+``extends_documentation_fragment`` entries are resolved against the ``doc_fragments`` of
+ansible-base and of the installed collections in the same way that ansible-doc does it.
+
+Plugins which cannot be documented this way (for instance, because they compute their
+documentation at runtime) are returned separately so that they can be documented by ansible-doc
+instead.
+"""
+
+import ast
+import asyncio
+import datetime
+import json
+import os
+import typing as t
+from collections.abc import MutableMapping, MutableSequence, MutableSet
+from functools import lru_cache
+
+import yaml
+
+from ..compat import best_get_loop
+from ..constants import DOCUMENTABLE_PLUGINS
+from ..logging import log
+from ..process_pool import process_pool
+from ..yaml import load_yaml
+from .discovery import discover_plugins
+
+
+mlog = log.fields(mod=__name__)
+
+#: Number of plugins to document in each task sent to the process pool
+_BATCH_SIZE: int = 64
+
+#: Mapping of the toplevel variables in a plugin to the fields of ansible-doc's output
+_DOC_VARIABLES: t.Dict[str, str] = {
+    'DOCUMENTATION': 'doc',
+    'EXAMPLES': 'examples',
+    'RETURN': 'return',
+    'ANSIBLE_METADATA': 'metadata',
+}
+
+
+class StaticParsingError(Exception):
+    """Error raised when a plugin's documentation cannot be read without running ansible."""
+
+
+def _literal_value(node: ast.AST, filename: str, variable: str) -> t.Any:
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        raise StaticParsingError(f'{variable} in {filename} is not a literal')
+
+
+def _parse_python_file(filename: str) -> ast.Module:
+    with open(filename, 'rb') as f:
+        source = f.read()
+
+    try:
+        return ast.parse(source, filename)
+    except (SyntaxError, ValueError) as e:
+        raise StaticParsingError(f'Unable to parse {filename}: {e}')
+
+
+def read_doc_variables(filename: str, variables: t.Iterable[str]) -> t.Dict[str, t.Any]:
+    """
+    Read the literal values of toplevel variables from a python file.
+
+    :arg filename: The python file to read.
+    :arg variables: The names of the variables to read.
+    :returns: Mapping of variable name to value for the variables that are set in the file.
+    :raises StaticParsingError: if the file could not be parsed or one of the variables is not set
+        to a literal value.
+    """
+    wanted = frozenset(variables)
+    values = {}
+    for node in _parse_python_file(filename).body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id in wanted:
+                    values[target.id] = _literal_value(node.value, filename, target.id)
+
+    return values
+
+
+def _read_fragment_file(filename: str) -> t.Dict[str, t.Any]:
+    """
+    Read the fragments defined in a doc_fragments file.
+
+    The fragments are uppercase class variables of the ``ModuleDocFragment`` class.  Only string
+    literals can be read.  Anything else is left out so that it is reported as an unknown fragment
+    if a plugin tries to use it.  Results are memoized until the file changes.
+    """
+    stat_results = os.stat(filename)
+    return _read_fragment_file_cached(filename, stat_results.st_mtime_ns, stat_results.st_size)
+
+
+@lru_cache(maxsize=None)
+def _read_fragment_file_cached(filename: str, mtime: int,  # pylint:disable=unused-argument
+                               size: int) -> t.Dict[str, t.Any]:  # pylint:disable=unused-argument
+    values = {}
+    for node in _parse_python_file(filename).body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for child in node.body:
+            if not isinstance(child, ast.Assign):
+                continue
+            for target in child.targets:
+                if isinstance(target, ast.Name) and target.id.isupper():
+                    try:
+                        values[target.id] = ast.literal_eval(child.value)
+                    except ValueError:
+                        pass
+
+    return values
+
+
+def _load_yaml(data: t.Any, filename: str) -> t.Any:
+    if not isinstance(data, str):
+        return data
+
+    try:
+        return load_yaml(data)
+    except yaml.YAMLError as e:
+        raise StaticParsingError(f'Unable to parse the YAML in {filename}: {e}')
+
+
+def _get_fragment(fragment_slug: str, fragment_index: t.Mapping[str, str],
+                  filename: str) -> t.Dict[str, t.Any]:
+    """
+    Load a documentation fragment the way that ansible-doc does it.
+
+    Fragments may specify a variable other than DOCUMENTATION with a ``.`` separator.  This is
+    complicated by collection-hosted fragments using the same separator.  So first try to load the
+    fragment as specified and if that fails, assume that the rightmost component is a variable.
+    """
+    fragment_name = fragment_slug
+    fragment_var = 'DOCUMENTATION'
+    if fragment_name not in fragment_index and '.' in fragment_slug:
+        fragment_name, fragment_var = fragment_slug.rsplit('.', 1)
+        fragment_var = fragment_var.upper()
+
+    if fragment_name not in fragment_index:
+        raise StaticParsingError(f'unknown doc_fragment {fragment_slug} in file {filename}')
+
+    fragment_yaml = _read_fragment_file(fragment_index[fragment_name]).get(fragment_var)
+    if fragment_yaml is None:
+        if fragment_var != 'DOCUMENTATION':
+            raise StaticParsingError(f'unknown doc_fragment {fragment_slug} in file {filename}')
+        fragment_yaml = '{}'
+
+    fragment = _load_yaml(fragment_yaml, fragment_index[fragment_name])
+    if not isinstance(fragment, MutableMapping) or 'options' not in fragment:
+        raise StaticParsingError(f'missing options in fragment ({fragment_name}), possibly'
+                                 f' misformatted?: {filename}')
+    return fragment
+
+
+def _merge_fragment(target: t.MutableMapping[str, t.Any], source: t.Mapping[str, t.Any]) -> None:
+    for key, value in source.items():
+        if key in target:
+            # Assumes both structures have the same type
+            if isinstance(target[key], MutableMapping):
+                value.update(target[key])
+            elif isinstance(target[key], MutableSet):
+                value.add(target[key])
+            elif isinstance(target[key], MutableSequence):
+                value = sorted(frozenset(value + target[key]))
+            else:
+                raise StaticParsingError('Attempt to extend a documentation fragment, invalid'
+                                         f' type for {key}')
+        target[key] = value
+
+
+def add_fragments(doc: t.MutableMapping[str, t.Any], filename: str,
+                  fragment_index: t.Mapping[str, str]) -> None:
+    """
+    Merge the documentation fragments that a plugin uses into its documentation.
+
+    This follows the rules that ansible-doc uses for merging fragments.
+
+    :arg doc: The parsed DOCUMENTATION of the plugin.  This is modified in place.
+    :arg filename: The file that the documentation came from.  Used for error messages.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.  See
+        :func:`antsibull.docs_parsing.discovery.find_doc_fragments`.
+    """
+    fragments = doc.pop('extends_documentation_fragment', [])
+    if isinstance(fragments, str):
+        fragments = [fragments]
+
+    for fragment_slug in fragments:
+        fragment = _get_fragment(fragment_slug, fragment_index, filename)
+
+        for list_field in ('notes', 'seealso'):
+            entries = fragment.pop(list_field, None)
+            if entries:
+                doc.setdefault(list_field, []).extend(entries)
+
+        if 'options' in doc:
+            _merge_fragment(doc['options'], fragment.pop('options'))
+        else:
+            doc['options'] = fragment.pop('options')
+
+        # Merge the rest of the sections
+        _merge_fragment(doc, fragment)
+
+
+def _json_default(obj: t.Any) -> t.Any:
+    """Serialize the values that YAML can create but JSON cannot, like ansible-doc does."""
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
+def get_static_plugin_doc(plugin_type: str, filename: str,
+                          fragment_index: t.Mapping[str, str]) -> t.Dict[str, t.Any]:
+    """
+    Read the documentation for one plugin from its source file.
+
+    :arg plugin_type: The type of the plugin.
+    :arg filename: The file that contains the plugin's documentation.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.  See
+        :func:`antsibull.docs_parsing.discovery.find_doc_fragments`.
+    :returns: The same data that ansible-doc --json returns for this plugin.
+    :raises StaticParsingError: if the documentation could not be read statically.
+    """
+    variables = read_doc_variables(filename, _DOC_VARIABLES)
+    if 'DOCUMENTATION' not in variables:
+        raise StaticParsingError(f'{filename} did not contain a DOCUMENTATION attribute')
+
+    doc = _load_yaml(variables['DOCUMENTATION'], filename)
+    if not isinstance(doc, MutableMapping):
+        raise StaticParsingError(f'DOCUMENTATION in {filename} is not a mapping')
+    add_fragments(doc, filename, fragment_index)
+    doc['filename'] = filename
+
+    examples = variables.get('EXAMPLES')
+    if examples is not None and not isinstance(examples, str):
+        raise StaticParsingError(f'EXAMPLES in {filename} is not a string')
+
+    record = {
+        'doc': doc,
+        'examples': examples,
+        'return': _load_yaml(variables.get('RETURN'), filename),
+        'metadata': variables.get('ANSIBLE_METADATA'),
+    }
+
+    # Make sure that the data has exactly the types that ansible-doc's JSON output would have
+    return json.loads(json.dumps(record, default=_json_default))
+
+
+def _get_static_plugin_docs(plugins: t.Sequence[t.Tuple[str, str, str]],
+                            fragment_index: t.Mapping[str, str]
+                            ) -> t.List[t.Tuple[t.Optional[t.Dict[str, t.Any]], str]]:
+    """
+    Read the documentation for a batch of plugins.  This runs in a worker process.
+
+    :arg plugins: Sequence of (plugin_type, fqcn, filename) for the plugins to document.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.
+    :returns: List with a tuple of (plugin record, error message) for each plugin.  If the plugin
+        record is None, the error message says why it could not be read.
+    """
+    results = []
+    for plugin_type, dummy_, filename in plugins:
+        try:
+            results.append((get_static_plugin_doc(plugin_type, filename, fragment_index), ''))
+        except Exception as e:  # pylint:disable=broad-except
+            # Anything that goes wrong means that ansible-doc needs to handle this plugin.
+            # Return the error as a string because not all exceptions can be pickled.
+            results.append((None, str(e)))
+    return results
+
+
+async def get_static_plugin_info(ansible_base_dir: str, collection_dir: str,
+                                 max_workers: t.Optional[int] = None,
+                                 plugin_files: t.Optional[
+                                     t.Mapping[str, t.Mapping[str, str]]] = None
+                                 ) -> t.Tuple[t.Dict[str, t.Dict[str, t.Any]],
+                                              t.Dict[str, t.Dict[str, str]]]:
+    """
+    Retrieve information about all of the Ansible Plugins without running ansible-doc.
+
+    :arg ansible_base_dir: The directory of the ``ansible`` python package.
+    :arg collection_dir: Directory in which the collections have been installed.
+    :kwarg max_workers: The number of processes to parse the plugins in.  By default, the
+        process pool shared by the whole run is used.
+    :kwarg plugin_files: If given, only document these plugins.  This is a mapping of plugin_type
+        to fqcn to the file with the plugin's docs, as returned by
+        :func:`antsibull.docs_parsing.discovery.find_plugin_files`.
+    :returns: A tuple of the plugin information and the plugins which could not be documented
+        statically.  The plugin information has the same structure as the return value of
+        :func:`antsibull.docs_parsing.ansible_doc.get_ansible_plugin_info`.  The plugins which
+        could not be documented are a mapping of plugin_type to fqcn to the reason they couldn't
+        be documented.  These should be documented with ansible-doc instead.
+    """
+    flog = mlog.fields(func='get_static_plugin_info')
+
+    inventory = discover_plugins(ansible_base_dir, collection_dir)
+    if plugin_files is None:
+        plugin_files = inventory.plugin_files()
+    fragment_index = inventory.doc_fragments
+    flog.debug('Finished finding plugin files')
+
+    plugins = [(plugin_type, fqcn, filename)
+               for plugin_type, plugin_map in plugin_files.items()
+               for fqcn, filename in plugin_map.items()]
+
+    loop = best_get_loop()
+    with process_pool(max_workers) as executor:
+        extractors = [loop.run_in_executor(executor, _get_static_plugin_docs,
+                                           plugins[start:start + _BATCH_SIZE], fragment_index)
+                      for start in range(0, len(plugins), _BATCH_SIZE)]
+        batch_results = await asyncio.gather(*extractors)
+
+    plugin_info: t.Dict[str, t.Dict[str, t.Any]] = {plugin_type: {}
+                                                    for plugin_type in DOCUMENTABLE_PLUGINS}
+    unhandled: t.Dict[str, t.Dict[str, str]] = {}
+    results = (result for batch in batch_results for result in batch)
+    for (plugin_type, fqcn, dummy_), (plugin_record, error) in zip(plugins, results):
+        if plugin_record is None:
+            unhandled.setdefault(plugin_type, {})[fqcn] = error
+            continue
+        plugin_info[plugin_type][fqcn] = plugin_record
+
+    flog.fields(unhandled=sum(len(p) for p in unhandled.values())).debug(
+        'Finished parsing plugins statically')
+    return plugin_info, unhandled
@@ -2,12 +2,20 @@
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 
+import functools
+import hashlib
 import json
+import os
 import os.path
+import sys
 
-from jinja2 import Environment, FileSystemLoader, PackageLoader
+import jinja2
+from jinja2 import BytecodeCache, Environment, FileSystemLoader, PackageLoader
+from jinja2.bccache import Bucket
 
-from .filters import do_max, documented_type, html_ify, rst_ify, rst_fmt, rst_xline
+from ..disk_cache import DiskCache
+
+from .filters import do_max, documented_type, html_ify_page, rst_ify_page, rst_fmt, rst_xline
 from .tests import still_relevant, test_list
 
 
@@ -28,7 +36,101 @@ def from_kludge_ns(key):
     return NS_MAP[key]
 
 
-def doc_environment(template_location):
+#: Environment variable with the directory to cache compiled templates in.  Set it to an empty
+#: string to not cache them on disk.
+TEMPLATE_CACHE_ENV_VAR = 'ANTSIBULL_TEMPLATE_CACHE'
+
+#: The compiled templates are tiny so the cache does not need to be large
+_TEMPLATE_CACHE_MAX_SIZE = 16 * 1024 * 1024
+
+
+def _environment_fingerprint(environment):
+    # The settings which change the code that templates compile to
+    autoescape = environment.autoescape
+    return repr((
+        environment.block_start_string, environment.block_end_string,
+        environment.variable_start_string, environment.variable_end_string,
+        environment.comment_start_string, environment.comment_end_string,
+        environment.line_statement_prefix, environment.line_comment_prefix,
+        environment.trim_blocks, environment.lstrip_blocks, environment.newline_sequence,
+        environment.keep_trailing_newline, environment.optimized,
+        getattr(autoescape, '__qualname__', autoescape),
+        sorted(environment.extensions),
+    ))
+
+
+class ContentHashBytecodeCache(BytecodeCache):
+    """
+    Cache compiled templates on disk, keyed by a hash of their source.
+
+    Unlike jinja2's own bytecode caches, the key does not depend on where the template was loaded
+    from so the same entries are used by every installation, checkout, and process.
+    """
+
+    def __init__(self, directory, max_size=_TEMPLATE_CACHE_MAX_SIZE):
+        """
+        Create the cache.
+
+        :arg directory: Directory to store the compiled templates in.
+        :kwarg max_size: The size in bytes that the cache is pruned to.
+        """
+        self._cache = DiskCache(directory, max_size=max_size)
+        self._pruned = False
+
+    def get_bucket(self, environment, name, filename, source):
+        key = hashlib.sha256('\0'.join((
+            jinja2.__version__, sys.version, _environment_fingerprint(environment), name,
+            source)).encode('utf-8')).hexdigest()
+        bucket = Bucket(environment, key, self.get_source_checksum(source))
+        self.load_bytecode(bucket)
+        return bucket
+
+    def load_bytecode(self, bucket):
+        data = self._cache.get(bucket.key)
+        if data is not None:
+            bucket.bytecode_from_string(data)
+
+    def dump_bytecode(self, bucket):
+        # The cache only saves time so a cache which cannot be written to is not an error
+        try:
+            self._cache.set(bucket.key, bucket.bytecode_to_string())
+            # Scanning the cache is much slower than writing to it.  Only writes make the cache
+            # grow so pruning once, after the first write of the process, is enough to keep it
+            # bounded.
+            if not self._pruned:
+                self._pruned = True
+                self._cache.prune()
+        except OSError:
+            pass
+
+
+def template_cache_dir():
+    """
+    Return the directory that compiled templates are cached in.
+
+    :returns: The directory from the :data:`TEMPLATE_CACHE_ENV_VAR` environment variable, by
+        default ``antsibull/templates`` in the user's cache directory.  None if templates should
+        not be cached on disk.
+    """
+    directory = os.environ.get(TEMPLATE_CACHE_ENV_VAR)
+    if directory is None:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        directory = os.path.join(cache_home, 'antsibull', 'templates')
+    return directory or None
+
+
+@functools.lru_cache(maxsize=None)
+def _bytecode_cache():
+    directory = template_cache_dir()
+    if directory is None:
+        return None
+    try:
+        return ContentHashBytecodeCache(directory)
+    except OSError:
+        return None
+
+
+def doc_environment(template_location, bytecode_cache=None):
     if isinstance(template_location, str) and os.path.exists(template_location):
         loader = FileSystemLoader(template_location)
     else:
@@ -44,7 +146,8 @@ def doc_environment(template_location):
     env = Environment(loader=loader,
                       variable_start_string="@{",
                       variable_end_string="}@",
-                      trim_blocks=True)
+                      trim_blocks=True,
+                      bytecode_cache=bytecode_cache)
     env.globals['xline'] = rst_xline
 
     # Can be removed (and template switched to use namespace) when we no longer need to build
@@ -59,8 +162,9 @@ def doc_environment(template_location):
         # Jinja < 2.9
         env.filters['tojson'] = json.dumps
 
-    env.filters['rst_ify'] = rst_ify
-    env.filters['html_ify'] = html_ify
+    # These check the links when the template is rendered with a link_checker variable
+    env.filters['rst_ify'] = rst_ify_page
+    env.filters['html_ify'] = html_ify_page
     env.filters['fmt'] = rst_fmt
     env.filters['xline'] = rst_xline
     env.filters['documented_type'] = documented_type
@@ -68,3 +172,40 @@ def doc_environment(template_location):
     env.tests['still_relevant'] = still_relevant
 
     return env
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_doc_environment(template_location):
+    return doc_environment(template_location, bytecode_cache=_bytecode_cache())
+
+
+def get_doc_environment(template_location=('antsibull.data', 'docsite')):
+    """
+    Return the environment for a template location which is shared by the whole process.
+
+    The environment keeps the templates that it has compiled so each template is only compiled
+    once per process.  The compiled templates are also cached on disk (see
+    :func:`template_cache_dir`) so that new processes do not have to compile them either.
+
+    :kwarg template_location: See :func:`doc_environment`.  This has to be hashable.
+    """
+    return _shared_doc_environment(template_location)
+
+
+@functools.lru_cache(maxsize=None)
+def _data_environment():
+    # The same settings as jinja2.Template() uses
+    return Environment(loader=PackageLoader('antsibull', 'data'),
+                       bytecode_cache=_bytecode_cache())
+
+
+def get_data_template(name):
+    """
+    Return one of the templates in :mod:`antsibull.data` which the build commands use.
+
+    The templates are loaded through an environment which is shared by the whole process and
+    which caches the compiled templates on disk.
+
+    :arg name: The path of the template relative to the data directory, separated by slashes.
+    """
+    return _data_environment().get_template(name)
@@ -18,6 +18,14 @@ except ImportError:
 
 from jinja2.runtime import Undefined
 
+from ..link_index import module_label
+
+try:
+    from jinja2 import pass_context
+except ImportError:
+    # Jinja < 3.0
+    from jinja2 import contextfilter as pass_context
+
 
 _ITALIC = re.compile(r"I\(([^)]+)\)")
 _BOLD = re.compile(r"B\(([^)]+)\)")
@@ -29,8 +37,32 @@ _CONST = re.compile(r"C\(([^)]+)\)")
 _RULER = re.compile(r"HORIZONTALLINE")
 
 
-def html_ify(text):
-    ''' convert symbols like I(this is in italics) to valid HTML '''
+def _check_links(text, link_checker, plugin):
+    ''' report the links in text which do not resolve to the link_checker '''
+
+    for match in _MODULE.finditer(text):
+        link_checker.check_module(plugin, match.group(1))
+    for match in _LINK.finditer(text):
+        link_checker.check_link(plugin, match.group(1), match.group(2))
+    for match in _REF.finditer(text):
+        link_checker.check_ref(plugin, match.group(1), match.group(2))
+
+
+def _rst_module_ref(match):
+    name = match.group(1)
+    return ":ref:`%s <%s>`" % (name, module_label(name))
+
+
+def html_ify(text, link_checker=None, plugin=None):
+    ''' convert symbols like I(this is in italics) to valid HTML
+
+    If a link_checker (see antsibull.link_index.LinkChecker) is given, the links are checked.
+    This does not change the output.  plugin is the (plugin_type, fqcn) of the page that text is
+    on.
+    '''
+
+    if link_checker is not None:
+        _check_links(text, link_checker, plugin)
 
     t = html_escape(text)
     t = _ITALIC.sub(r"<em>\1</em>", t)
@@ -66,12 +98,20 @@ def do_max(seq):
     return max(seq)
 
 
-def rst_ify(text):
-    ''' convert symbols like I(this is in italics) to valid restructured text '''
+def rst_ify(text, link_checker=None, plugin=None):
+    ''' convert symbols like I(this is in italics) to valid restructured text
+
+    If a link_checker (see antsibull.link_index.LinkChecker) is given, the links are checked.
+    This does not change the output.  plugin is the (plugin_type, fqcn) of the page that text is
+    on.
+    '''
+
+    if link_checker is not None:
+        _check_links(text, link_checker, plugin)
 
     t = _ITALIC.sub(r"*\1*", text)
     t = _BOLD.sub(r"**\1**", t)
-    t = _MODULE.sub(r":ref:`\1 <\1_module>`", t)
+    t = _MODULE.sub(_rst_module_ref, t)
     t = _LINK.sub(r"`\1 <\2>`_", t)
     t = _URL.sub(r"\1", t)
     t = _REF.sub(r":ref:`\1 <\2>`", t)
@@ -91,3 +131,26 @@ def rst_xline(width, char="="):
     ''' return a restructured text line of a given length '''
 
     return char * width
+
+
+def _page_plugin(context):
+    ''' return the link_checker of a template context and the plugin whose page it renders '''
+
+    link_checker = context.get('link_checker')
+    if link_checker is None:
+        return None, None
+    return link_checker, (context.get('plugin_type'), context.get('plugin_name'))
+
+
+@pass_context
+def rst_ify_page(context, text):
+    ''' rst_ify which checks the links if the template is rendered with a link_checker '''
+
+    return rst_ify(text, *_page_plugin(context))
+
+
+@pass_context
+def html_ify_page(context, text):
+    ''' html_ify which checks the links if the template is rendered with a link_checker '''
+
+    return html_ify(text, *_page_plugin(context))
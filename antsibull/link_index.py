@@ -0,0 +1,190 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Check the links in plugin documentation while the pages are rendered.
+
+The ``M()``, ``L()``, and ``R()`` markup in plugin docs links to other plugins, to rst labels, and
+to the anchors of options and return values.  Whether those targets exist used to only be found
+out by a full Sphinx build.  :class:`LinkIndex` knows every target that the plugin pages will
+create so that the ``rst_ify`` and ``html_ify`` filters can look each link up as they render it.
+A :class:`LinkChecker` collects the links which do not resolve into one report.
+"""
+
+import re
+import typing as t
+from collections import defaultdict
+
+from .constants import DOCUMENTABLE_PLUGINS
+from .docs_parsing.fqcn import get_fqcn_parts
+
+#: The plugin_type and fqcn of a plugin
+PluginKeyT = t.Tuple[str, str]
+
+#: rst labels which look like they are created for plugin pages.  References to other labels may
+#: point to pages outside of the plugin docs so they cannot be checked.
+_GENERATED_LABEL_RE = re.compile(r'^ansible_collections\.|^plugins_in_|_(%s)$'
+                                 % '|'.join(sorted(DOCUMENTABLE_PLUGINS)))
+
+
+def _entry_anchors(prefix: str, entries: t.Optional[t.Mapping[str, t.Any]],
+                   suboption_entry: str) -> t.Iterator[str]:
+    """Yield the html anchors of (nested) options or return values from their ``full_key``."""
+    stack = [entries]
+    while stack:
+        current = stack.pop()
+        if not current:
+            continue
+        for entry in current.values():
+            yield prefix + '/'.join(entry['full_key'])
+            stack.append(entry.get(suboption_entry))
+
+
+def module_label(name: str) -> str:
+    """
+    Return the rst label that ``M(name)`` links to.
+
+    This only depends on the name so that a page is rendered the same whether or not its links
+    are checked.
+
+    :arg name: The name of the module.
+    :returns: The label of the plugin page for a fqcn.  Other names link to the short name label
+        which the pages of ansible.builtin modules and module aliases create.
+    """
+    try:
+        namespace, collection, short_name = get_fqcn_parts(name)
+    except ValueError:
+        return f'{name}_module'
+    return f'ansible_collections.{namespace}.{collection}.plugins.module.{short_name}'
+
+
+class LinkIndex:
+    """The link targets that the plugin pages of a docsite create."""
+
+    def __init__(self) -> None:
+        #: Mapping of (plugin_type, fqcn) to the html anchors of the options and return values
+        self._anchors: t.Dict[PluginKeyT, t.FrozenSet[str]] = {}
+        #: The rst labels which the pages create
+        self._labels: t.Set[str] = {'list_of_collections'}
+
+    def add_plugin(self, plugin_type: str, fqcn: str, plugin_record: t.Mapping[str, t.Any]
+                   ) -> None:
+        """
+        Add the link targets of one plugin's page.
+
+        :arg plugin_type: The type of the plugin.
+        :arg fqcn: The fqcn of the plugin.
+        :arg plugin_record: The normalized and augmented record of the plugin.  The anchors are
+            made from the ``full_key`` of the options and return values.
+        """
+        namespace, collection, dummy_ = get_fqcn_parts(fqcn)
+        collection_name = f'{namespace}.{collection}'
+        doc = plugin_record['doc']
+
+        # These have to match the labels that plugin.rst.j2 and plugins_by_collection.rst.j2
+        # create
+        self._labels.add(
+            f'ansible_collections.{collection_name}.plugins.{plugin_type}.{doc["name"]}')
+        self._labels.add(f'plugins_in_{collection_name}')
+        if collection_name == 'ansible.builtin':
+            self._labels.add(f'{doc["name"]}_{plugin_type}')
+        for alias in doc.get('aliases') or ():
+            self._labels.add(f'{alias}_{plugin_type}')
+
+        anchors = set(_entry_anchors('parameter-', doc.get('options'), 'suboptions'))
+        anchors.update(_entry_anchors('return-', plugin_record.get('return'), 'contains'))
+        self._anchors[(plugin_type, fqcn)] = frozenset(anchors)
+
+    def has_label(self, label: str) -> bool:
+        """Return whether one of the pages creates an rst label."""
+        return label in self._labels
+
+    def has_anchor(self, plugin_type: str, fqcn: str, anchor: str) -> bool:
+        """Return whether a plugin's page has an html anchor."""
+        return anchor in self._anchors.get((plugin_type, fqcn), ())
+
+
+def build_link_index(plugin_info: t.Mapping[str, t.Mapping[str, t.Mapping[str, t.Any]]]
+                     ) -> LinkIndex:
+    """
+    Index the link targets of the plugin pages that are going to be written.
+
+    :arg plugin_info: Mapping of plugin_type to fqcn to the normalized and augmented record.
+    :returns: The index.
+    """
+    index = LinkIndex()
+    for plugin_type, plugins in plugin_info.items():
+        for fqcn, plugin_record in plugins.items():
+            index.add_plugin(plugin_type, fqcn, plugin_record)
+    return index
+
+
+class LinkChecker:
+    """Check the links in plugin docs and collect the ones which are broken."""
+
+    def __init__(self, index: LinkIndex) -> None:
+        """
+        Create the checker.
+
+        :arg index: The link targets of the docsite.
+        """
+        self.index = index
+        #: Mapping of plugin_type to plugin_name to the broken links on that plugin's page
+        self.broken_links: t.DefaultDict[str, t.Dict[str, t.List[str]]] = defaultdict(dict)
+
+    def _report(self, plugin: PluginKeyT, message: str) -> None:
+        messages = self.broken_links[plugin[0]].setdefault(plugin[1], [])
+        if message not in messages:
+            messages.append(message)
+
+    def check_module(self, plugin: PluginKeyT, name: str) -> None:
+        """
+        Check the page that ``M(name)`` links to.  See :func:`module_label`.
+
+        :arg plugin: The plugin_type and fqcn of the page that the link is on.
+        :arg name: The name of the module.
+        """
+        if not self.index.has_label(module_label(name)):
+            self._report(plugin, f'M({name}): there is no page for a module named {name}')
+
+    def check_ref(self, plugin: PluginKeyT, text: str, label: str) -> None:
+        """
+        Check the label that ``R(text, label)`` refers to.
+
+        Only labels which look like the labels of plugin pages can be checked.  Others may be
+        created by pages outside of the plugin docs.
+
+        :arg plugin: The plugin_type and fqcn of the page that the link is on.
+        :arg text: The text of the link.
+        :arg label: The rst label.
+        """
+        if not self.index.has_label(label) and _GENERATED_LABEL_RE.search(label):
+            self._report(plugin, f'R({text}, {label}): there is no label {label}')
+
+    def check_link(self, plugin: PluginKeyT, text: str, url: str) -> None:
+        """
+        Check the url that ``L(text, url)`` links to.
+
+        Only links to anchors on the same page (``#parameter-...``, ``#return-...``) can be
+        checked.
+
+        :arg plugin: The plugin_type and fqcn of the page that the link is on.
+        :arg text: The text of the link.
+        :arg url: The url.
+        """
+        if url.startswith('#') and not self.index.has_anchor(plugin[0], plugin[1], url[1:]):
+            self._report(plugin, f'L({text}, {url}): there is no option or return value'
+                         f' {url[1:]} on this page')
+
+    def count(self) -> int:
+        """Return the number of broken links."""
+        return sum(len(messages) for plugins in self.broken_links.values()
+                   for messages in plugins.values())
+
+    def report(self) -> str:
+        """Return a report of the broken links with one line for each link."""
+        return ''.join(f'{plugin_type} {plugin_name}: {message}\n'
+                       for plugin_type, plugins in sorted(self.broken_links.items())
+                       for plugin_name, messages in sorted(plugins.items())
+                       for message in messages)
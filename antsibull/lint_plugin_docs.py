@@ -0,0 +1,382 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Validate the documentation of the plugins in a collection without building the docs.
+
+The docs are read from the plugins' source files (see :mod:`antsibull.docs_parsing.static`) and
+validated against the schemas in :mod:`antsibull.schemas` in the shared process pool.  The result
+for each plugin is cached under a hash of the plugin's file, the documentation fragments that it
+extends, and the schemas so that unchanged plugins are not validated again.  Plugins whose
+documentation cannot be read from the source are documented with ansible-doc instead, like when
+building the docs.
+"""
+
+import ast
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import os.path
+import sys
+import tempfile
+import typing as t
+
+import sh
+import yaml
+from pydantic import ValidationError
+
+from .compat import best_get_loop
+from .disk_cache import DiskCache
+from .docs_parsing.ansible_doc import ParsingError, ansible_doc_name, get_ansible_plugin_info
+from .docs_parsing.discovery import discover_plugins
+from .docs_parsing.doc_cache import get_ansible_base_version, plugin_cache_key
+from .docs_parsing.static import StaticParsingError, get_static_plugin_doc
+from .logging import log
+from .normalization_cache import schema_fingerprint
+from .process_pool import process_pool
+from .schemas.docs import DOCS_SCHEMAS
+from .schemas.normalize import normalize
+from .venv import FakeVenvRunner
+from .yaml import load_yaml_file
+
+
+mlog = log.fields(mod=__name__)
+
+#: Change this when the format of the cached results changes to invalidate the old entries
+_CACHE_FORMAT: str = '1'
+
+#: Stands in for the plugin's filename in the cached messages.  The same file may be found in a
+#: different location the next time.
+_FILENAME_MARKER: str = '\0'
+
+#: Number of plugins to validate in each task sent to the process pool
+_BATCH_SIZE: int = 32
+
+#: Mapping of the fields of a plugin record to the toplevel variables they are read from
+_FIELD_VARIABLES: t.Dict[str, str] = {
+    'doc': 'DOCUMENTATION',
+    'examples': 'EXAMPLES',
+    'return': 'RETURN',
+}
+
+#: A problem in a plugin's documentation: line, column, and message.  The line and column are 0
+#: when the problem cannot be located.
+PluginErrorT = t.Tuple[int, int, str]
+
+#: A problem in a collection's documentation: path, line, column, and message
+LintErrorT = t.Tuple[str, int, int, str]
+
+
+def find_ansible_base_dir() -> t.Optional[str]:
+    """
+    Find the ``ansible`` python package which is installed for this python.
+
+    :returns: The directory of the package or None if it is not installed.
+    """
+    spec = importlib.util.find_spec('ansible')
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return list(spec.submodule_search_locations)[0]
+
+
+def _variable_positions(filename: str) -> t.Dict[str, t.Tuple[int, int]]:
+    """Return the line and column at which each toplevel variable of a python file is set."""
+    try:
+        with open(filename, 'rb') as f:
+            module = ast.parse(f.read(), filename)
+    except (OSError, SyntaxError, ValueError):
+        return {}
+
+    positions = {}
+    for node in module.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    positions[target.id] = (node.lineno, node.col_offset + 1)
+    return positions
+
+
+def _validation_messages(variable: str, error: ValidationError) -> t.List[str]:
+    messages = []
+    for problem in error.errors():
+        # The first entry of the location is the field of the plugin record
+        location = '.'.join(str(part) for part in (variable, ) + tuple(problem['loc'][1:]))
+        messages.append(f'{location}: {problem["msg"]}')
+    return messages
+
+
+def validate_plugin_record(plugin_type: str, filename: str,
+                           plugin_record: t.Mapping[str, t.Any]) -> t.List[PluginErrorT]:
+    """
+    Validate the documentation of one plugin once it has been read.
+
+    :arg plugin_type: The type of the plugin.
+    :arg filename: The file that contains the plugin's documentation.  It is used to locate the
+        problems.
+    :arg plugin_record: The plugin's documentation in the format of ansible-doc's JSON output.
+    :returns: List of the problems that were found.
+    """
+    problems: t.List[t.Tuple[str, str]] = []
+    for field, variable in _FIELD_VARIABLES.items():
+        try:
+            normalize(DOCS_SCHEMAS[plugin_type][field], {field: plugin_record.get(field)})
+        except ValidationError as e:
+            problems.extend((variable, message) for message in _validation_messages(variable, e))
+
+    if not problems:
+        return []
+
+    positions = _variable_positions(filename)
+    return [(*positions.get(variable, (0, 0)), message) for variable, message in problems]
+
+
+def validate_plugin_docs(plugin_type: str, filename: str,
+                         fragment_index: t.Mapping[str, str]) -> t.List[PluginErrorT]:
+    """
+    Validate the documentation of one plugin.
+
+    :arg plugin_type: The type of the plugin.
+    :arg filename: The file that contains the plugin's documentation.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.  See
+        :func:`antsibull.docs_parsing.discovery.find_doc_fragments`.
+    :returns: List of the problems that were found.
+    :raises StaticParsingError: if the documentation cannot be read without running ansible-doc.
+    :raises OSError: if the file cannot be read.
+    """
+    plugin_record = get_static_plugin_doc(plugin_type, filename, fragment_index)
+    return validate_plugin_record(plugin_type, filename, plugin_record)
+
+
+def lint_cache_key(plugin_type: str, fqcn: str, filename: str,
+                   fragment_index: t.Mapping[str, str],
+                   ansible_base_version: str) -> t.Optional[str]:
+    """
+    Compute the key that the result of validating a plugin is cached under.
+
+    :arg plugin_type: The type of the plugin.
+    :arg fqcn: The fqcn of the plugin.
+    :arg filename: The file that contains the plugin's documentation.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.
+    :arg ansible_base_version: The version of ansible-base whose fragments are used.
+    :returns: A hex digest or None if the result cannot be cached.
+    """
+    doc_key = plugin_cache_key(plugin_type, fqcn, filename, fragment_index, ansible_base_version)
+    if doc_key is None:
+        return None
+    key = f'{_CACHE_FORMAT}\0{schema_fingerprint()}\0{doc_key}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _cached_errors(cache: DiskCache, key: str, filename: str
+                   ) -> t.Optional[t.List[PluginErrorT]]:
+    data = cache.get(key)
+    if data is None:
+        return None
+
+    try:
+        return [(int(line), int(column), str(message).replace(_FILENAME_MARKER, filename))
+                for line, column, message in json.loads(data)]
+    except (ValueError, TypeError):
+        # A corrupted entry is the same as a missing one.  It will be overwritten.
+        return None
+
+
+def _lint_plugin_batch(plugins: t.Sequence[t.Tuple[str, str, str]],
+                       fragment_index: t.Mapping[str, str],
+                       ansible_base_version: str,
+                       cache_dir: t.Optional[str]
+                       ) -> t.List[t.Optional[t.List[PluginErrorT]]]:
+    """
+    Validate the documentation of a batch of plugins.  This runs in a worker process.
+
+    :arg plugins: Sequence of (plugin_type, fqcn, filename) for the plugins to validate.
+    :arg fragment_index: Mapping of fragment names to the files they are defined in.
+    :arg ansible_base_version: The version of ansible-base whose fragments are used.
+    :arg cache_dir: Directory of the cache of results or None to validate every plugin.
+    :returns: List with the problems found in each plugin.  The entry is None for plugins whose
+        documentation cannot be read statically.  ansible-doc has to validate those.
+    """
+    cache = DiskCache(cache_dir) if cache_dir else None
+    results = []
+    for plugin_type, fqcn, filename in plugins:
+        key = None
+        if cache is not None:
+            key = lint_cache_key(plugin_type, fqcn, filename, fragment_index,
+                                 ansible_base_version)
+            errors = _cached_errors(cache, key, filename) if key else None
+            if errors is not None:
+                results.append(errors)
+                continue
+
+        try:
+            errors = validate_plugin_docs(plugin_type, filename, fragment_index)
+        except (StaticParsingError, OSError):
+            results.append(None)
+            continue
+
+        if key:
+            cached = [(line, column, message.replace(filename, _FILENAME_MARKER))
+                      for line, column, message in errors]
+            cache.set(key, json.dumps(cached).encode('utf-8'))
+        results.append(errors)
+    return results
+
+
+def _read_collection_name(collection_path: str) -> t.Tuple[str, str]:
+    """
+    Find the namespace and name of a collection.
+
+    They are read from the collection's ``galaxy.yml``.  If that cannot be read, the collection is
+    assumed to be in an ``ansible_collections/<namespace>/<name>`` directory.
+    """
+    try:
+        galaxy = load_yaml_file(os.path.join(collection_path, 'galaxy.yml'))
+        return str(galaxy['namespace']), str(galaxy['name'])
+    except (OSError, yaml.YAMLError, TypeError, KeyError):
+        pass
+
+    namespace_dir, name = os.path.split(os.path.abspath(collection_path))
+    return os.path.basename(namespace_dir), name
+
+
+def _installed_location(collection_path: str, namespace: str, name: str) -> t.Optional[str]:
+    """Return the directory the collection is installed in if it is in one."""
+    path = os.path.abspath(collection_path)
+    namespace_dir, collection_dir = os.path.split(path)
+    toplevel, namespace_dir = os.path.split(namespace_dir)
+    if (collection_dir, namespace_dir) != (name, namespace):
+        return None
+    if os.path.basename(toplevel) != 'ansible_collections':
+        return None
+    return os.path.dirname(toplevel)
+
+
+async def _validate_with_ansible_doc(collection_dir: str,
+                                     plugins: t.Sequence[t.Tuple[str, str, str]]
+                                     ) -> t.List[t.Optional[t.List[PluginErrorT]]]:
+    """
+    Validate the documentation of plugins which cannot be read statically by running ansible-doc.
+
+    :arg collection_dir: Directory in which the collections have been installed.
+    :arg plugins: Sequence of (plugin_type, fqcn, filename) for the plugins to validate.
+    :returns: List with the problems found in each plugin.  The entries are None if ansible-doc
+        could not be run.
+    """
+    flog = mlog.fields(func='_validate_with_ansible_doc')
+
+    plugin_names: t.Dict[str, t.List[str]] = {}
+    for plugin_type, fqcn, dummy_ in plugins:
+        plugin_names.setdefault(plugin_type, []).append(ansible_doc_name(fqcn))
+
+    try:
+        plugin_info = await get_ansible_plugin_info(FakeVenvRunner(), collection_dir,
+                                                    plugin_names=plugin_names)
+    except (sh.CommandNotFound, ParsingError) as e:
+        flog.fields(error=str(e)).warning('Unable to run ansible-doc')
+        return [None] * len(plugins)
+
+    results: t.List[t.Optional[t.List[PluginErrorT]]] = []
+    for plugin_type, fqcn, filename in plugins:
+        plugin_record = plugin_info.get(plugin_type, {}).get(fqcn)
+        if plugin_record is None:
+            results.append([(0, 0, f'ansible-doc was unable to document {fqcn}')])
+        elif 'error' in plugin_record:
+            results.append([(0, 0, str(plugin_record['error']))])
+        else:
+            results.append(validate_plugin_record(plugin_type, filename, plugin_record))
+    return results
+
+
+async def _lint_installed_collection(collection_dir: str, collection_name: str,
+                                     ansible_base_dir: str, cache_dir: t.Optional[str],
+                                     max_workers: t.Optional[int]
+                                     ) -> t.List[t.Tuple[str, t.Optional[t.List[PluginErrorT]]]]:
+    """
+    Validate the plugins of a collection which is installed in collection_dir.
+
+    :returns: List of the filename and the problems found for each plugin.  The problems are None
+        if the plugin could not be validated at all.
+    """
+    inventory = discover_plugins(ansible_base_dir, collection_dir)
+    prefix = f'{collection_name}.'
+    plugins = [(plugin_type, fqcn, plugin_file.path)
+               for plugin_type, plugin_map in inventory.plugins.items()
+               for fqcn, plugin_file in plugin_map.items() if fqcn.startswith(prefix)]
+
+    try:
+        ansible_base_version = get_ansible_base_version(ansible_base_dir)
+    except (OSError, StaticParsingError, KeyError):
+        ansible_base_version = ''
+
+    loop = best_get_loop()
+    with process_pool(max_workers) as executor:
+        linters = [loop.run_in_executor(executor, _lint_plugin_batch,
+                                        plugins[start:start + _BATCH_SIZE],
+                                        inventory.doc_fragments, ansible_base_version, cache_dir)
+                   for start in range(0, len(plugins), _BATCH_SIZE)]
+        batch_results = await asyncio.gather(*linters)
+
+    results = [result for batch in batch_results for result in batch]
+    unreadable = [index for index, errors in enumerate(results) if errors is None]
+    if unreadable:
+        fallback_results = await _validate_with_ansible_doc(
+            collection_dir, [plugins[index] for index in unreadable])
+        for index, errors in zip(unreadable, fallback_results):
+            results[index] = errors
+
+    return [(filename, errors) for (dummy_, dummy_, filename), errors in zip(plugins, results)]
+
+
+async def lint_collection_docs(collection_path: str, ansible_base_dir: str,
+                               cache_dir: t.Optional[str] = None,
+                               max_workers: t.Optional[int] = None) -> t.List[LintErrorT]:
+    """
+    Validate the documentation of all of the plugins in a collection.
+
+    :arg collection_path: The root directory of the collection.
+    :arg ansible_base_dir: The directory of the ``ansible`` python package.  The plugins can use
+        its documentation fragments.
+    :kwarg cache_dir: Directory to cache the results in.  Plugins whose file, documentation
+        fragments, and schemas are unchanged since they were cached are not validated again.
+    :kwarg max_workers: The number of processes to validate the plugins in.  By default, the
+        process pool shared by the whole run is used.
+    :returns: List of (path, line, column, message) for the problems that were found.  Plugins
+        which could not be validated because ansible-doc could not be run are not problems of the
+        collection.  They are reported on stderr instead.
+    """
+    flog = mlog.fields(func='lint_collection_docs')
+    namespace, name = _read_collection_name(collection_path)
+    collection_dir = _installed_location(collection_path, namespace, name)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if collection_dir is None:
+            # Make the collection look installed so that its fragments can be found.  Other
+            # collections' fragments can only be used when it really is installed.
+            collection_dir = tmp_dir
+            namespace_dir = os.path.join(tmp_dir, 'ansible_collections', namespace)
+            os.makedirs(namespace_dir)
+            os.symlink(os.path.abspath(collection_path), os.path.join(namespace_dir, name))
+
+        collection_root = os.path.join(collection_dir, 'ansible_collections', namespace, name)
+        results = await _lint_installed_collection(collection_dir, f'{namespace}.{name}',
+                                                   ansible_base_dir, cache_dir, max_workers)
+    flog.fields(plugins=len(results)).debug('Finished validating plugins')
+
+    if cache_dir:
+        DiskCache(cache_dir).prune()
+
+    # Report the files under the path that was given instead of where the collection was found
+    lint_errors = []
+    for filename, errors in results:
+        filename = filename.replace(collection_root, collection_path, 1)
+        if errors is None:
+            sys.stderr.write(f'WARNING: {filename} was not validated: its documentation cannot be'
+                             ' read without ansible-doc and ansible-doc could not be run\n')
+            continue
+        lint_errors.extend((filename, line, column,
+                            message.replace(collection_root, collection_path))
+                           for line, column, message in errors)
+    return lint_errors
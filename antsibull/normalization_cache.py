@@ -0,0 +1,156 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Cache the results of normalizing plugin docs across runs.
+
+Normalizing a plugin's docs only depends on the raw record, the plugin type, and the schemas.  The
+normalized record and its nonfatal errors are stored under a hash of those so that docs builds for
+a new release only normalize the plugins whose docs changed.
+"""
+
+import hashlib
+import json
+import marshal
+import pkgutil
+import sys
+import typing as t
+import zlib
+from collections.abc import Mapping
+from functools import lru_cache
+
+import pydantic
+
+from . import schemas
+from .disk_cache import DEFAULT_MAX_SIZE, DiskCache
+
+
+#: Change this when the way that records are normalized changes outside of antsibull.schemas
+_CACHE_FORMAT = '1'
+
+#: A normalized plugin record (None if the plugin could not be normalized) and its errors
+NormalizedT = t.Tuple[t.Optional[t.Dict[str, t.Any]], t.List[str]]
+
+
+@lru_cache(maxsize=None)
+def schema_fingerprint() -> str:
+    """
+    Return a hash which changes whenever the result of normalizing a record could change.
+
+    It covers the source of the :mod:`antsibull.schemas` modules, the version of pydantic, and the
+    version of Python (the cache entries are stored with :python:mod:`marshal`).
+    """
+    fingerprint = hashlib.sha256()
+    fingerprint.update(f'{_CACHE_FORMAT}\0{pydantic.VERSION}\0{sys.version_info[:2]}\0'
+                       f'{marshal.version}\0'.encode('utf-8'))
+
+    for module in sorted(pkgutil.iter_modules(schemas.__path__), key=lambda m: m.name):
+        source = pkgutil.get_data('antsibull.schemas', f'{module.name}.py')
+        fingerprint.update(module.name.encode('utf-8') + b'\0')
+        fingerprint.update(hashlib.sha256(source or b'').digest())
+
+    return fingerprint.hexdigest()
+
+
+def normalization_cache_key(plugin_type: str, plugin_record: t.Mapping[str, t.Any],
+                            fingerprint: str) -> t.Optional[str]:
+    """
+    Compute the key that the normalized docs of a plugin are cached under.
+
+    The raw record is hashed as compact JSON.  Keys are not sorted because the order of options
+    and return values is kept by normalization.  The ``filename`` in the docs is left out because
+    it contains the location of the temporary venv that the docs were extracted in.  Use
+    :func:`restore_filename` on the cached record.
+
+    :arg plugin_type: The type of the plugin.
+    :arg plugin_record: The raw documentation of the plugin.
+    :arg fingerprint: The fingerprint of the schemas.  See :func:`schema_fingerprint`.
+    :returns: A hex digest or None if the record cannot be cached.
+    """
+    if 'error' in plugin_record:
+        # The docs could not be extracted.  The next run may be able to extract them.
+        return None
+
+    doc = plugin_record.get('doc')
+    if isinstance(doc, Mapping) and isinstance(doc.get('filename'), str):
+        plugin_record = dict(plugin_record, doc=dict(doc, filename=''))
+
+    try:
+        raw = json.dumps(plugin_record, separators=(',', ':'), ensure_ascii=False,
+                         allow_nan=True)
+    except (TypeError, ValueError):
+        return None
+
+    key = hashlib.sha256(f'{fingerprint}\0{plugin_type}\0'.encode('utf-8'))
+    key.update(raw.encode('utf-8', errors='surrogatepass'))
+    return key.hexdigest()
+
+
+def restore_filename(normalized: t.Dict[str, t.Any], plugin_record: t.Mapping[str, t.Any]
+                     ) -> None:
+    """
+    Set the ``filename`` of a cached normalized record to the one in the raw record.
+
+    :arg normalized: The normalized record from the cache.  It is modified in place.
+    :arg plugin_record: The raw documentation of the plugin.
+    """
+    filename = plugin_record['doc'].get('filename')
+    if isinstance(filename, str):
+        normalized['doc']['filename'] = filename
+
+
+class NormalizationCache:
+    """Store normalized plugin records in a :class:`antsibull.disk_cache.DiskCache`."""
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """
+        Create the cache.
+
+        :arg directory: Directory to store the cache in.
+        :kwarg max_size: The size in bytes that the cache is pruned to.
+        """
+        self._cache = DiskCache(directory, max_size=max_size)
+
+    def get(self, key: str) -> t.Optional[NormalizedT]:
+        """
+        Retrieve the result of normalizing a plugin record.
+
+        :arg key: The cache key of the plugin.  See :func:`normalization_cache_key`.
+        :returns: A tuple of the normalized record (None if the record could not be normalized)
+            and the nonfatal errors or None if the plugin is not in the cache.
+        """
+        data = self._cache.get(key)
+        if data is None:
+            return None
+
+        try:
+            normalized, errors = marshal.loads(zlib.decompress(data))
+        except (zlib.error, EOFError, ValueError, TypeError):
+            # A corrupted entry is the same as a missing one.  It will be overwritten.
+            return None
+        return normalized, list(errors)
+
+    def set(self, key: str, normalized: t.Optional[t.Mapping[str, t.Any]],
+            errors: t.Sequence[str]) -> None:
+        """
+        Store the result of normalizing a plugin record.
+
+        :arg key: The cache key of the plugin.  See :func:`normalization_cache_key`.
+        :arg normalized: The normalized record or None if it could not be normalized.
+        :arg errors: The nonfatal errors (or the error which prevented normalization).
+        """
+        try:
+            data = marshal.dumps((normalized, list(errors)))
+        except ValueError:
+            # The record contains something which marshal cannot store
+            return
+        self._cache.set(key, zlib.compress(data))
+
+    def prune(self) -> int:
+        """
+        Remove the least recently used records until the cache is small enough.
+
+        :returns: The number of records which were removed.
+        """
+        return self._cache.prune()
@@ -0,0 +1,111 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+A process pool that is shared by all of the CPU bound stages of a run.
+
+Starting worker processes and importing pydantic and the documentation schemas in each of them
+takes a noticeable amount of time.  Instead of starting a new
+:python:class:`concurrent.futures.ProcessPoolExecutor` for each stage, the stages share one pool
+whose workers have the schemas loaded before they receive their first task.
+"""
+
+import atexit
+import multiprocessing
+import sys
+import typing as t
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+
+from .constants import PROCESS_MAX
+from .logging import log
+
+
+mlog = log.fields(mod=__name__)
+
+#: Modules which are imported into the worker processes before they run any tasks.  The schemas
+#: that every plugin_type builds on are preloaded.  The schemas which are specific to modules or
+#: callbacks are loaded by the workers which see those plugin_types.
+PRELOAD_MODULES: t.Tuple[str, ...] = ('antsibull.schemas.docs', 'antsibull.schemas.plugin')
+
+_POOL: t.Optional[ProcessPoolExecutor] = None
+
+
+def _preload() -> None:
+    """Import the modules which the tasks sent to the workers need."""
+    for module in PRELOAD_MODULES:
+        __import__(module)
+
+
+def _pool_kwargs() -> t.Dict[str, t.Any]:
+    """
+    Return the arguments for creating a pool with preloaded workers.
+
+    If the forkserver start method is available, the forkserver imports the preloaded modules once
+    and every worker is forked from it.  Otherwise each worker imports them when it starts.
+    """
+    if sys.version_info < (3, 7):
+        # Python3.6's ProcessPoolExecutor has no initializer.  The modules are imported when the
+        # workers receive their first task instead.
+        return {}
+
+    kwargs: t.Dict[str, t.Any] = {'initializer': _preload}
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(list(PRELOAD_MODULES))
+        kwargs['mp_context'] = context
+    return kwargs
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool shared by the whole run, creating it if needed.
+
+    The pool has :data:`antsibull.constants.PROCESS_MAX` workers.  It is shut down when the
+    program exits or when :func:`shutdown_process_pool` is called.
+    """
+    global _POOL  # pylint:disable=global-statement
+    if _POOL is None:
+        mlog.fields(func='get_process_pool', workers=PROCESS_MAX).debug('Starting process pool')
+        _POOL = ProcessPoolExecutor(max_workers=PROCESS_MAX, **_pool_kwargs())
+    return _POOL
+
+
+def warm_process_pool() -> None:
+    """
+    Start the workers of the shared process pool in the background.
+
+    Call this early so that the workers have started and preloaded the schemas by the time that
+    the first CPU bound stage needs them.
+    """
+    pool = get_process_pool()
+    for dummy_ in range(PROCESS_MAX):
+        pool.submit(_preload)
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the shared process pool.  A new one is created if it is needed again."""
+    global _POOL  # pylint:disable=global-statement
+    if _POOL is not None:
+        _POOL.shutdown(wait=True)
+        _POOL = None
+
+
+@contextmanager
+def process_pool(max_workers: t.Optional[int] = None) -> t.Iterator[Executor]:
+    """
+    Context manager which provides a process pool to run CPU bound work in.
+
+    :kwarg max_workers: If given, a separate pool with this many workers is started and shut
+        down when the context exits.  Otherwise the shared pool is used.
+    """
+    if max_workers is None:
+        yield get_process_pool()
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, **_pool_kwargs()) as executor:
+        yield executor
+
+
+atexit.register(shutdown_process_pool)
@@ -124,7 +124,8 @@ import typing as t
 from collections.abc import Mapping
 
 import pydantic as p
-import yaml
+
+from ..yaml import load_yaml
 
 _SENTINEL = object()
 
@@ -182,7 +183,7 @@ def transform_return_docs(obj):
 
     if isinstance(obj, str):
         try:
-            new_obj = yaml.safe_load(obj)
+            new_obj = load_yaml(obj)
         except Exception:
             obj = {"": obj}
         else:
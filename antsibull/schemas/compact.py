@@ -0,0 +1,319 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+A compact in-memory representation of normalized documentation.
+
+Normalized docs are deep trees of dicts in which most options repeat the same default values
+(``aliases: []``, ``choices: []``, ``deprecated: {}``, ``version_added: 'historical'``).  For a
+full Ansible release, that takes gigabytes of memory.
+
+:func:`compile_compactor` builds a function which turns the normalized data of a schema into
+:class:`CompactRecord` objects instead.  Each schema gets a record class with ``__slots__`` for
+its fields.  Fields which hold their default value are not stored at all.  Looking them up returns
+the shared default (immutable values) or a new container which is stored in the record from then
+on, so that changing it in place works like it does for a dict.  Records are mutable mappings so
+they can be used wherever the normalized dicts are used (for instance, in the templates and in
+:func:`antsibull.augment_docs.augment_docs`).
+"""
+
+import copy
+import functools
+import importlib
+import sys
+import typing as t
+from collections.abc import MutableMapping
+
+import pydantic as p
+from pydantic.fields import SHAPE_DICT, SHAPE_LIST, SHAPE_MAPPING, SHAPE_SINGLETON, ModelField
+
+
+#: Keys which antsibull adds to the normalized data of some schemas.  Every record class has a
+#: slot for them so that adding them does not need a dict.
+EXTRA_FIELDS: t.Tuple[str, ...] = ('full_key',)
+
+#: Strings up to this length are interned so that repeated values (types, versions) are shared
+_INTERN_MAX: int = 32
+
+#: Types whose default values can be shared between records
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+_MISSING = object()
+
+#: A function which turns normalized data into its compact representation
+CompactorT = t.Callable[[t.Any], t.Any]
+
+
+class CompactRecord(MutableMapping):
+    """
+    Base class of the compact records of the schemas.
+
+    Every schema field is always present in a record, just like in the normalized dict.  Setting
+    a field stores the value as given.  Deleting a field resets it to its default.  Keys which are
+    not fields of the schema are stored in a dict which is only created when needed.
+    """
+
+    __slots__ = ('_extra',)
+
+    #: The keys of the schema's fields followed by :data:`EXTRA_FIELDS`
+    _fields: t.Tuple[str, ...] = ()
+    #: Mapping of key to the name of the slot it is stored in
+    _slot_names: t.Dict[str, str] = {}
+    #: Mapping of the keys of fields with defaults to functions which return the default
+    _defaults: t.Dict[str, t.Callable[[], t.Any]] = {}
+    #: Mapping of keys to default values which are left out of the record
+    _elidable: t.Dict[str, t.Any] = {}
+    #: Where the schema of the record can be imported from
+    _model_path: str = ''
+
+    def __getitem__(self, key: str) -> t.Any:
+        slot = self._slot_names.get(key)
+        if slot is None:
+            return getattr(self, '_extra', {})[key]
+
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            pass
+        default = self._defaults.get(key)
+        if default is None:
+            raise KeyError(key)
+        value = default()
+        if isinstance(value, (list, dict)):
+            # The caller may change the container in place (``rec['aliases'].append()``)
+            setattr(self, slot, value)
+        return value
+
+    def __setitem__(self, key: str, value: t.Any) -> None:
+        slot = self._slot_names.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+            return
+
+        try:
+            extra = self._extra
+        except AttributeError:
+            extra = self._extra = {}
+        extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        slot = self._slot_names.get(key)
+        if slot is None:
+            del getattr(self, '_extra', {})[key]
+            return
+
+        try:
+            delattr(self, slot)
+        except AttributeError:
+            if key not in self._defaults:
+                raise KeyError(key)
+
+    def __contains__(self, key: t.Any) -> bool:
+        slot = self._slot_names.get(key)
+        if slot is None:
+            return key in getattr(self, '_extra', {})
+        return key in self._defaults or hasattr(self, slot)
+
+    def __iter__(self) -> t.Iterator[str]:
+        for key in self._fields:
+            if key in self._defaults or hasattr(self, self._slot_names[key]):
+                yield key
+        yield from getattr(self, '_extra', {})
+
+    def __len__(self) -> int:
+        return sum(1 for dummy_ in self)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({dict(self)!r})'
+
+    def _state(self) -> t.Dict[str, t.Any]:
+        """Return the values which are stored in the record."""
+        state = {}
+        for key in self._fields:
+            try:
+                state[key] = getattr(self, self._slot_names[key])
+            except AttributeError:
+                pass
+        state.update(getattr(self, '_extra', {}))
+        return state
+
+    def __reduce__(self) -> t.Tuple[t.Callable, t.Tuple[str, t.Dict[str, t.Any]]]:
+        # The record classes are created at runtime so pickle has to recreate them from the schema
+        return (_rebuild_record, (self._model_path, self._state()))
+
+
+def _constant(value: t.Any) -> t.Callable[[], t.Any]:
+    return lambda: value
+
+
+def _field_defaults(model: t.Type[p.BaseModel]
+                    ) -> t.Tuple[t.Dict[str, t.Callable[[], t.Any]], t.Dict[str, t.Any]]:
+    """Return the default factories of a schema's fields and the defaults which can be elided."""
+    defaults: t.Dict[str, t.Callable[[], t.Any]] = {}
+    elidable: t.Dict[str, t.Any] = {}
+    for field in model.__fields__.values():
+        if field.required:
+            continue
+        if field.default_factory is not None:
+            defaults[field.alias] = field.default_factory
+            continue
+
+        default = field.default
+        if isinstance(default, _IMMUTABLE_TYPES):
+            defaults[field.alias] = _constant(default)
+            elidable[field.alias] = default
+        elif type(default) in (list, dict) and not default:
+            defaults[field.alias] = type(default)
+            elidable[field.alias] = default
+        else:
+            defaults[field.alias] = functools.partial(copy.deepcopy, default)
+    return defaults, elidable
+
+
+@functools.lru_cache(maxsize=None)
+def record_class(model: t.Type[p.BaseModel]) -> t.Type[CompactRecord]:
+    """
+    Return the compact record class for a schema.
+
+    :arg model: The pydantic model of the schema.
+    :returns: A subclass of :class:`CompactRecord`.
+    """
+    keys = [field.alias for field in model.__fields__.values()]
+    keys.extend(key for key in EXTRA_FIELDS if key not in keys)
+    # The slots are numbered so that keys can never clash with the methods of the mapping
+    slot_names = {key: f'_v{index}' for index, key in enumerate(keys)}
+    defaults, elidable = _field_defaults(model)
+
+    namespace = {
+        '__slots__': tuple(slot_names.values()),
+        '__module__': __name__,
+        '_fields': tuple(keys),
+        '_slot_names': slot_names,
+        '_defaults': defaults,
+        '_elidable': elidable,
+        '_model_path': f'{model.__module__}:{model.__qualname__}',
+    }
+    return type(f'{model.__name__}Record', (CompactRecord,), namespace)
+
+
+def _load_model(model_path: str) -> t.Type[p.BaseModel]:
+    module_name, qualname = model_path.split(':', 1)
+    model = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        model = getattr(model, name)
+    return model
+
+
+def _rebuild_record(model_path: str, state: t.Mapping[str, t.Any]) -> CompactRecord:
+    """Recreate a record which was pickled."""
+    record = record_class(_load_model(model_path))()
+    for key, value in state.items():
+        record[key] = value
+    return record
+
+
+def _compact_items(compact_model: CompactorT, shape: int) -> CompactorT:
+    """Return a function which compacts the models inside of a field's value."""
+    def compact_value(value: t.Any) -> t.Any:
+        # Empty values and values that are not dicts are left alone.  Empty models are the
+        # default of optional submodels (``deprecated: {}``).
+        if type(value) is dict and value:  # pylint:disable=unidiomatic-typecheck
+            return compact_model(value)
+        return value
+
+    if shape == SHAPE_SINGLETON:
+        return compact_value
+
+    if shape == SHAPE_LIST:
+        def compact_list(value: t.Any) -> t.Any:
+            if type(value) is not list:  # pylint:disable=unidiomatic-typecheck
+                return value
+            return [compact_value(item) for item in value]
+        return compact_list
+
+    def compact_dict(value: t.Any) -> t.Any:
+        if type(value) is not dict:  # pylint:disable=unidiomatic-typecheck
+            return value
+        return {key: compact_value(item) for key, item in value.items()}
+    return compact_dict
+
+
+def _compile_field(field: ModelField, models: t.Dict[type, t.Any]) -> t.Optional[CompactorT]:
+    """Return a function which compacts a field's value or None if it contains no models."""
+    type_ = field.type_
+    if not (isinstance(type_, type) and issubclass(type_, p.BaseModel)):
+        # Unions of models (seealso) cannot be told apart after normalization so they are kept
+        # as dicts
+        return None
+    if field.shape not in (SHAPE_SINGLETON, SHAPE_LIST, SHAPE_DICT, SHAPE_MAPPING):
+        return None
+    if field.shape == SHAPE_SINGLETON and field.sub_fields:
+        return None
+    return _compact_items(_compile_model(type_, models)[0], field.shape)
+
+
+def _compact_str(value: t.Any) -> t.Any:
+    if type(value) is str and len(value) <= _INTERN_MAX:  # pylint:disable=unidiomatic-typecheck
+        return sys.intern(value)
+    return value
+
+
+def _compile_model(model: t.Type[p.BaseModel], models: t.Dict[type, t.Any]
+                   ) -> t.Tuple[CompactorT, t.Dict[str, CompactorT]]:
+    """Return the compactor of a model and the compactors of its fields."""
+    if model in models:
+        return models[model]
+
+    cls = record_class(model)
+    elidable = cls._elidable  # pylint:disable=protected-access
+    converters: t.Dict[str, CompactorT] = {}
+
+    def compact_model(values: t.Mapping[str, t.Any]) -> CompactRecord:
+        record = cls()
+        for key, value in values.items():
+            default = elidable.get(key, _MISSING)
+            if type(value) is type(default) and value == default:
+                continue
+            record[key] = converters.get(key, _compact_str)(value)
+        return record
+
+    # Register the compactor before compiling the fields so that recursive schemas work
+    models[model] = (compact_model, converters)
+    for field in model.__fields__.values():
+        converter = _compile_field(field, models)
+        if converter is not None:
+            converters[field.alias] = converter
+
+    return compact_model, converters
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled(model: t.Type[p.BaseModel]) -> t.Tuple[CompactorT, t.Dict[str, CompactorT]]:
+    return _compile_model(model, {})
+
+
+def compile_compactor(model: t.Type[p.BaseModel]) -> CompactorT:
+    """
+    Return a function which turns the normalized data of a schema into a :class:`CompactRecord`.
+
+    :arg model: The pydantic model of the schema.
+    :returns: A function which takes the normalized data (the output of
+        :func:`antsibull.schemas.normalize.normalize`) and returns a record.  The record compares
+        equal to the normalized data.
+    """
+    return _compiled(model)[0]
+
+
+def compact_values(model: t.Type[p.BaseModel], data: t.Mapping[str, t.Any]
+                   ) -> t.Dict[str, t.Any]:
+    """
+    Compact the values of a schema's normalized data but keep the toplevel as a dict.
+
+    :arg model: The pydantic model of the schema.
+    :arg data: The normalized data.
+    :returns: A new dict whose values are compact.
+    """
+    converters = _compiled(model)[1]
+    return {key: converters[key](value) if key in converters else value
+            for key, value in data.items()}
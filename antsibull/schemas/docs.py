@@ -7,64 +7,140 @@ Schemas for the plugin DOCUMENTATION data.
 
 This is a highlevel interface.  The hope is that developers can use either this or
 antsibull.schemas.ansible_doc to handle all of their validation needs.
+
+Building the pydantic models is a large part of the cost of importing the schemas.  So the
+schemas of a plugin_type are only imported when they are first looked up in
+:data:`DOCS_SCHEMAS` (or when one of the schema names is used as an attribute of this module).
 """
 
-from .callback import CallbackDocSchema, CallbackSchema
-from .module import ModuleDocSchema, ModuleSchema
-from .plugin import (PluginDocSchema, PluginExamplesSchema,
-                     PluginMetadataSchema, PluginReturnSchema, PluginSchema)
-
-BecomeSchema = PluginSchema
-CacheSchema = PluginSchema
-CliConfSchema = PluginSchema
-ConnectionSchema = PluginSchema
-HttpApiSchema = PluginSchema
-InventorySchema = PluginSchema
-LookupSchema = PluginSchema
-NetConfSchema = PluginSchema
-ShellSchema = PluginSchema
-StrategySchema = PluginSchema
-VarsSchema = PluginSchema
-
-
-#: The schemas that most plugins use to validate and normalize their documentation.
-_PLUGIN_SCHEMA_RECORD = {
-    'top': PluginSchema,
-    'doc': PluginDocSchema,
-    'examples': PluginExamplesSchema,
-    'metadata': PluginMetadataSchema,
-    'return': PluginReturnSchema,
+import importlib
+import sys
+import typing as t
+from collections.abc import Mapping
+
+if t.TYPE_CHECKING:
+    import pydantic as p
+
+
+#: Mapping of the names of the schemas that this module provides to the module in
+#: :mod:`antsibull.schemas` and the name that they are defined under there
+_SCHEMA_LOCATIONS: t.Dict[str, t.Tuple[str, str]] = {
+    'CallbackDocSchema': ('callback', 'CallbackDocSchema'),
+    'CallbackSchema': ('callback', 'CallbackSchema'),
+    'ModuleDocSchema': ('module', 'ModuleDocSchema'),
+    'ModuleSchema': ('module', 'ModuleSchema'),
+    'PluginDocSchema': ('plugin', 'PluginDocSchema'),
+    'PluginExamplesSchema': ('plugin', 'PluginExamplesSchema'),
+    'PluginMetadataSchema': ('plugin', 'PluginMetadataSchema'),
+    'PluginReturnSchema': ('plugin', 'PluginReturnSchema'),
+    'PluginSchema': ('plugin', 'PluginSchema'),
+    'BecomeSchema': ('plugin', 'PluginSchema'),
+    'CacheSchema': ('plugin', 'PluginSchema'),
+    'CliConfSchema': ('plugin', 'PluginSchema'),
+    'ConnectionSchema': ('plugin', 'PluginSchema'),
+    'HttpApiSchema': ('plugin', 'PluginSchema'),
+    'InventorySchema': ('plugin', 'PluginSchema'),
+    'LookupSchema': ('plugin', 'PluginSchema'),
+    'NetConfSchema': ('plugin', 'PluginSchema'),
+    'ShellSchema': ('plugin', 'PluginSchema'),
+    'StrategySchema': ('plugin', 'PluginSchema'),
+    'VarsSchema': ('plugin', 'PluginSchema'),
+}
+
+
+#: The names of the schemas that most plugins use to validate and normalize their documentation.
+_PLUGIN_SCHEMA_NAMES = {
+    'top': 'PluginSchema',
+    'doc': 'PluginDocSchema',
+    'examples': 'PluginExamplesSchema',
+    'metadata': 'PluginMetadataSchema',
+    'return': 'PluginReturnSchema',
 }
 
 
+#: Mapping of plugin_types to the names of the schemas for each section of their documentation
+_DOCS_SCHEMA_NAMES = {
+    'become': _PLUGIN_SCHEMA_NAMES,
+    'cache': _PLUGIN_SCHEMA_NAMES,
+    'callback': dict(_PLUGIN_SCHEMA_NAMES, top='CallbackSchema', doc='CallbackDocSchema'),
+    'cliconf': _PLUGIN_SCHEMA_NAMES,
+    'connection': _PLUGIN_SCHEMA_NAMES,
+    'httpapi': _PLUGIN_SCHEMA_NAMES,
+    'inventory': _PLUGIN_SCHEMA_NAMES,
+    'lookup': _PLUGIN_SCHEMA_NAMES,
+    'module': dict(_PLUGIN_SCHEMA_NAMES, top='ModuleSchema', doc='ModuleDocSchema'),
+    'netconf': _PLUGIN_SCHEMA_NAMES,
+    'shell': _PLUGIN_SCHEMA_NAMES,
+    'strategy': _PLUGIN_SCHEMA_NAMES,
+    'vars': _PLUGIN_SCHEMA_NAMES,
+}
+
+
+def _load_schema(name: str) -> t.Type['p.BaseModel']:
+    """Import one of the schemas that this module provides."""
+    module_name, attribute = _SCHEMA_LOCATIONS[name]
+    module = importlib.import_module(f'{__package__}.{module_name}')
+    return getattr(module, attribute)
+
+
+class SchemaRegistry(Mapping):
+    """
+    Mapping of plugin_type to the schemas for each section of the plugin_type's documentation.
+
+    The schemas of a plugin_type are imported the first time that it is looked up.  Plugin types
+    which use the same schemas share the same mapping of sections to schemas.
+    """
+
+    def __init__(self, schema_names: t.Mapping[str, t.Mapping[str, str]]) -> None:
+        """
+        Create the registry.
+
+        :arg schema_names: Mapping of plugin_type to section to the name of the schema.  The names
+            are attributes of :mod:`antsibull.schemas.docs`.
+        """
+        self._schema_names = schema_names
+        self._schemas: t.Dict[str, t.Dict[str, t.Type['p.BaseModel']]] = {}
+        #: The schemas which were loaded, keyed by the id of the mapping of their names
+        self._loaded: t.Dict[int, t.Dict[str, t.Type['p.BaseModel']]] = {}
+
+    def __getitem__(self, plugin_type: str) -> t.Dict[str, t.Type['p.BaseModel']]:
+        try:
+            return self._schemas[plugin_type]
+        except KeyError:
+            pass
+
+        names = self._schema_names[plugin_type]
+        schemas = self._loaded.get(id(names))
+        if schemas is None:
+            schemas = self._loaded[id(names)] = {section: _load_schema(name)
+                                                 for section, name in names.items()}
+        self._schemas[plugin_type] = schemas
+        return schemas
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._schema_names)
+
+    def __len__(self) -> int:
+        return len(self._schema_names)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(loaded={sorted(self._schemas)!r})'
+
+
 #: Mapping of plugin_types to the schemas which validate and normalize their documentation.
 #: The structure of this mapping is a two level nested dict.  The outer key is the plugin_type.
 #: The inner keys are the sections of the documentation (doc, example, metadata, return, or top
 #: [which combines all of hte above, such as ansible-doc returns]) to validate.
-DOCS_SCHEMAS = {
-    'become': _PLUGIN_SCHEMA_RECORD,
-    'cache': _PLUGIN_SCHEMA_RECORD,
-    'callback': {
-        'top': CallbackSchema,
-        'doc': CallbackDocSchema,
-        'examples': PluginExamplesSchema,
-        'metadata': PluginMetadataSchema,
-        'return': PluginReturnSchema,
-    },
-    'cliconf': _PLUGIN_SCHEMA_RECORD,
-    'connection': _PLUGIN_SCHEMA_RECORD,
-    'httpapi': _PLUGIN_SCHEMA_RECORD,
-    'inventory': _PLUGIN_SCHEMA_RECORD,
-    'lookup': _PLUGIN_SCHEMA_RECORD,
-    'module': {
-        'top': ModuleSchema,
-        'doc': ModuleDocSchema,
-        'examples': PluginExamplesSchema,
-        'metadata': PluginMetadataSchema,
-        'return': PluginReturnSchema,
-    },
-    'netconf': _PLUGIN_SCHEMA_RECORD,
-    'shell': _PLUGIN_SCHEMA_RECORD,
-    'strategy': _PLUGIN_SCHEMA_RECORD,
-    'vars': _PLUGIN_SCHEMA_RECORD,
-}
+DOCS_SCHEMAS = SchemaRegistry(_DOCS_SCHEMA_NAMES)
+
+
+def __getattr__(name: str) -> t.Any:
+    if name in _SCHEMA_LOCATIONS:
+        return _load_schema(name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+if sys.version_info < (3, 7):
+    # Attribute lookups are not passed to a module's __getattr__ before Python 3.7 (PEP 562) so
+    # the schemas have to be imported up front
+    globals().update((name, _load_schema(name)) for name in _SCHEMA_LOCATIONS)
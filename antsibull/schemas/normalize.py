@@ -0,0 +1,354 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Normalize documentation with plain Python functions that are generated from the schemas.
+
+Validating data with pydantic and then turning the model back into a dict with
+``dict(by_alias=True)`` is the most expensive part of normalizing plugin docs.  Most docs are
+already well formed, though.  :func:`compile_model` walks the fields of a schema and builds a
+function which checks the same types and runs the same validators (for instance,
+:func:`~antsibull.schemas.base.list_from_scalars` and the root validators which rename fields)
+directly on the dict.
+
+The generated function only returns a result for data which pydantic would accept.  Data that it
+is unsure about is handed to pydantic so that pydantic's coercions and error messages are kept.
+Use :func:`normalize` to get that behaviour.
+"""
+
+import copy
+import functools
+import inspect
+import re
+import typing as t
+from collections import deque
+from types import GeneratorType
+
+import pydantic as p
+from pydantic.fields import SHAPE_DICT, SHAPE_LIST, SHAPE_MAPPING, SHAPE_SINGLETON, ModelField
+from pydantic.types import ConstrainedStr
+from pydantic.validators import bool_validator, float_validator, int_validator, str_validator
+
+from ..logging import log
+
+
+mlog = log.fields(mod=__name__)
+
+#: A function which normalizes data for a schema
+NormalizerT = t.Callable[[t.Any], t.Any]
+
+#: Exceptions which pydantic turns into validation errors when a validator raises them
+_VALIDATOR_ERRORS = (ValueError, TypeError, AssertionError)
+
+#: Types which pydantic accepts for list fields.  Only lists and tuples are handled here.
+_SEQUENCE_TYPES = (set, frozenset, GeneratorType, deque)
+
+#: Types whose default values do not need to be copied
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+#: Config settings the generated normalizers assume.  Schemas with other settings are not compiled
+_EXPECTED_CONFIG: t.Dict[str, t.Any] = {
+    'allow_population_by_field_name': False,
+    'anystr_strip_whitespace': False,
+    'anystr_upper': False,
+    'anystr_lower': False,
+    'min_anystr_length': 0,
+    'max_anystr_length': None,
+    'allow_inf_nan': True,
+    'orm_mode': False,
+    'smart_union': False,
+    'validate_all': False,
+}
+
+
+class _Uncompilable(Exception):
+    """The schema uses a feature which the generated normalizers do not implement."""
+
+
+class _Invalid(Exception):
+    """pydantic would reject the data."""
+
+
+class _Unsupported(Exception):
+    """The generated normalizer cannot tell what pydantic would do with the data."""
+
+
+def _call_validator(validator: t.Callable, model: t.Type[p.BaseModel], value: t.Any) -> t.Any:
+    try:
+        return validator(model, value)
+    except _VALIDATOR_ERRORS:
+        raise _Invalid()
+    except Exception:
+        raise _Unsupported()
+
+
+def _wrap_validator(validator: t.Callable[[t.Any], t.Any]) -> NormalizerT:
+    """Turn a pydantic type validator into a normalizer."""
+    def normalize_value(value: t.Any) -> t.Any:
+        try:
+            return validator(value)
+        except _VALIDATOR_ERRORS:
+            raise _Invalid()
+    return normalize_value
+
+
+def _normalize_str(value: t.Any) -> str:
+    if type(value) is str:  # pylint:disable=unidiomatic-typecheck
+        return value
+    try:
+        return str_validator(value)
+    except _VALIDATOR_ERRORS:
+        raise _Invalid()
+
+
+def _normalize_any(value: t.Any) -> t.Any:
+    return value
+
+
+_PRIMITIVES: t.Dict[t.Any, NormalizerT] = {
+    str: _normalize_str,
+    int: _wrap_validator(int_validator),
+    float: _wrap_validator(float_validator),
+    bool: _wrap_validator(bool_validator),
+}
+
+
+def _compile_constr(type_: t.Type[ConstrainedStr]) -> NormalizerT:
+    for attribute in ('strip_whitespace', 'to_upper', 'to_lower', 'min_length', 'max_length',
+                      'curtail_length', 'strict'):
+        if getattr(type_, attribute, None):
+            raise _Uncompilable(f'{type_} uses {attribute}')
+
+    pattern = type_.regex
+    if pattern is None:
+        return _normalize_str
+    if isinstance(pattern, str):
+        pattern = re.compile(pattern)
+
+    def normalize_constr(value: t.Any) -> str:
+        value = _normalize_str(value)
+        if not pattern.match(value):
+            raise _Invalid()
+        return value
+
+    return normalize_constr
+
+
+def _compile_type(type_: t.Any, models: t.Dict[type, NormalizerT]) -> NormalizerT:
+    if type_ is t.Any:
+        return _normalize_any
+    if isinstance(type_, type):
+        if issubclass(type_, p.BaseModel):
+            return _compile_model(type_, models)
+        if issubclass(type_, ConstrainedStr):
+            return _compile_constr(type_)
+        if type_ in _PRIMITIVES:
+            return _PRIMITIVES[type_]
+    raise _Uncompilable(f'Unsupported type {type_}')
+
+
+def _compile_union(members: t.Sequence[NormalizerT]) -> NormalizerT:
+    def normalize_union(value: t.Any) -> t.Any:
+        # Like pydantic, use the first type which accepts the value
+        for member in members:
+            try:
+                return member(value)
+            except _Invalid:
+                continue
+        raise _Invalid()
+    return normalize_union
+
+
+def _compile_list(normalize_item: NormalizerT) -> NormalizerT:
+    def normalize_list(value: t.Any) -> t.List[t.Any]:
+        if isinstance(value, (list, tuple)):
+            return list(map(normalize_item, value))
+        if isinstance(value, _SEQUENCE_TYPES):
+            raise _Unsupported()
+        raise _Invalid()
+    return normalize_list
+
+
+def _compile_dict(normalize_key: NormalizerT, normalize_item: NormalizerT) -> NormalizerT:
+    def normalize_dict(value: t.Any) -> t.Dict[t.Any, t.Any]:
+        if not isinstance(value, dict):
+            # pydantic tries to convert other types into a dict
+            raise _Unsupported()
+        return {normalize_key(key): normalize_item(item) for key, item in value.items()}
+    return normalize_dict
+
+
+def _field_validators(field: ModelField) -> t.List[t.Callable]:
+    """Return the functions of the validators which run before the field's type is checked."""
+    validators = []
+    for validator in field.class_validators.values():
+        if not validator.pre or validator.each_item or validator.always:
+            raise _Uncompilable(f'Unsupported validator {validator.func} on {field.name}')
+        if len(inspect.signature(validator.func).parameters) != 2:
+            raise _Uncompilable(f'Unsupported signature for {validator.func}')
+        validators.append(validator.func)
+    return validators
+
+
+def _compile_shape(model: t.Type[p.BaseModel], field: ModelField,
+                   models: t.Dict[type, NormalizerT]) -> NormalizerT:
+    """Compile the type checks of a field (without its validators)."""
+    if field.shape == SHAPE_SINGLETON:
+        if field.sub_fields:
+            return _compile_union([_compile_field(model, sub_field, models)
+                                   for sub_field in field.sub_fields])
+        return _compile_type(field.type_, models)
+    if field.shape == SHAPE_LIST:
+        return _compile_list(_compile_field(model, field.sub_fields[0], models))
+    if field.shape in (SHAPE_DICT, SHAPE_MAPPING):
+        return _compile_dict(_compile_field(model, field.key_field, models),
+                             _compile_field(model, field.sub_fields[0], models))
+    raise _Uncompilable(f'Unsupported shape of {field.name}')
+
+
+def _compile_field(model: t.Type[p.BaseModel], field: ModelField,
+                   models: t.Dict[type, NormalizerT]) -> NormalizerT:
+    validators = _field_validators(field)
+    normalize_value = _compile_shape(model, field, models)
+
+    allow_none = field.allow_none
+    if not validators:
+        if allow_none:
+            return lambda value: None if value is None else normalize_value(value)
+        # None is rejected by the normalizers of all types (or left for pydantic to reject)
+        return normalize_value
+
+    def normalize_field(value: t.Any) -> t.Any:
+        for validator in validators:
+            value = _call_validator(validator, model, value)
+        if value is None:
+            if allow_none:
+                return None
+            raise _Invalid()
+        return normalize_value(value)
+
+    return normalize_field
+
+
+def _default_factory(field: ModelField) -> t.Callable[[], t.Any]:
+    """Return a function which creates the value of a field that was not given."""
+    if field.default_factory is not None:
+        return field.default_factory
+
+    default = field.default
+    if isinstance(default, _IMMUTABLE_TYPES):
+        return lambda: default
+    if type(default) in (list, dict) and not default:
+        return type(default)
+    return functools.partial(copy.deepcopy, default)
+
+
+def _check_model(model: t.Type[p.BaseModel]) -> None:
+    config = model.__config__
+    for setting, expected in _EXPECTED_CONFIG.items():
+        if getattr(config, setting, expected) != expected:
+            raise _Uncompilable(f'{model.__name__} sets {setting}')
+    if config.extra not in (p.Extra.forbid, p.Extra.ignore):
+        raise _Uncompilable(f'{model.__name__} allows extra fields')
+    if model.__post_root_validators__:
+        raise _Uncompilable(f'{model.__name__} has post root validators')
+    if model.__custom_root_type__:
+        raise _Uncompilable(f'{model.__name__} has a custom root')
+
+
+#: The alias, normalizer, whether it is required, and the default factory of a model's field
+_FieldT = t.Tuple[str, NormalizerT, bool, t.Callable[[], t.Any]]
+
+
+def _normalize_fields(fields: t.Sequence[_FieldT], values: t.Mapping[str, t.Any],
+                      forbid_extra: bool) -> t.Dict[str, t.Any]:
+    result = {}
+    found = 0
+    for alias, normalize_field, required, default in fields:
+        if alias in values:
+            found += 1
+            result[alias] = normalize_field(values[alias])
+        elif required:
+            raise _Invalid()
+        else:
+            result[alias] = default()
+
+    if found != len(values):
+        if any(not isinstance(key, str) for key in values):
+            raise _Unsupported()
+        if forbid_extra:
+            raise _Invalid()
+    return result
+
+
+def _compile_model(model: t.Type[p.BaseModel], models: t.Dict[type, NormalizerT]
+                   ) -> NormalizerT:
+    if model in models:
+        return models[model]
+
+    _check_model(model)
+    root_validators = list(model.__pre_root_validators__)
+    forbid_extra = model.__config__.extra == p.Extra.forbid
+    fields: t.List[_FieldT] = []
+
+    def normalize_model(value: t.Any) -> t.Dict[str, t.Any]:
+        if not isinstance(value, dict):
+            raise _Unsupported()
+        # pydantic receives the data as keyword arguments so the root validators work on a copy
+        values = dict(value)
+        for validator in root_validators:
+            values = _call_validator(validator, model, values)
+        if not isinstance(values, dict):
+            raise _Unsupported()
+        return _normalize_fields(fields, values, forbid_extra)
+
+    # Register the normalizer before compiling the fields so that recursive schemas work
+    models[model] = normalize_model
+    for field in model.__fields__.values():
+        fields.append((field.alias, _compile_field(model, field, models), field.required,
+                       _default_factory(field)))
+
+    return normalize_model
+
+
+@functools.lru_cache(maxsize=None)
+def compile_model(model: t.Type[p.BaseModel]) -> t.Optional[NormalizerT]:
+    """
+    Generate a function which normalizes data for a schema.
+
+    The function takes the same data as ``model.parse_obj()`` and returns the same data as
+    ``model.parse_obj(data).dict(by_alias=True)``.  It raises an exception for data which it
+    cannot normalize.  In that case, use pydantic instead.  :func:`normalize` does both.
+
+    :arg model: The pydantic model of the schema.
+    :returns: The normalizer or None if the schema uses features that normalizers cannot be
+        generated for.
+    """
+    try:
+        return _compile_model(model, {})
+    except _Uncompilable as e:
+        mlog.fields(func='compile_model', model=model.__name__, reason=str(e)).debug(
+            'Falling back to pydantic for schema')
+        return None
+
+
+def normalize(model: t.Type[p.BaseModel], data: t.Any) -> t.Dict[str, t.Any]:
+    """
+    Validate and normalize data with a schema.
+
+    This is equivalent to ``model.parse_obj(data).dict(by_alias=True)`` but much faster for data
+    which is already well formed.
+
+    :arg model: The pydantic model of the schema.
+    :arg data: The data to normalize.
+    :returns: The normalized data.
+    :raises pydantic.ValidationError: if the data does not match the schema.
+    """
+    normalizer = compile_model(model)
+    if normalizer is not None:
+        try:
+            return normalizer(data)
+        except (_Invalid, _Unsupported):
+            pass
+    return model.parse_obj(data).dict(by_alias=True)
@@ -0,0 +1,171 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Hand records from worker processes to the main process through shared memory.
+
+Results which come back from a :python:class:`concurrent.futures.ProcessPoolExecutor` are
+unpickled into new objects in the main process.  For the normalized docs of tens of thousands of
+plugins, that means holding every record as nested dicts while the raw docs are still alive.
+
+A worker can instead :func:`share_records`: the records are serialized with
+:python:mod:`marshal` into a single shared memory segment and only small :class:`SharedRecord`
+references are pickled.  The main process keeps the compact serialized form and only turns a
+record back into dicts when it is looked up in a :class:`LazyRecordMap`.
+
+Shared memory needs :python:mod:`multiprocessing.shared_memory` (Python 3.8 or later).  Check
+:data:`HAS_SHARED_MEMORY` before using it.
+"""
+
+import marshal
+import typing as t
+from collections.abc import MutableMapping
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+#: Whether records can be shared on this version of Python
+HAS_SHARED_MEMORY = shared_memory is not None
+
+
+class SharedSegment:
+    """
+    A block of shared memory which holds serialized records.
+
+    The segment is created by a worker process and attached to when it is unpickled in the main
+    process.  The main process removes the segment's name right after attaching, so the memory
+    is freed as soon as the segment is no longer referenced.  A segment can therefore only be
+    unpickled once.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        """
+        Create a shared memory segment with data in it.
+
+        :arg data: The data to store.  It must not be empty.
+        """
+        memory = shared_memory.SharedMemory(create=True, size=len(data))
+        memory.buf[:len(data)] = data
+        self.name = memory.name
+        self.size = len(data)
+        # The worker does not need its own mapping of the data any longer
+        memory.close()
+        self._memory = None
+
+    def __getstate__(self) -> t.Dict[str, t.Any]:
+        return {'name': self.name, 'size': self.size}
+
+    def __setstate__(self, state: t.Dict[str, t.Any]) -> None:
+        self.name = state['name']
+        self.size = state['size']
+        self._memory = shared_memory.SharedMemory(name=self.name)
+        # The mapping stays valid after the name is removed.  Doing this right away means that
+        # the segment cannot outlive this process.
+        self._memory.unlink()
+
+    def load(self, start: int, end: int) -> t.Any:
+        """
+        Deserialize a record.
+
+        :arg start: Offset of the start of the record.
+        :arg end: Offset of the end of the record.
+        :returns: A new copy of the record.
+        """
+        if self._memory is None:
+            raise ValueError(f'Shared memory segment {self.name} is not attached')
+        return marshal.loads(self._memory.buf[start:end])
+
+
+class SharedRecord(t.NamedTuple):
+    """Reference to a record in a :class:`SharedSegment`."""
+
+    segment: SharedSegment
+    start: int
+    end: int
+
+    def load(self) -> t.Any:
+        """Return a new copy of the record."""
+        return self.segment.load(self.start, self.end)
+
+
+def share_records(records: t.Sequence[t.Any]) -> t.List[t.Any]:
+    """
+    Move records into a shared memory segment.
+
+    :arg records: The records to share.  They should only contain the types that
+        :python:mod:`marshal` supports.
+    :returns: A list with a :class:`SharedRecord` for each of the records.  Records which cannot
+        be serialized are returned unchanged.
+    """
+    chunks = []
+    spans: t.List[t.Optional[t.Tuple[int, int]]] = []
+    offset = 0
+    for record in records:
+        try:
+            chunk = marshal.dumps(record)
+        except ValueError:
+            spans.append(None)
+            continue
+        chunks.append(chunk)
+        spans.append((offset, offset + len(chunk)))
+        offset += len(chunk)
+
+    if not chunks:
+        return list(records)
+
+    segment = SharedSegment(b''.join(chunks))
+    return [record if span is None else SharedRecord(segment, *span)
+            for record, span in zip(records, spans)]
+
+
+def load_record(value: t.Any) -> t.Any:
+    """
+    Return the record that a value refers to.
+
+    :arg value: Either a :class:`SharedRecord` or a record.
+    :returns: The record.
+    """
+    if isinstance(value, SharedRecord):
+        return value.load()
+    return value
+
+
+class LazyRecordMap(MutableMapping):
+    """
+    Mapping whose values may be :class:`SharedRecord` references.
+
+    References are loaded every time that they are looked up so that only the records which are
+    currently in use take up memory as dicts.  Modifying a loaded record does not change the
+    shared copy.
+
+    The loaded records are deliberately not cached.  Each stage of the docs build (indexing the
+    links, writing the pages, collecting the collection contents) looks every record up once, so
+    a cache would only ever hit on a record's next stage, by which point it would hold the dicts
+    of every plugin, which is what keeping the records in shared memory avoids.  Loading a record
+    with :python:mod:`marshal` is cheap next to rendering its page.
+    """
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        self._data: t.Dict[t.Any, t.Any] = dict(*args, **kwargs)
+
+    def __getitem__(self, key: t.Any) -> t.Any:
+        return load_record(self._data[key])
+
+    def __setitem__(self, key: t.Any, value: t.Any) -> None:
+        self._data[key] = value
+
+    def __delitem__(self, key: t.Any) -> None:
+        del self._data[key]
+
+    def __iter__(self) -> t.Iterator[t.Any]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({list(self._data)!r})'
@@ -5,7 +5,9 @@
 """Output documentation."""
 
 import asyncio
+import hashlib
 import os.path
+import pkgutil
 import typing as t
 
 import aiofiles
@@ -15,7 +17,22 @@ from jinja2 import Template
 
 from .constants import THREAD_MAX
 from .docs_parsing.fqcn import get_fqcn_parts
-from .jinja2.environment import doc_environment
+from .jinja2.environment import get_doc_environment
+from .normalization_cache import schema_fingerprint
+
+if t.TYPE_CHECKING:
+    from .link_index import LinkChecker
+
+#: The modules whose code decides what the plugin pages look like besides the templates.  The
+#: paths are relative to the antsibull package.
+_RENDERER_MODULES: t.Tuple[str, ...] = (
+    'augment_docs.py',
+    'jinja2/environment.py',
+    'jinja2/filters.py',
+    'jinja2/tests.py',
+    'link_index.py',
+    'write_docs.py',
+)
 
 #: Mapping of plugins to nonfatal errors.  This is the type to use when accepting the plugin.
 #: The mapping is of plugin_type: plugin_name: [error_msgs]
@@ -24,7 +41,8 @@ PluginErrorsT = t.Mapping[str, t.Mapping[str, t.Sequence[str]]]
 
 async def write_rst(plugin_name: str, plugin_type: str, plugin_record: t.Dict[str, t.Any],
                     nonfatal_errors: PluginErrorsT, plugin_tmpl: Template, error_tmpl: Template,
-                    dest_dir: str) -> None:
+                    dest_dir: str, link_checker: t.Optional['LinkChecker'] = None
+                    ) -> t.Tuple[str, str]:
     """
     Write the rst page for one plugin.
 
@@ -39,6 +57,9 @@ async def write_rst(plugin_name: str, plugin_type: str, plugin_record: t.Dict[st
     :arg dest_dir: Destination directory for the plugin data.  For instance,
         :file:`ansible-checkout/docs/docsite/rst/`.  The directory structure underneath this
         directory will be created if needed.
+    :kwarg link_checker: If given, the ``M()``, ``L()``, and ``R()`` links in the docs are
+        resolved with it and the broken ones are recorded in it.
+    :returns: A tuple of the file that was written and the sha256 hex digest of its contents.
     """
     namespace, collection, plugin_short_name = get_fqcn_parts(plugin_name)
     collection_name = '.'.join((namespace, collection))
@@ -56,7 +77,8 @@ async def write_rst(plugin_name: str, plugin_type: str, plugin_record: t.Dict[st
             doc=plugin_record['doc'],
             examples=plugin_record['examples'],
             returndocs=plugin_record['return'],
-            nonfatal_errors=nonfatal_errors)
+            nonfatal_errors=nonfatal_errors,
+            link_checker=link_checker)
 
     collection_dir = os.path.join(dest_dir, 'collections', namespace, collection)
     # This is dangerous but the code that takes dest_dir from the user checks
@@ -65,13 +87,17 @@ async def write_rst(plugin_name: str, plugin_type: str, plugin_record: t.Dict[st
 
     plugin_file = os.path.join(collection_dir, f'{plugin_short_name}_{plugin_type}.rst')
 
-    async with aiofiles.open(plugin_file, 'w') as f:
-        await f.write(plugin_contents)
+    plugin_data = plugin_contents.encode('utf-8')
+    async with aiofiles.open(plugin_file, 'wb') as f:
+        await f.write(plugin_data)
+
+    return plugin_file, hashlib.sha256(plugin_data).hexdigest()
 
 
 async def output_all_plugin_rst(plugin_info: t.Dict[str, t.Any],
                                 nonfatal_errors: PluginErrorsT,
-                                dest_dir: str) -> None:
+                                dest_dir: str, link_checker: t.Optional['LinkChecker'] = None
+                                ) -> t.Dict[str, t.Dict[str, t.Tuple[str, str]]]:
     """
     Output rst files for each plugin.
 
@@ -79,28 +105,61 @@ async def output_all_plugin_rst(plugin_info: t.Dict[str, t.Any],
     :arg nonfatal_errors: Mapping of plugins to nonfatal errors.  Using this to note on the docs
         pages when documentation wasn't formatted such that we could use it.
     :arg dest_dir: The directory to place the documentation in.
+    :kwarg link_checker: If given, the links in the docs are checked with it.  See
+        :func:`antsibull.link_index.build_link_index`.
+    :returns: Mapping of plugin_type to plugin_name to the file that was written and the sha256
+        hex digest of its contents.
     """
     # Setup the jinja environment
-    env = doc_environment(('antsibull.data', 'docsite'))
+    env = get_doc_environment()
     # Get the templates
     plugin_tmpl = env.get_template('plugin.rst.j2')
     error_tmpl = env.get_template('plugin-error.rst.j2')
 
-    writers = []
+    writers = {}
     async with asyncio_pool.AioPool(size=THREAD_MAX) as pool:
         for plugin_type, plugins_by_type in plugin_info.items():
             for plugin_name, plugin_record in plugins_by_type.items():
-                writers.append(await pool.spawn(
+                writers[(plugin_type, plugin_name)] = await pool.spawn(
                     write_rst(plugin_name, plugin_type, plugin_record,
                               nonfatal_errors[plugin_type][plugin_name], plugin_tmpl,
-                              error_tmpl, dest_dir)))
+                              error_tmpl, dest_dir, link_checker=link_checker))
 
         # Write docs for each plugin
-        await asyncio.gather(*writers)
+        results = await asyncio.gather(*writers.values())
+
+    written: t.Dict[str, t.Dict[str, t.Tuple[str, str]]] = {}
+    for (plugin_type, plugin_name), result in zip(writers, results):
+        written.setdefault(plugin_type, {})[plugin_name] = result
+
+    return written
+
+
+def get_template_hash() -> str:
+    """
+    Return a hash of everything besides a plugin's own docs that its page depends on.
+
+    This covers the templates, the normalization schemas (see
+    :func:`antsibull.normalization_cache.schema_fingerprint`), and the code which augments the docs
+    and which the templates use.
+
+    :returns: A sha256 hex digest which changes whenever one of those changes.
+    """
+    env = get_doc_environment()
+    template_hash = hashlib.sha256()
+    template_hash.update(f'{schema_fingerprint()}\0'.encode('utf-8'))
+    for module in _RENDERER_MODULES:
+        source = pkgutil.get_data('antsibull', module)
+        template_hash.update(module.encode('utf-8') + b'\0')
+        template_hash.update(hashlib.sha256(source or b'').digest())
+    for template_name in env.list_templates(extensions=['j2']):
+        source = env.loader.get_source(env, template_name)[0]
+        template_hash.update(f'{template_name}\0{source}\0'.encode('utf-8'))
+    return template_hash.hexdigest()
 
 
 async def write_collection_list(collections: t.Iterable[str], template: Template,
-                                dest_dir: str) -> None:
+                                dest_dir: str) -> str:
     """
     Write an index page listing all of the collections.
 
@@ -109,6 +168,7 @@ async def write_collection_list(collections: t.Iterable[str], template: Template
     :arg collections: Iterable of all the collection names.
     :arg template: A template to render the collection index.
     :arg dest_dir: The destination directory to output the index into.
+    :returns: The file that was written.
     """
     index_contents = template.render(collections=collections)
     index_file = os.path.join(dest_dir, 'index.rst')
@@ -116,11 +176,13 @@ async def write_collection_list(collections: t.Iterable[str], template: Template
     async with aiofiles.open(index_file, 'w') as f:
         await f.write(index_contents)
 
+    return index_file
+
 
 async def write_plugin_lists(collection_name: str,
                              plugin_maps: t.Mapping[str, t.Mapping[str, str]],
                              template: Template,
-                             dest_dir: str) -> None:
+                             dest_dir: str) -> str:
     """
     Write an index page for each collection.
 
@@ -129,6 +191,7 @@ async def write_plugin_lists(collection_name: str,
     :arg plugin_maps: Mapping of plugin_type to Mapping of plugin_name to short_description.
     :arg template: A template to render the collection index.
     :arg dest_dir: The destination directory to output the index into.
+    :returns: The file that was written.
     """
     index_contents = template.render(
         collection_name=collection_name,
@@ -142,17 +205,20 @@ async def write_plugin_lists(collection_name: str,
     async with aiofiles.open(index_file, 'w') as f:
         await f.write(index_contents)
 
+    return index_file
+
 
 async def output_indexes(collection_info: t.Mapping[str, t.Mapping[str, t.Mapping[str, str]]],
-                         dest_dir: str) -> None:
+                         dest_dir: str) -> t.List[str]:
     """
     Generate index pages for the collections.
 
     :arg collection_info: Mapping of collection_name to Mapping of plugin_type to Mapping of
         collection_name to short_description.
     :arg dest_dir: The directory to place the documentation in.
+    :returns: The index files that were written.
     """
-    env = doc_environment(('antsibull.data', 'docsite'))
+    env = get_doc_environment()
     # Get the templates
     collection_list_tmpl = env.get_template('list_of_collections.rst.j2')
     collection_plugins_tmpl = env.get_template('plugins_by_collection.rst.j2')
@@ -170,4 +236,4 @@ async def output_indexes(collection_info: t.Mapping[str, t.Mapping[str, t.Mappin
                 write_plugin_lists(collection_name, plugin_maps, collection_plugins_tmpl,
                                    collection_dir)))
 
-        await asyncio.gather(*writers)
+        return await asyncio.gather(*writers)
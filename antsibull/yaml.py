@@ -0,0 +1,77 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Parse YAML as fast as possible.
+
+PyYAML's pure python loader is slow, especially on the large samples in ``RETURN`` docs.  These
+functions use the LibYAML based ``CSafeLoader`` when PyYAML was built with it.  Documents which are
+parsed from strings are also memoized because many plugins carry identical blocks of YAML (for
+instance, copies of the same ``RETURN`` or documentation fragment).  Every call returns a new copy
+of the data so callers are free to modify it.
+"""
+
+import copy
+import marshal
+import typing as t
+from functools import lru_cache
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader  # type: ignore[misc]
+
+
+#: Whether the LibYAML based loader is used
+HAS_LIBYAML = _SafeLoader is not yaml.SafeLoader
+
+#: Number of parsed documents to remember
+_MEMO_SIZE: int = 4096
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def _load_memoized(data: str) -> t.Tuple[bool, t.Any]:
+    """
+    Parse a document and return it in a form which can be copied quickly.
+
+    :returns: A tuple of whether the document is serialized with :python:mod:`marshal` and the
+        serialized document (or the document itself if marshal cannot store it).
+    """
+    value = yaml.load(data, Loader=_SafeLoader)  # nosec: the loader is a safe loader
+    try:
+        return True, marshal.dumps(value)
+    except ValueError:
+        # YAML can create dates, which marshal cannot store
+        return False, value
+
+
+def load_yaml(data: str) -> t.Any:
+    """
+    Parse a YAML document the way that :python:func:`yaml.safe_load` does.
+
+    :arg data: The document.
+    :returns: The parsed data.  It is a new copy even if the same document was parsed before.
+    :raises yaml.YAMLError: if the document is not valid YAML.
+    """
+    serialized, value = _load_memoized(data)
+    if serialized:
+        return marshal.loads(value)
+    return copy.deepcopy(value)
+
+
+def load_yaml_file(path: str) -> t.Any:
+    """
+    Parse a YAML file the way that :python:func:`yaml.safe_load` does.
+
+    Files are not memoized.
+
+    :arg path: The file to read.
+    :returns: The parsed data.
+    :raises yaml.YAMLError: if the file is not valid YAML.
+    :raises OSError: if the file cannot be read.
+    """
+    with open(path, 'rb') as f:
+        return yaml.load(f, Loader=_SafeLoader)  # nosec: the loader is a safe loader
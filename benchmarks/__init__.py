@@ -0,0 +1 @@
+"""Benchmarks for antsibull.  See the docstrings of the modules for how to run them."""
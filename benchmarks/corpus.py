@@ -0,0 +1,179 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Store the plugin docs that benchmarks run on.
+
+A corpus is a gzip compressed JSON file::
+
+    {
+        "format": "antsibull-benchmark-corpus",
+        "version": 1,
+        "source": {"kind": "synthetic", "seed": 0, ...},
+        "plugins": {plugin_type: {fqcn: ansible-doc record}}
+    }
+
+``plugins`` has the same structure as the return value of
+:func:`antsibull.docs_parsing.ansible_doc.get_ansible_plugin_info` so a corpus can be recorded from
+real ansible-doc output as well as generated.  ``source`` says where the records came from so that
+results from different corpora are not compared by accident.
+
+Usage::
+
+    # Generate a synthetic corpus
+    python -m benchmarks.corpus generate --plugins 5000 --seed 0 synthetic.json.gz
+
+    # Record the output of ``ansible-doc -t module --json NAME [NAME...] > modules.json``
+    python -m benchmarks.corpus record --plugin-type module modules.json recorded.json.gz
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import typing as t
+
+from antsibull.constants import DOCUMENTABLE_PLUGINS
+
+from .synthetic import GeneratorSettings, generate_plugin_info, realistic_distribution
+
+
+#: Identifies corpus files
+CORPUS_FORMAT: str = 'antsibull-benchmark-corpus'
+
+#: Change this when the structure of corpus files changes
+CORPUS_VERSION: int = 1
+
+
+class CorpusError(Exception):
+    """The file is not a corpus that can be read."""
+
+
+class Corpus(t.NamedTuple):
+    """Plugin docs to run benchmarks on."""
+
+    #: Where the records came from
+    source: t.Dict[str, t.Any]
+    #: Mapping of plugin_type to fqcn to the plugin's ansible-doc record
+    plugin_info: t.Dict[str, t.Dict[str, t.Any]]
+
+    def plugin_count(self) -> int:
+        """Return the number of plugins in the corpus."""
+        return sum(len(plugins) for plugins in self.plugin_info.values())
+
+
+def write_corpus(path: str, corpus: Corpus) -> None:
+    """
+    Write a corpus to a file.
+
+    :arg path: The file to write.
+    :arg corpus: The corpus.
+    """
+    data = {
+        'format': CORPUS_FORMAT,
+        'version': CORPUS_VERSION,
+        'source': corpus.source,
+        'plugins': corpus.plugin_info,
+    }
+    # mtime=0 so that the same corpus always produces the same file
+    with gzip.GzipFile(path, 'wb', mtime=0) as f:
+        f.write(json.dumps(data, sort_keys=True).encode('utf-8'))
+
+
+def read_corpus(path: str) -> Corpus:
+    """
+    Read a corpus from a file.
+
+    :arg path: The file to read.
+    :returns: The corpus.
+    :raises CorpusError: if the file is not a corpus of a version that can be read.
+    """
+    try:
+        with gzip.open(path, 'rb') as f:
+            data = json.loads(f.read().decode('utf-8'))
+    except (OSError, ValueError) as e:
+        raise CorpusError(f'Unable to read corpus {path}: {e}')
+
+    if not isinstance(data, dict) or data.get('format') != CORPUS_FORMAT:
+        raise CorpusError(f'{path} is not a benchmark corpus')
+    if data.get('version') != CORPUS_VERSION:
+        raise CorpusError(f'{path} has corpus version {data.get("version")}, but only version'
+                          f' {CORPUS_VERSION} can be read')
+
+    unknown = frozenset(data['plugins']) - DOCUMENTABLE_PLUGINS
+    if unknown:
+        raise CorpusError(f'{path} contains unknown plugin types: {", ".join(sorted(unknown))}')
+
+    return Corpus(data['source'], data['plugins'])
+
+
+def synthetic_corpus(plugins: int, seed: int = 0,
+                     settings: GeneratorSettings = GeneratorSettings()) -> Corpus:
+    """
+    Generate a corpus of synthetic records.
+
+    :arg plugins: Total number of plugins.  They are split between the plugin_types like in an
+        Ansible release.
+    :kwarg seed: The seed for the generator.
+    :kwarg settings: How large the records are.
+    :returns: The corpus.
+    """
+    source = {'kind': 'synthetic', 'plugins': plugins, 'seed': seed,
+              'settings': settings._asdict()}
+    return Corpus(source, generate_plugin_info(realistic_distribution(plugins), seed=seed,
+                                               settings=settings))
+
+
+def recorded_corpus(dumps: t.Iterable[t.Tuple[str, str]]) -> Corpus:
+    """
+    Create a corpus from the output of ansible-doc.
+
+    :arg dumps: Pairs of plugin_type and a file with the output of
+        ``ansible-doc -t PLUGIN_TYPE --json NAME [NAME...]``.
+    :returns: The corpus.
+    """
+    plugin_info: t.Dict[str, t.Dict[str, t.Any]] = {}
+    files = []
+    for plugin_type, path in dumps:
+        if plugin_type not in DOCUMENTABLE_PLUGINS:
+            raise CorpusError(f'Unknown plugin type {plugin_type}')
+        with open(path, 'rb') as f:
+            plugin_info.setdefault(plugin_type, {}).update(json.load(f))
+        files.append(path)
+    return Corpus({'kind': 'recorded', 'files': files}, plugin_info)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Create corpora of plugin docs for benchmarks')
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    subparsers.required = True
+
+    generate = subparsers.add_parser('generate', help='Generate synthetic plugin docs')
+    generate.add_argument('--plugins', type=int, default=5000,
+                          help='Number of plugins to generate')
+    generate.add_argument('--seed', type=int, default=0, help='Seed for the generator')
+    generate.add_argument('--depth', type=int, default=GeneratorSettings().depth,
+                          help='Deepest nesting of suboptions and return values')
+    generate.add_argument('output', help='File to write the corpus to')
+
+    record = subparsers.add_parser('record', help='Record the output of ansible-doc --json')
+    record.add_argument('--plugin-type', choices=sorted(DOCUMENTABLE_PLUGINS), required=True,
+                        help='The plugin type that the dumps are for')
+    record.add_argument('dumps', nargs='+', help='Files with the output of ansible-doc --json')
+    record.add_argument('output', help='File to write the corpus to')
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        corpus = synthetic_corpus(args.plugins, seed=args.seed,
+                                  settings=GeneratorSettings(depth=args.depth))
+    else:
+        corpus = recorded_corpus((args.plugin_type, dump) for dump in args.dumps)
+
+    write_corpus(args.output, corpus)
+    print(f'Wrote {corpus.plugin_count()} plugins to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
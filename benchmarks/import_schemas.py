@@ -0,0 +1,77 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Measure how long it takes to import the documentation schemas.
+
+Each scenario is run in a new python interpreter so that nothing is already imported.  The time
+of starting an interpreter and importing pydantic is measured separately and subtracted.
+
+Usage::
+
+    python benchmarks/import_schemas.py [--runs N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import typing as t
+
+
+#: Code to run before the measurement starts.  pydantic is imported by everything that uses the
+#: schemas so it is not part of the cost of the schemas.
+SETUP = 'import time, pydantic, antsibull.logging; start = time.perf_counter()\n'
+
+#: Mapping of scenario name to the code to measure
+SCENARIOS: t.Dict[str, str] = {
+    'baseline': '',
+    'import registry': 'from antsibull.schemas.docs import DOCS_SCHEMAS',
+    'module schemas': 'from antsibull.schemas.docs import DOCS_SCHEMAS\n'
+                      'DOCS_SCHEMAS["module"]',
+    'lookup schemas': 'from antsibull.schemas.docs import DOCS_SCHEMAS\n'
+                      'DOCS_SCHEMAS["lookup"]',
+    'all schemas': 'from antsibull.schemas.docs import DOCS_SCHEMAS\n'
+                   'for plugin_type in DOCS_SCHEMAS: DOCS_SCHEMAS[plugin_type]',
+    'ansible_doc schemas': 'import antsibull.schemas.ansible_doc',
+}
+
+REPORT = '\nprint(time.perf_counter() - start)\n'
+
+
+def time_scenario(code: str, runs: int) -> t.List[float]:
+    """
+    Run code in new interpreters.
+
+    :arg code: The code to time.
+    :arg runs: How many times to run it.
+    :returns: The time that each run took in seconds.
+    """
+    timings = []
+    for dummy_ in range(runs):
+        output = subprocess.run([sys.executable, '-c', SETUP + code + REPORT], check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+        timings.append(float(output))
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Time importing the documentation schemas')
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Number of interpreters to start for each scenario')
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_scenario(SCENARIOS['baseline'], args.runs))
+    print(f'{"scenario":<22} {"median ms":>10} {"min ms":>10}')
+    for name, code in SCENARIOS.items():
+        if name == 'baseline':
+            continue
+        timings = [timing - baseline for timing in time_scenario(code, args.runs)]
+        print(f'{name:<22} {statistics.median(timings) * 1000:>10.1f}'
+              f' {min(timings) * 1000:>10.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
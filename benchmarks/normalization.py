@@ -0,0 +1,213 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Measure how fast the documentation schemas validate and normalize plugin docs.
+
+Every schema in :data:`antsibull.schemas.docs.DOCS_SCHEMAS` and
+:data:`antsibull.schemas.ansible_doc.ANSIBLE_DOC_SCHEMAS` is run on the matching parts of every
+record in a corpus (see :mod:`benchmarks.corpus`), both with
+:func:`antsibull.schemas.normalize.normalize` and with plain pydantic
+(``parse_obj().dict(by_alias=True)``).
+:func:`antsibull.cli.doc_commands.stable.normalize_plugin_info` is measured on whole records.
+For each, the throughput in plugins per second and the memory per plugin (kept by the results and
+at the peak) are reported.
+
+Usage::
+
+    python -m benchmarks.normalization [--corpus FILE | --plugins N --seed S] [--rounds N]
+"""
+
+import argparse
+import gc
+import json
+import marshal
+import sys
+import time
+import tracemalloc
+import typing as t
+
+from pydantic import ValidationError
+
+from antsibull.cli.doc_commands.stable import normalize_plugin_info
+from antsibull.schemas.ansible_doc import ANSIBLE_DOC_SCHEMAS
+from antsibull.schemas.docs import DOCS_SCHEMAS
+from antsibull.schemas.normalize import normalize
+
+from .corpus import Corpus, read_corpus, synthetic_corpus
+
+
+class Case(t.NamedTuple):
+    """One thing to measure."""
+
+    #: The name of the schema (or function) that is measured
+    name: str
+    #: How the schema is run
+    method: str
+    #: The function to measure.  It is called with each input.
+    function: t.Callable[[t.Any], t.Any]
+    #: The inputs to run the function on
+    inputs: t.List[t.Any]
+
+
+class Result(t.NamedTuple):
+    """The measurements of a :class:`Case`."""
+
+    name: str
+    method: str
+    plugins: int
+    failures: int
+    plugins_per_sec: float
+    #: Bytes per plugin which are kept by the results
+    retained_per_plugin: float
+    #: Bytes per plugin at the peak of memory use
+    peak_per_plugin: float
+
+
+def _pydantic(schema: t.Any) -> t.Callable[[t.Any], t.Any]:
+    return lambda data: schema.parse_obj(data).dict(by_alias=True)
+
+
+def _normalize(schema: t.Any) -> t.Callable[[t.Any], t.Any]:
+    return lambda data: normalize(schema, data)
+
+
+def _schema_inputs(plugin_info: t.Mapping[str, t.Mapping[str, t.Any]]
+                   ) -> t.Dict[t.Any, t.List[t.Any]]:
+    """Return a mapping of each schema to the data from the corpus that it validates."""
+    inputs: t.Dict[t.Any, t.List[t.Any]] = {}
+    for plugin_type, plugins in sorted(plugin_info.items()):
+        for section, schema in DOCS_SCHEMAS[plugin_type].items():
+            if section == 'top':
+                data = list(plugins.values())
+            else:
+                data = [{section: record.get(section)} for record in plugins.values()]
+            inputs.setdefault(schema, []).extend(data)
+
+        ansible_doc_schema = ANSIBLE_DOC_SCHEMAS[plugin_type]
+        inputs.setdefault(ansible_doc_schema, []).extend(
+            {fqcn: record} for fqcn, record in plugins.items())
+    return inputs
+
+
+def build_cases(plugin_info: t.Mapping[str, t.Mapping[str, t.Any]]) -> t.List[Case]:
+    """
+    Create the benchmarks for a corpus.
+
+    :arg plugin_info: Mapping of plugin_type to fqcn to ansible-doc record.
+    :returns: The cases to measure.
+    """
+    cases = []
+    for schema, inputs in _schema_inputs(plugin_info).items():
+        cases.append(Case(schema.__name__, 'normalize', _normalize(schema), inputs))
+        cases.append(Case(schema.__name__, 'pydantic', _pydantic(schema), inputs))
+
+    records = [(plugin_type, record) for plugin_type, plugins in sorted(plugin_info.items())
+               for record in plugins.values()]
+    cases.append(Case('normalize_plugin_info', 'full record',
+                      lambda args: normalize_plugin_info(*args), records))
+    return cases
+
+
+def _run(function: t.Callable[[t.Any], t.Any], inputs: t.Sequence[t.Any]
+         ) -> t.Tuple[t.List[t.Any], int]:
+    results = []
+    failures = 0
+    for value in inputs:
+        try:
+            results.append(function(value))
+        except (ValidationError, ValueError):
+            failures += 1
+    return results, failures
+
+
+def _fresh_inputs(inputs: t.List[t.Any]) -> t.List[t.Any]:
+    # Some validators modify the data they are given so every round needs its own copy
+    return marshal.loads(marshal.dumps(inputs))
+
+
+def measure(case: Case, rounds: int) -> Result:
+    """
+    Measure a case.
+
+    :arg case: The case to measure.
+    :arg rounds: How many times to time it.  The fastest round is reported.
+    :returns: The measurements.
+    """
+    count = len(case.inputs)
+    best = float('inf')
+    failures = 0
+    for dummy_ in range(rounds):
+        inputs = _fresh_inputs(case.inputs)
+        gc.collect()
+        start = time.perf_counter()
+        results, failures = _run(case.function, inputs)
+        best = min(best, time.perf_counter() - start)
+        del results
+
+    inputs = _fresh_inputs(case.inputs)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    results, dummy_ = _run(case.function, inputs)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+
+    return Result(case.name, case.method, count, failures,
+                  count / best if best else float('inf'),
+                  (current - baseline) / count, (peak - baseline) / count)
+
+
+def format_results(results: t.Iterable[Result]) -> str:
+    """Return the results as a table."""
+    lines = [f'{"schema":<28} {"method":<12} {"plugins":>8} {"failed":>7} {"plugins/s":>11}'
+             f' {"KiB/plugin":>11} {"peak KiB":>9}']
+    for result in results:
+        lines.append(f'{result.name:<28} {result.method:<12} {result.plugins:>8}'
+                     f' {result.failures:>7} {result.plugins_per_sec:>11.0f}'
+                     f' {result.retained_per_plugin / 1024:>11.1f}'
+                     f' {result.peak_per_plugin / 1024:>9.1f}')
+    return '\n'.join(lines)
+
+
+def _load_corpus(args: argparse.Namespace) -> Corpus:
+    if args.corpus:
+        return read_corpus(args.corpus)
+    return synthetic_corpus(args.plugins, seed=args.seed)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the documentation schemas')
+    parser.add_argument('--corpus', default=None,
+                        help='Corpus file to run on.  By default, a synthetic corpus is'
+                        ' generated')
+    parser.add_argument('--plugins', type=int, default=500,
+                        help='Number of plugins in the generated corpus')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the generated corpus')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='Number of times to time each schema')
+    parser.add_argument('--filter', default='',
+                        help='Only run the schemas whose name contains this')
+    parser.add_argument('--json', default=None, metavar='FILE',
+                        help='Also write the results to this file')
+    args = parser.parse_args()
+
+    corpus = _load_corpus(args)
+    print(f'Corpus: {json.dumps(corpus.source, sort_keys=True)}')
+    print(f'Plugins: {corpus.plugin_count()}\n')
+
+    results = [measure(case, args.rounds) for case in build_cases(corpus.plugin_info)
+               if args.filter in case.name]
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'source': corpus.source,
+                       'results': [result._asdict() for result in results]}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
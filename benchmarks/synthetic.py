@@ -0,0 +1,261 @@
+# coding: utf-8
+# Author: Toshio Kuratomi <tkuratom@redhat.com>
+# License: GPLv3+
+# Copyright: Ansible Project, 2020
+"""
+Generate realistic ansible-doc output for benchmarks.
+
+The records look like what ``ansible-doc --json`` returns after it has merged the documentation
+fragments: modules with deeply nested suboptions, non-module plugins with ``env``/``ini``/``vars``
+configuration, large ``RETURN`` samples, and options which many plugins share because they come
+from the same fragments.  Some records use the older spellings that the schemas normalize (scalar
+descriptions, ``type: boolean``, ``example`` instead of ``sample``) so that the validators run too.
+
+The output only depends on the seed so that benchmark runs can be compared.
+"""
+
+import copy
+import random
+import typing as t
+
+from antsibull.constants import DOCUMENTABLE_PLUGINS
+
+
+#: Words that descriptions are made of
+_WORDS: t.Tuple[str, ...] = (
+    'the', 'host', 'name', 'value', 'to', 'of', 'use', 'when', 'is', 'this', 'for', 'set', 'a',
+    'connection', 'option', 'state', 'resource', 'module', 'C(present)', 'I(name)', 'M(copy)',
+    'if', 'not', 'will', 'be', 'returned', 'U(https://docs.ansible.com)', 'with', 'from',
+    'interface', 'vlan', 'policy', 'timeout', 'B(must)', 'configuration', 'and', 'only',
+)
+
+_OPTION_TYPES: t.Tuple[str, ...] = ('str', 'int', 'bool', 'list', 'dict', 'path', 'raw', 'float')
+_RETURN_TYPES: t.Tuple[str, ...] = ('str', 'int', 'bool', 'list', 'dict', 'complex', 'float')
+_LEGACY_TYPES: t.Dict[str, str] = {'bool': 'boolean', 'int': 'integer', 'str': 'string',
+                                   'dict': 'dictionary'}
+
+_NAMESPACES: t.Tuple[str, ...] = ('community.general', 'community.network', 'cisco.ios',
+                                  'amazon.aws', 'ansible.netcommon', 'ansible.builtin')
+
+
+class GeneratorSettings(t.NamedTuple):
+    """How large and how deep the generated docs are."""
+
+    #: Number of documentation fragments that plugins pick their shared options from
+    fragments: int = 60
+    #: Most fragments that one plugin uses
+    fragments_per_plugin: int = 6
+    #: Most options at the toplevel of a plugin
+    options: int = 25
+    #: Deepest nesting of suboptions and of the ``contains`` of return values
+    depth: int = 4
+    #: Most return values at the toplevel of a module
+    returns: int = 12
+    #: Most items in the list samples of return values
+    sample_items: int = 40
+
+
+class _Generator:
+    """Produce the pieces of a record from a seeded random number generator."""
+
+    def __init__(self, seed: int, settings: GeneratorSettings) -> None:
+        self.random = random.Random(seed)
+        self.settings = settings
+        self.fragments = [self.options(self.random.randint(1, 6), depth=2, plugin_type='module')
+                          for dummy_ in range(settings.fragments)]
+
+    def sentence(self, minimum: int = 4, maximum: int = 24) -> str:
+        words = self.random.choices(_WORDS, k=self.random.randint(minimum, maximum))
+        return ' '.join(words).capitalize() + '.'
+
+    def description(self) -> t.Union[str, t.List[str]]:
+        if self.random.random() < 0.2:
+            # Older docs use a string instead of a list
+            return self.sentence()
+        return [self.sentence() for dummy_ in range(self.random.randint(1, 4))]
+
+    def identifier(self) -> str:
+        return '_'.join(self.random.choices(_WORDS[:20], k=self.random.randint(1, 3))).lower()
+
+    def version(self) -> str:
+        return f'{self.random.randint(1, 2)}.{self.random.randint(0, 10)}.0'
+
+    def option_type(self, choices: t.Sequence[str]) -> str:
+        option_type = self.random.choice(choices)
+        if self.random.random() < 0.1:
+            return _LEGACY_TYPES.get(option_type, option_type)
+        return option_type
+
+    def plugin_config(self, name: str) -> t.Dict[str, t.Any]:
+        """Return the env, ini, and vars entries of a non-module plugin's option."""
+        upper = name.upper()
+        config: t.Dict[str, t.Any] = {}
+        if self.random.random() < 0.6:
+            config['env'] = [{'name': f'ANSIBLE_{upper}'}]
+        if self.random.random() < 0.4:
+            config['ini'] = [{'key': name, 'section': 'defaults'}]
+        if self.random.random() < 0.4:
+            config['vars'] = [{'name': f'ansible_{name}', 'version_added': self.version()}]
+        return config
+
+    def option(self, name: str, depth: int, plugin_type: str) -> t.Dict[str, t.Any]:
+        option: t.Dict[str, t.Any] = {'description': self.description(),
+                                      'type': self.option_type(_OPTION_TYPES)}
+        roll = self.random.random()
+        if roll < 0.3:
+            option['choices'] = [self.identifier() for dummy_ in range(self.random.randint(2, 8))]
+            option['default'] = option['choices'][0]
+        elif roll < 0.5:
+            option['default'] = self.random.choice([True, False, 10, 'auto', None])
+        if self.random.random() < 0.2:
+            option['aliases'] = [f'{name}_{index}' for index in range(self.random.randint(1, 3))]
+        if self.random.random() < 0.15:
+            option['required'] = True
+        if self.random.random() < 0.3:
+            option['version_added'] = self.version()
+        if self.random.random() < 0.02:
+            option['deprecated'] = {'version': '3.0.0', 'why': self.sentence(),
+                                    'alternative': self.sentence()}
+        if plugin_type != 'module':
+            option.update(self.plugin_config(name))
+
+        if depth > 0 and option['type'] in ('dict', 'list') and self.random.random() < 0.6:
+            if option['type'] == 'list':
+                option['elements'] = 'dict'
+            option['suboptions'] = self.options(self.random.randint(2, 8), depth - 1, plugin_type)
+        return option
+
+    def options(self, count: int, depth: int, plugin_type: str) -> t.Dict[str, t.Any]:
+        options = {}
+        for index in range(count):
+            name = f'{self.identifier()}_{index}'
+            options[name] = self.option(name, depth, plugin_type)
+        return options
+
+    def sample(self, return_type: str) -> t.Any:
+        if return_type == 'list':
+            return [{'id': index, 'name': self.identifier(), 'state': 'present',
+                     'tags': {'owner': self.identifier()}}
+                    for index in range(self.random.randint(1, self.settings.sample_items))]
+        if return_type in ('dict', 'complex'):
+            return {self.identifier(): self.sentence() for dummy_ in range(8)}
+        if return_type in ('int', 'float'):
+            return self.random.randint(0, 65535)
+        if return_type == 'bool':
+            return self.random.random() < 0.5
+        return self.sentence(2, 8)
+
+    def return_value(self, depth: int) -> t.Dict[str, t.Any]:
+        return_type = self.random.choice(_RETURN_TYPES)
+        value: t.Dict[str, t.Any] = {
+            'description': self.description(),
+            'returned': self.random.choice(['always', 'success', 'changed', 'when supported']),
+            'type': return_type,
+        }
+        # Older docs use example instead of sample
+        value['example' if self.random.random() < 0.1 else 'sample'] = self.sample(return_type)
+        if depth > 0 and return_type in ('dict', 'complex', 'list'):
+            if return_type == 'list':
+                value['elements'] = 'dict'
+            value['contains'] = {f'{self.identifier()}_{index}': self.return_value(depth - 1)
+                                 for index in range(self.random.randint(1, 6))}
+        return value
+
+    def examples(self, name: str) -> str:
+        tasks = []
+        for dummy_ in range(self.random.randint(1, 6)):
+            tasks.append(f'- name: {self.sentence(3, 8)}\n  {name}:\n'
+                         f'    {self.identifier()}: {self.identifier()}\n'
+                         f'    state: present\n')
+        return '\n' + '\n'.join(tasks)
+
+    def doc(self, plugin_type: str, name: str, filename: str) -> t.Dict[str, t.Any]:
+        settings = self.settings
+        depth = settings.depth if plugin_type == 'module' else 1
+        options = self.options(self.random.randint(0, settings.options), depth, plugin_type)
+        # Merged fragments put the same options into many plugins
+        for fragment in self.random.sample(self.fragments,
+                                           self.random.randint(0, settings.fragments_per_plugin)):
+            options.update(copy.deepcopy(fragment))
+
+        doc: t.Dict[str, t.Any] = {
+            # Shell plugins have no field named after their plugin_type
+            'name' if plugin_type == 'shell' else plugin_type: name,
+            'short_description': self.sentence(3, 8),
+            'description': self.description(),
+            'author': [f'{self.identifier().title()} (@{self.identifier()})'
+                       for dummy_ in range(self.random.randint(1, 3))],
+            'filename': filename,
+            'options': options,
+            'version_added': self.version(),
+        }
+        if plugin_type == 'callback':
+            doc['type'] = self.random.choice(['aggregate', 'notification', 'stdout'])
+        if self.random.random() < 0.5:
+            doc['notes'] = [self.sentence() for dummy_ in range(self.random.randint(1, 4))]
+        if self.random.random() < 0.4:
+            doc['requirements'] = [f'python >= 3.{self.random.randint(5, 9)}']
+        if self.random.random() < 0.3:
+            doc['seealso'] = [{'module': 'ansible.builtin.copy'},
+                              {'ref': 'playbooks_intro', 'description': self.sentence()},
+                              {'link': 'https://docs.ansible.com', 'name': 'Ansible',
+                               'description': self.sentence()}]
+        return doc
+
+    def record(self, plugin_type: str, fqcn: str) -> t.Dict[str, t.Any]:
+        name = fqcn.rsplit('.', 1)[-1]
+        namespace, collection = fqcn.split('.')[:2]
+        filename = (f'/tmp/collections/ansible_collections/{namespace}/{collection}/plugins/'
+                    f'{plugin_type}/{name}.py')
+        returns = None
+        if plugin_type == 'module' or self.random.random() < 0.2:
+            returns = {f'{self.identifier()}_{index}': self.return_value(self.settings.depth - 1)
+                       for index in range(self.random.randint(0, self.settings.returns))}
+        return {
+            'doc': self.doc(plugin_type, name, filename),
+            'examples': self.examples(name),
+            'metadata': {'status': ['preview'], 'supported_by': 'community'},
+            'return': returns,
+        }
+
+
+def generate_plugin_info(plugins_per_type: t.Mapping[str, int], seed: int = 0,
+                         settings: GeneratorSettings = GeneratorSettings()
+                         ) -> t.Dict[str, t.Dict[str, t.Any]]:
+    """
+    Generate ansible-doc output for a set of plugins.
+
+    :arg plugins_per_type: Mapping of plugin_type to the number of plugins to generate.
+    :kwarg seed: The seed of the random number generator.  The same seed and settings always
+        generate the same records.
+    :kwarg settings: How large the records are.
+    :returns: Mapping of plugin_type to fqcn to the plugin's record.  This has the same structure
+        as :func:`antsibull.docs_parsing.ansible_doc.get_ansible_plugin_info` returns.
+    """
+    generator = _Generator(seed, settings)
+    plugin_info: t.Dict[str, t.Dict[str, t.Any]] = {}
+    # Sorted because the order of a frozenset changes between runs
+    for plugin_type in sorted(DOCUMENTABLE_PLUGINS):
+        plugins = plugin_info[plugin_type] = {}
+        for index in range(plugins_per_type.get(plugin_type, 0)):
+            fqcn = f'{generator.random.choice(_NAMESPACES)}.{plugin_type}_{index}'
+            plugins[fqcn] = generator.record(plugin_type, fqcn)
+    return plugin_info
+
+
+def realistic_distribution(total: int) -> t.Dict[str, int]:
+    """
+    Split a number of plugins between the plugin_types like in an Ansible release.
+
+    :arg total: The number of plugins.
+    :returns: Mapping of plugin_type to the number of plugins of that type.
+    """
+    # Roughly the share of each plugin_type in Ansible 2.10
+    weights = {'module': 80, 'lookup': 5, 'callback': 3, 'inventory': 3, 'connection': 2,
+               'become': 1, 'cache': 1, 'cliconf': 2, 'httpapi': 1, 'netconf': 1, 'shell': 1,
+               'strategy': 1, 'vars': 1}
+    scale = sum(weights.values())
+    counts = {plugin_type: max(1, total * weight // scale)
+              for plugin_type, weight in weights.items()}
+    counts['module'] += max(0, total - sum(counts.values()))
+    return counts
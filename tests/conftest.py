@@ -0,0 +1,42 @@
+import os
+import textwrap
+
+import pytest
+
+from antsibull.jinja2 import environment
+
+
+@pytest.fixture(autouse=True, scope='session')
+def template_cache(tmp_path_factory):
+    """Cache the compiled templates in a temporary directory instead of the user's cache."""
+    old_value = os.environ.get(environment.TEMPLATE_CACHE_ENV_VAR)
+    os.environ[environment.TEMPLATE_CACHE_ENV_VAR] = str(tmp_path_factory.mktemp('templates'))
+    environment._bytecode_cache.cache_clear()
+    environment._shared_doc_environment.cache_clear()
+    environment._data_environment.cache_clear()
+    yield
+    if old_value is None:
+        del os.environ[environment.TEMPLATE_CACHE_ENV_VAR]
+    else:
+        os.environ[environment.TEMPLATE_CACHE_ENV_VAR] = old_value
+    environment._bytecode_cache.cache_clear()
+    environment._shared_doc_environment.cache_clear()
+    environment._data_environment.cache_clear()
+
+
+@pytest.fixture
+def write_tree(tmp_path):
+    """
+    Return a function which writes files under tmp_path.
+
+    The function takes a mapping of paths relative to tmp_path to the contents of the files.  The
+    contents are dedented so that they can be indented like the code around them.  It returns
+    tmp_path.
+    """
+    def write(files):
+        for filename, contents in files.items():
+            path = tmp_path / filename
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(textwrap.dedent(contents))
+        return tmp_path
+    return write
@@ -0,0 +1,239 @@
+import json
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import sh
+
+from antsibull.docs_parsing import ansible_doc as ad
+
+
+PLUGINS = {f'plugin{i}': f'Short description {i}' for i in range(10)}
+PLUGINS['broken'] = 'This plugin cannot be documented'
+
+
+class FakeAnsibleDoc:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, *args, _timeout=None):
+        self.calls.append(args)
+        if '--list' in args:
+            return types.SimpleNamespace(stdout=json.dumps(PLUGINS).encode('utf-8'))
+
+        names = args[args.index('--json') + 1:]
+        if 'broken' in names:
+            raise sh.ErrorReturnCode_1('ansible-doc', b'', b'broken plugin')
+        if 'hangs' in names:
+            time.sleep(_timeout)
+            raise sh.TimeoutException(9, 'ansible-doc')
+        if 'lagging' in names and len(names) == 4:
+            time.sleep(1)
+        if 'dawdling' in names and len(self.calls) == 1:
+            time.sleep(1)
+
+        docs = {name: {'doc': {'name': name}, 'examples': '', 'return': {}, 'metadata': None}
+                for name in names}
+        return types.SimpleNamespace(stdout=json.dumps(docs).encode('utf-8'))
+
+
+@pytest.mark.parametrize('num_plugins, max_workers, expected', [
+    (0, 4, 1),
+    (10, 4, 3),
+    (10, 20, 1),
+    (10000, 2, ad.BATCH_MAX),
+])
+def test_chunk_size(num_plugins, max_workers, expected):
+    assert ad._chunk_size(num_plugins, max_workers) == expected
+
+
+@pytest.mark.asyncio
+async def test_scheduler_isolates_broken_plugin():
+    ansible_doc = FakeAnsibleDoc()
+    scheduler = ad.AnsibleDocScheduler(ansible_doc, max_workers=2)
+    results = await scheduler.run({'module': list(PLUGINS)})
+
+    module_results = results['module']
+    assert sorted(module_results) == sorted(PLUGINS)
+    assert module_results['plugin3']['doc']['name'] == 'plugin3'
+    assert isinstance(module_results['broken'], sh.ErrorReturnCode)
+
+    # Only one plugin at a time is documented once the broken plugin has been isolated
+    single_calls = [c for c in ansible_doc.calls if c[-1] == 'broken' and c[-2] == '--json']
+    assert len(single_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_expensive_plugins_first():
+    ansible_doc = FakeAnsibleDoc()
+    costs = {'module': {f'plugin{i}': i for i in range(10)}, 'lookup': {'big': 100}}
+    scheduler = ad.AnsibleDocScheduler(ansible_doc, max_workers=1, costs=costs)
+    results = await scheduler.run({'module': [f'plugin{i}' for i in range(10)],
+                                   'lookup': ['big']})
+
+    assert sorted(results) == ['lookup', 'module']
+    assert len(results['module']) == 10
+    # The most expensive plugins are batched together and the batches run in order of cost
+    batches = [c[c.index('--json') + 1:] for c in ansible_doc.calls]
+    assert batches == [('big',), ('plugin9', 'plugin8', 'plugin7'),
+                       ('plugin6', 'plugin5', 'plugin4'), ('plugin3', 'plugin2', 'plugin1'),
+                       ('plugin0',)]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_times_out_slow_plugin(monkeypatch):
+    monkeypatch.setattr(ad, 'PLUGIN_TIMEOUT_PER_PLUGIN', 0.05)
+    ansible_doc = FakeAnsibleDoc()
+    scheduler = ad.AnsibleDocScheduler(ansible_doc, max_workers=1, plugin_timeout=0.1)
+    assert scheduler._timeout(1) == 0.1
+    assert scheduler._timeout(4) == pytest.approx(0.25)
+
+    names = ['hangs'] + [f'plugin{i}' for i in range(15)]
+    results = await scheduler.run({'module': names})
+
+    module_results = results['module']
+    assert isinstance(module_results['hangs'], ad.PluginTimeoutError)
+    assert 'within 0.1 seconds' in str(module_results['hangs'])
+    assert all(module_results[f'plugin{i}']['doc']['name'] == f'plugin{i}' for i in range(15))
+    # The batch which timed out was bisected instead of retrying each of its plugins
+    batches = [c[c.index('--json') + 1:] for c in ansible_doc.calls]
+    assert ('plugin10', 'plugin1', 'plugin0', 'hangs') in batches
+    assert ('plugin10', 'plugin1') in batches
+    assert ('plugin0', 'hangs') in batches
+    assert ('plugin1', ) not in batches
+
+
+@pytest.mark.asyncio
+async def test_scheduler_hedges_straggler(monkeypatch):
+    monkeypatch.setattr(ad, '_HEDGE_MIN_SAMPLES', 2)
+    monkeypatch.setattr(ad, '_HEDGE_POLL_INTERVAL', 0.05)
+    ansible_doc = FakeAnsibleDoc()
+    costs = {'module': {'lagging': 100, 'big0': 100, 'big1': 100, 'big2': 100}}
+    costs['module'].update((f'small{i}', 1) for i in range(24))
+    scheduler = ad.AnsibleDocScheduler(ansible_doc, max_workers=2, costs=costs)
+
+    started = time.monotonic()
+    results = await scheduler.run({'module': list(costs['module'])})
+
+    assert sorted(results['module']) == sorted(costs['module'])
+    assert results['module']['lagging']['doc']['name'] == 'lagging'
+    # The slow batch of the four expensive plugins was hedged with two batches of two
+    batches = [c[c.index('--json') + 1:] for c in ansible_doc.calls]
+    assert batches[0] == ('lagging', 'big2', 'big1', 'big0')
+    assert ('lagging', 'big2') in batches
+    assert ('big1', 'big0') in batches
+    assert time.monotonic() - started >= 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_hedges_single_plugin(monkeypatch):
+    monkeypatch.setattr(ad, '_HEDGE_MIN_SAMPLES', 2)
+    monkeypatch.setattr(ad, '_HEDGE_POLL_INTERVAL', 0.05)
+    ansible_doc = FakeAnsibleDoc()
+    names = ['dawdling'] + [f'plugin{i}' for i in range(10)]
+    costs = {'module': {name: 100 if name == 'dawdling' else 1 for name in names}}
+    scheduler = ad.AnsibleDocScheduler(ansible_doc, max_workers=3, costs=costs)
+    results = await scheduler.run({'module': names})
+
+    assert results['module']['dawdling']['doc']['name'] == 'dawdling'
+    # The first run of the plugin was slow so it was run again
+    batches = [c[c.index('--json') + 1:] for c in ansible_doc.calls]
+    assert batches[0] == ('dawdling', )
+    assert batches.count(('dawdling', )) == 2
+
+
+class FakeVenv:
+    def __init__(self, ansible_doc):
+        self.ansible_doc = ansible_doc
+
+    def get_command(self, name):
+        return types.SimpleNamespace(bake=lambda *args, **kwargs: self.ansible_doc)
+
+
+@pytest.mark.asyncio
+async def test_get_ansible_plugin_info_records_timeouts(capsys):
+    class TimingOutAnsibleDoc(FakeAnsibleDoc):
+        def __call__(self, *args, _timeout=None):
+            if 'hangs' in args:
+                raise sh.TimeoutException(9, 'ansible-doc')
+            return super().__call__(*args, _timeout=_timeout)
+
+    results = await ad.get_ansible_plugin_info(FakeVenv(TimingOutAnsibleDoc()), '/dev/null',
+                                               plugin_names={'module': ['hangs', 'plugin0']})
+
+    assert results['module']['ansible.builtin.plugin0']['doc']['name'] == 'plugin0'
+    assert 'did not finish documenting hangs' in (
+        results['module']['ansible.builtin.hangs']['error'])
+    # The timeout is reported with the nonfatal errors instead of on stderr
+    assert 'hangs' not in capsys.readouterr().err
+
+
+class FakeDumpingAnsibleDoc:
+    def __init__(self, help_text):
+        self.help_text = help_text
+        self.calls = []
+
+    def __call__(self, *args, _out=None):
+        self.calls.append(args)
+        if '--help' in args:
+            return types.SimpleNamespace(stdout=self.help_text.encode('utf-8'))
+
+        dump = {'all': {
+            'module': {
+                'ping': {'doc': {'name': 'ping'}, 'examples': '', 'return': {}, 'metadata': None},
+                'community.general.broken': {'error': 'unable to parse'},
+            },
+            'lookup': {
+                'community.general.foo': {'doc': {'name': 'foo'}, 'examples': '', 'return': {},
+                                          'metadata': None},
+            },
+            # Types that antsibull does not document are ignored
+            'filter': {'ansible.builtin.b64decode': {}},
+        }}
+        with open(_out, 'w') as f:
+            f.write('Using /etc/ansible/ansible.cfg as config file\n')
+            json.dump(dump, f)
+
+
+@pytest.mark.asyncio
+async def test_metadata_dump():
+    ansible_doc = FakeDumpingAnsibleDoc('--metadata-dump  --no-fail-on-errors')
+    results = await ad._try_metadata_dump(ansible_doc)
+
+    assert ('--metadata-dump', '--no-fail-on-errors') in ansible_doc.calls
+    assert sorted(results) == sorted(ad.DOCUMENTABLE_PLUGINS)
+    assert sorted(results['module']) == ['ansible.builtin.ping', 'community.general.broken']
+    assert list(results['lookup']) == ['community.general.foo']
+    assert results['become'] == {}
+    # Plugins which could not be documented are recorded as nonfatal errors
+    assert results['module']['community.general.broken'] == {
+        'error': 'ansible-doc was unable to document community.general.broken: unable to parse'}
+
+
+@pytest.mark.asyncio
+async def test_metadata_dump_unsupported():
+    ansible_doc = FakeDumpingAnsibleDoc('usage: ansible-doc [-h]')
+    assert await ad._try_metadata_dump(ansible_doc) is None
+    assert ansible_doc.calls == [('--help',)]
+
+
+def describe_plugins(plugin_type, plugin_docs):
+    return {name: {'type': plugin_type, 'name': record['doc']['name']}
+            for name, record in plugin_docs.items()}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_postprocesses_in_workers(monkeypatch):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        monkeypatch.setattr(ad, 'get_process_pool', lambda: executor)
+        ansible_doc = FakeAnsibleDoc()
+        scheduler = ad.AnsibleDocScheduler(ansible_doc, max_workers=2, plugin_timeout=0.1,
+                                           postprocess=describe_plugins)
+        results = await scheduler.run({'module': list(PLUGINS) + ['hangs']})
+
+    module_results = results['module']
+    assert module_results['plugin3'] == {'type': 'module', 'name': 'plugin3'}
+    assert isinstance(module_results['broken'], sh.ErrorReturnCode)
+    assert isinstance(module_results['hangs'], ad.PluginTimeoutError)
+    assert 'hangs within 0.1 seconds' in str(module_results['hangs'])
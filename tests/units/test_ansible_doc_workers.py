@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from antsibull.docs_parsing.ansible_doc import ParsingError
+from antsibull.docs_parsing.ansible_doc_workers import AnsibleDocWorkerPool, WorkerError
+
+
+# Just enough of ansible's API for the worker to answer requests
+FAKE_ANSIBLE = {
+    '__init__.py': '',
+    'parsing/__init__.py': '',
+    'parsing/ajson.py': 'import json\nAnsibleJSONEncoder = json.JSONEncoder\n',
+    'plugins/__init__.py': '',
+    'plugins/loader.py': '''
+import os
+print("noise which must not corrupt the protocol")
+
+
+class Context:
+    def __init__(self, name):
+        self.resolved = name != 'missing'
+        self.plugin_resolved_path = '/plugins/%s.py' % name.rsplit('.', 1)[-1]
+        self.plugin_resolved_collection = (
+            name.rsplit('.', 1)[0] if name.count('.') == 2 else 'ansible.builtin')
+
+
+class Loader:
+    def find_plugin_with_context(self, name, **kwargs):
+        return Context(name)
+
+
+module_loader = Loader()
+fragment_loader = None
+''',
+    'utils/__init__.py': '',
+    'utils/plugin_docs.py': '''
+def get_docstring(filename, fragment_loader, verbose=False, collection_name=None,
+                  is_module=False):
+    if 'broken' in filename:
+        raise Exception('unparsable documentation')
+    if 'hang' in filename:
+        __import__('time').sleep(60)
+    name = filename.rsplit('/', 1)[1][:-3]
+    return {'module': name, 'pid': __import__('os').getpid()}, 'EXAMPLES', None, None
+''',
+}
+
+
+@pytest.fixture
+def fake_ansible_env(write_tree):
+    tmp_path = write_tree({f'ansible/{filename}': contents
+                           for filename, contents in FAKE_ANSIBLE.items()})
+    env = os.environ.copy()
+    env['PYTHONPATH'] = str(tmp_path)
+    return env
+
+
+@pytest.mark.asyncio
+async def test_worker_pool(fake_ansible_env):
+    pool = AnsibleDocWorkerPool(sys.executable, fake_ansible_env, num_workers=1, max_requests=2)
+    try:
+        first = await pool.get_doc('module', 'ping')
+        assert first['doc']['module'] == 'ping'
+        assert first['doc']['filename'] == '/plugins/ping.py'
+        assert first['doc']['collection'] == 'ansible.builtin'
+        assert first['examples'] == 'EXAMPLES'
+
+        with pytest.raises(ParsingError, match='unparsable documentation'):
+            await pool.get_doc('module', 'broken')
+
+        # The worker was recycled after answering two requests
+        third = await pool.get_doc('module', 'setup')
+        assert third['doc']['pid'] != first['doc']['pid']
+
+        with pytest.raises(ParsingError, match='missing was not found'):
+            await pool.get_doc('module', 'missing')
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_timeout(fake_ansible_env):
+    pool = AnsibleDocWorkerPool(sys.executable, fake_ansible_env, num_workers=1, timeout=2)
+    try:
+        with pytest.raises(WorkerError, match='did not document community.general.hang'):
+            await pool.get_doc('module', 'community.general.hang')
+
+        # The hung worker was replaced
+        result = await pool.get_doc('module', 'community.general.ufw')
+        assert result['doc']['collection'] == 'community.general'
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_close_kills_busy_workers(fake_ansible_env):
+    pool = AnsibleDocWorkerPool(sys.executable, fake_ansible_env, num_workers=2)
+    await pool.get_doc('module', 'ping')
+    request = asyncio.ensure_future(pool.get_doc('module', 'hang'))
+    while len(pool._workers) < 2:
+        await asyncio.sleep(0.1)
+
+    await asyncio.wait_for(pool.close(), 10)
+    with pytest.raises(WorkerError):
+        await request
@@ -0,0 +1,71 @@
+import pytest
+
+from antsibull import augment_docs
+from antsibull.cli.doc_commands import stable
+
+
+def record():
+    return {
+        'doc': {'options': {
+            'data': {'suboptions': {'inner': {'suboptions': {'deep': {}}}, 'other': {}}},
+            'flag': {},
+        }},
+        'return': {'result': {'contains': {'items': {}}}},
+    }
+
+
+def test_full_key():
+    plugin = record()
+    augment_docs.augment_docs({'module': {'ns.col.thing': plugin}})
+
+    options = plugin['doc']['options']
+    assert options['flag']['full_key'] == ('flag', )
+    assert options['data']['suboptions']['other']['full_key'] == ('data', 'other')
+    deep = options['data']['suboptions']['inner']['suboptions']['deep']
+    assert deep['full_key'] == ('data', 'inner', 'deep')
+    assert plugin['return']['result']['contains']['items']['full_key'] == ('result', 'items')
+
+
+def test_add_full_key_prefix():
+    options = {'inner': {}}
+    augment_docs.add_full_key(options, 'suboptions', ('data', ))
+    assert options['inner']['full_key'] == ('data', 'inner')
+
+
+def test_registered_augmentations(monkeypatch):
+    monkeypatch.setattr(augment_docs, '_ENTRY_AUGMENTATIONS',
+                        list(augment_docs._ENTRY_AUGMENTATIONS))
+    monkeypatch.setattr(augment_docs, '_RECORD_AUGMENTATIONS', [])
+
+    @augment_docs.register_entry_augmentation
+    def add_depth(entry, full_key, suboption_entry):
+        entry['depth'] = (suboption_entry, len(full_key))
+
+    @augment_docs.register_record_augmentation
+    def add_type(plugin_type, plugin_record):
+        plugin_record['plugin_type'] = plugin_type
+
+    plugin = record()
+    augment_docs.augment_plugin('module', plugin)
+
+    assert plugin['plugin_type'] == 'module'
+    assert plugin['doc']['options']['data']['suboptions']['inner']['depth'] == ('suboptions', 2)
+    assert plugin['return']['result']['contains']['items']['depth'] == ('contains', 2)
+    # The builtin augmentations run in the same pass
+    assert plugin['return']['result']['full_key'] == ('result', )
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_workers_augment_records(compact):
+    plugin = {
+        'doc': {'name': 'ping', 'short_description': 'The ping module', 'description': 'Ping.',
+                'author': 'Nobody',
+                'options': {'data': {'description': 'Data',
+                                     'suboptions': {'inner': {'description': 'Inner'}}}}},
+        'examples': '',
+        'return': {},
+    }
+    results = stable._normalize_plugin_batch([('module', plugin)], compact=compact)
+
+    options = results[0][0]['doc']['options']
+    assert options['data']['suboptions']['inner']['full_key'] == ('data', 'inner')
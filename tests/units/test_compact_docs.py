@@ -0,0 +1,131 @@
+import copy
+import pickle
+
+import pytest
+
+from antsibull.augment_docs import augment_docs
+from antsibull.jinja2.environment import doc_environment
+from antsibull.schemas.compact import CompactRecord, compact_values, record_class
+from antsibull.schemas.docs import DOCS_SCHEMAS
+from antsibull.schemas.normalize import normalize
+from antsibull.schemas.plugin import PluginOptionsSchema
+
+
+RAW_RECORD = {
+    'doc': {
+        'name': 'thing',
+        'short_description': 'Does things',
+        'description': 'Does things to things.',
+        'author': 'Nobody',
+        'version_added': '2.10',
+        'seealso': [{'module': 'ansible.builtin.ping'}],
+        'options': {
+            'state': {'description': 'The state.', 'choices': ['present', 'absent'],
+                      'default': 'present', 'aliases': ['status']},
+            'data': {'description': 'Data.', 'type': 'dict', 'suboptions': {
+                'inner': {'description': 'Inner.', 'type': 'bool', 'default': False,
+                          'deprecated': {'why': 'Old', 'version': '3.0.0'}},
+            }},
+        },
+    },
+    'examples': '- thing:\n',
+    'return': {
+        'ansible_facts': {'description': 'Facts.', 'type': 'dict', 'contains': {
+            'fact': {'description': 'A fact.', 'sample': [1, 2]}}},
+        'result': {'description': 'The result.', 'type': 'str', 'sample': 'done'},
+    },
+}
+
+
+def normalized_record(plugin_type='module'):
+    record = {}
+    for field in ('doc', 'examples', 'return'):
+        record.update(normalize(DOCS_SCHEMAS[plugin_type][field], {field: RAW_RECORD[field]}))
+    return record
+
+
+@pytest.mark.parametrize('plugin_type', ['module', 'lookup'])
+def test_compact_values(plugin_type):
+    record = normalized_record(plugin_type)
+    compact = compact_values(DOCS_SCHEMAS[plugin_type]['top'], record)
+
+    assert isinstance(compact, dict)
+    assert isinstance(compact['doc'], CompactRecord)
+    assert isinstance(compact['doc']['options']['data']['suboptions']['inner'], CompactRecord)
+    assert isinstance(compact['return']['ansible_facts']['contains']['fact'], CompactRecord)
+    # seealso entries are a union of schemas so they stay dicts
+    assert type(compact['doc']['seealso'][0]) is dict
+    assert compact == record
+    assert list(compact['doc']) == list(record['doc'])
+    assert pickle.loads(pickle.dumps(compact)) == record
+
+
+def test_defaults_are_not_stored():
+    record = record_class(PluginOptionsSchema)()
+    record['description'] = ['Stuff']
+    record['aliases'] = []
+
+    assert record['aliases'] == []
+    assert record['version_added'] == 'historical'
+    assert 'full_key' not in record
+    assert len(record) == len(PluginOptionsSchema.__fields__)
+
+    # Elided empty containers are created on first access and then kept
+    record_compact = compact_values(DOCS_SCHEMAS['lookup']['top'], normalized_record('lookup'))
+    option = record_compact['doc']['options']['data']['suboptions']['inner']
+    other = record_compact['doc']['options']['state']
+    assert option['aliases'] is option['aliases']
+    assert option['aliases'] is not other['aliases']
+
+    del record['description']
+    with pytest.raises(KeyError):
+        record['description']
+    record['other'] = 1
+    assert record['other'] == 1
+    assert list(record)[-1] == 'other'
+
+
+def test_elided_containers_can_be_changed():
+    record = compact_values(DOCS_SCHEMAS['module']['top'], normalized_record())
+    option = record['doc']['options']['data']['suboptions']['inner']
+    option['aliases'].append('nested')
+    option['choices'].extend([True, False])
+    state = record['doc']['options']['state']
+    state['deprecated'].setdefault('why', 'Old')
+    state['suboptions'].update({'sub': 1})
+
+    assert option['aliases'] == ['nested']
+    assert option['choices'] == [True, False]
+    assert state['deprecated'] == {'why': 'Old'}
+    assert state['suboptions'] == {'sub': 1}
+    assert pickle.loads(pickle.dumps(record))['doc']['options']['data']['suboptions'][
+        'inner']['aliases'] == ['nested']
+    # Other records still get their own containers
+    assert record['doc']['options']['data']['aliases'] == []
+
+
+def test_augment_compact_records():
+    record = normalized_record()
+    compact = compact_values(DOCS_SCHEMAS['module']['top'], copy.deepcopy(record))
+    augment_docs({'module': {'ns.col.thing': record}})
+    augment_docs({'module': {'ns.col.thing': compact}})
+
+    assert compact == record
+    assert compact['doc']['options']['data']['suboptions']['inner']['full_key'] == (
+        'data', 'inner')
+
+
+def test_render_compact_records():
+    env = doc_environment(('antsibull.data', 'docsite'))
+    template = env.get_template('plugin.rst.j2')
+
+    def render(record):
+        augment_docs({'module': {'ns.col.thing': record}})
+        return template.render(collection='ns.col', plugin_type='module',
+                               plugin_name='ns.col.thing', doc=record['doc'],
+                               examples=record['examples'], returndocs=record['return'],
+                               nonfatal_errors=[])
+
+    record = normalized_record()
+    compact = compact_values(DOCS_SCHEMAS['module']['top'], copy.deepcopy(record))
+    assert render(compact) == render(record)
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from antsibull.docs_parsing import discovery
+
+
+FILES = {
+    'ansible/modules/ping.py': 'DOCUMENTATION = "module: ping"',
+    'ansible/modules/_old.py': 'DOCUMENTATION = "module: old"',
+    'ansible/modules/removed.py': 'DOCUMENTATION = "module: removed"',
+    'ansible/modules/__init__.py': '',
+    'ansible/modules/README.md': '',
+    'ansible/modules/async_wrapper.py': '',
+    'ansible/plugins/cache/base.py': '',
+    'ansible/plugins/cache/memory.py': 'DOCUMENTATION = "cache: memory"',
+    'ansible/plugins/doc_fragments/files.py': '',
+    'ansible/config/ansible_builtin_runtime.yml': '''
+        plugin_routing:
+          modules:
+            removed:
+              tombstone: {removal_version: "2.10"}
+            gone_to_collection:
+              redirect: community.general.thing
+        ''',
+    'collections/ansible_collections/community/general/meta/runtime.yml': '''
+        plugin_routing:
+          modules:
+            old_thing:
+              redirect: community.general.thing
+          lookup:
+            deprecated:
+              deprecation: {removal_version: "3.0.0"}
+        ''',
+    'collections/ansible_collections/community/general/plugins/modules/thing.py': 'x = 1\n',
+    'collections/ansible_collections/community/general/plugins/modules/old_thing.py': '',
+    'collections/ansible_collections/community/general/plugins/lookup/deprecated.py': '',
+    'collections/ansible_collections/community/general/plugins/doc_fragments/auth.py': '',
+    'collections/ansible_collections/community/general/plugins/module_utils/helper.py': '',
+}
+
+
+@pytest.fixture
+def source_tree(write_tree):
+    tmp_path = write_tree(FILES)
+    # ansible-base implements aliases of deprecated names with symlinks.  Those are not
+    # documented but other symlinks are.
+    os.symlink('ping.py', tmp_path / 'ansible' / 'modules' / '_alias.py')
+    os.symlink('ping.py', tmp_path / 'ansible' / 'modules' / 'link.py')
+    return str(tmp_path / 'ansible'), str(tmp_path / 'collections')
+
+
+def test_discover_plugins(source_tree):
+    inventory = discovery.discover_plugins(*source_tree)
+
+    # async_wrapper and the base cache plugin are not listed by ansible-doc either
+    assert sorted(inventory.plugins['module']) == ['ansible.builtin.link', 'ansible.builtin.old',
+                                                   'ansible.builtin.ping',
+                                                   'community.general.thing']
+    assert list(inventory.plugins['cache']) == ['ansible.builtin.memory']
+    assert list(inventory.plugins['lookup']) == ['community.general.deprecated']
+    assert inventory.plugins['become'] == {}
+    assert inventory.redirects == {'module': {
+        'ansible.builtin.gone_to_collection': 'community.general.thing',
+        'community.general.old_thing': 'community.general.thing',
+    }}
+    assert sorted(inventory.doc_fragments) == ['ansible.builtin.files',
+                                               'community.general.auth', 'files']
+
+
+def test_plugin_file_inventory(source_tree):
+    inventory = discovery.discover_plugins(*source_tree)
+
+    thing = inventory.plugins['module']['community.general.thing']
+    stat_results = os.stat(thing.path)
+    assert thing.size == stat_results.st_size == 6
+    assert thing.mtime == stat_results.st_mtime
+    assert inventory.plugin_files()['module']['community.general.thing'] == thing.path
+
+
+def test_discover_plugins_invalid_runtime(source_tree):
+    runtime = os.path.join(source_tree[1], 'ansible_collections', 'community', 'general',
+                           'meta', 'runtime.yml')
+    with open(runtime, 'w') as f:
+        f.write('plugin_routing: [\n')
+
+    inventory = discovery.discover_plugins(*source_tree)
+    assert 'community.general.old_thing' in inventory.plugins['module']
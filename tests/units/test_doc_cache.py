@@ -0,0 +1,124 @@
+import os
+
+import pytest
+
+from antsibull.disk_cache import DiskCache
+from antsibull.docs_parsing import doc_cache
+
+
+FILES = {
+    'ansible/release.py': '__version__ = "2.10.1"\n',
+    'ansible/modules/ping.py': '''
+        DOCUMENTATION = """
+        module: ping
+        extends_documentation_fragment: files
+        """
+        ''',
+    'ansible/modules/copy.py': 'DOCUMENTATION = "module: copy"\n',
+    'ansible/plugins/doc_fragments/files.py': '''
+        class ModuleDocFragment(object):
+            DOCUMENTATION = "options: {}"
+        ''',
+    'ansible/plugins/lookup/dynamic.py': 'DOCUMENTATION = build_docs()\n',
+}
+
+
+@pytest.fixture
+def source_tree(write_tree):
+    tmp_path = write_tree(FILES)
+    (tmp_path / 'collections').mkdir()
+    return str(tmp_path / 'ansible'), str(tmp_path / 'collections')
+
+
+class FakeExtractor:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, plugin_files):
+        self.calls.append({plugin_type: sorted(plugins)
+                           for plugin_type, plugins in plugin_files.items()})
+        return {plugin_type: {fqcn: {'doc': {'name': fqcn}} for fqcn in plugins}
+                for plugin_type, plugins in plugin_files.items()}
+
+
+def test_disk_cache_prune(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=10)
+    for num, key in enumerate(('aa11', 'bb22', 'cc33')):
+        cache.set(key, b'12345')
+        os.utime(os.path.join(str(tmp_path), key[:2], key), (num, num))
+
+    # Reading an entry makes it the most recently used
+    assert cache.get('aa11') == b'12345'
+
+    assert cache.prune() == 1
+    assert cache.get('bb22') is None
+    assert cache.get('aa11') == b'12345'
+    assert cache.get('cc33') == b'12345'
+
+
+def test_disk_cache_prune_concurrently(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_size=0)
+    for key in ('aa11', 'bb22'):
+        cache.set(key, b'12345')
+
+    real_scandir = os.scandir
+
+    def scandir(path):
+        entries = list(real_scandir(path))
+        # Another process prunes the entries after we list them
+        if path != str(tmp_path):
+            for entry in entries:
+                os.unlink(entry.path)
+        return entries
+
+    monkeypatch.setattr(os, 'scandir', scandir)
+    assert cache.prune() == 0
+
+
+def test_plugin_doc_cache_restores_filename(tmp_path):
+    cache = doc_cache.PluginDocCache(str(tmp_path))
+    cache.set('aa11', {'doc': {'filename': '/old/ping.py'}})
+    assert cache.get('aa11') == {'doc': {'filename': '/old/ping.py'}}
+    assert cache.get('aa11', filename='/new/ping.py') == {'doc': {'filename': '/new/ping.py'}}
+
+
+@pytest.mark.asyncio
+async def test_get_cached_plugin_info(source_tree, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+
+    extract = FakeExtractor()
+    plugin_info = await doc_cache.get_cached_plugin_info(
+        cache_dir, *(await doc_cache.find_plugins_with_keys(*source_tree)), extract)
+    assert extract.calls == [{'module': ['ansible.builtin.copy', 'ansible.builtin.ping'],
+                              'lookup': ['ansible.builtin.dynamic']}]
+    assert plugin_info['module']['ansible.builtin.ping'] == {
+        'doc': {'name': 'ansible.builtin.ping'}}
+
+    # Only the plugin whose docs are computed at runtime has to be extracted again
+    extract = FakeExtractor()
+    plugin_info = await doc_cache.get_cached_plugin_info(
+        cache_dir, *(await doc_cache.find_plugins_with_keys(*source_tree)), extract)
+    assert extract.calls == [{'lookup': ['ansible.builtin.dynamic']}]
+    assert sorted(plugin_info['module']) == ['ansible.builtin.copy', 'ansible.builtin.ping']
+    # Cached records point to the file that the plugin is in now
+    assert plugin_info['module']['ansible.builtin.ping']['doc']['filename'] == os.path.join(
+        source_tree[0], 'modules', 'ping.py')
+
+    # Changing a doc fragment invalidates the plugins which use it
+    fragment = os.path.join(source_tree[0], 'plugins', 'doc_fragments', 'files.py')
+    with open(fragment, 'a') as f:
+        f.write('# changed\n')
+    extract = FakeExtractor()
+    await doc_cache.get_cached_plugin_info(
+        cache_dir, *(await doc_cache.find_plugins_with_keys(*source_tree)), extract)
+    assert extract.calls == [{'module': ['ansible.builtin.ping'],
+                              'lookup': ['ansible.builtin.dynamic']}]
+
+
+def test_cache_key_depends_on_ansible_base_version(source_tree):
+    filename = os.path.join(source_tree[0], 'modules', 'copy.py')
+    key = doc_cache.plugin_cache_key('module', 'ansible.builtin.copy', filename, {}, '2.10.1')
+    assert key == doc_cache.plugin_cache_key('module', 'ansible.builtin.copy', filename, {},
+                                             '2.10.1')
+    assert key != doc_cache.plugin_cache_key('module', 'ansible.builtin.copy', filename, {},
+                                             '2.10.2')
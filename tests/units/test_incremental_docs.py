@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+
+import pytest
+
+from antsibull import write_docs
+from antsibull.cli.doc_commands import stable
+from antsibull.docs_manifest import MANIFEST_FILENAME, DocsManifest
+
+
+MODULE = '''
+    DOCUMENTATION = """
+    module: {name}
+    short_description: The {name} module
+    description: Does {name}.
+    author: Nobody
+    """
+    EXAMPLES = ""
+    RETURN = ""
+    '''
+
+FILES = {
+    'ansible/release.py': '__version__ = "2.10.1"\n',
+    'ansible/modules/ping.py': MODULE.format(name='ping'),
+    'collections/ansible_collections/community/general/plugins/modules/thing.py':
+        MODULE.format(name='thing'),
+}
+
+
+@pytest.fixture
+def source_tree(write_tree):
+    tmp_path = write_tree(FILES)
+    return str(tmp_path / 'ansible'), str(tmp_path / 'collections')
+
+
+def build(source_tree, dest_dir):
+    args = argparse.Namespace(dest_dir=dest_dir, extraction_backend='static', doc_cache=None,
+                              normalization_cache=None, shared_memory=False, compact=True)
+    stable.build_docs_incrementally(None, source_tree[1], args, ansible_base_dir=source_tree[0])
+
+
+def test_build_docs_incrementally(source_tree, tmp_path, monkeypatch):
+    dest_dir = str(tmp_path / 'dest')
+    os.mkdir(dest_dir)
+    ping_page = os.path.join(dest_dir, 'collections', 'ansible', 'builtin', 'ping_module.rst')
+    thing_page = os.path.join(dest_dir, 'collections', 'community', 'general',
+                              'thing_module.rst')
+
+    build(source_tree, dest_dir)
+    assert os.path.isfile(ping_page)
+    assert os.path.isfile(thing_page)
+    with open(os.path.join(dest_dir, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+    assert manifest['plugins']['module']['ansible.builtin.ping']['file'] == os.path.join(
+        'collections', 'ansible', 'builtin', 'ping_module.rst')
+
+    # Nothing changed so nothing is extracted
+    extracted = []
+    real_extract = stable.extract_plugin_info
+
+    async def extract(*args, **kwargs):
+        extracted.append(args[4])
+        return await real_extract(*args, **kwargs)
+
+    monkeypatch.setattr(stable, 'extract_plugin_info', extract)
+    build(source_tree, dest_dir)
+    assert extracted == []
+
+    # A page that was modified by hand is rebuilt
+    with open(ping_page, 'a') as f:
+        f.write('garbage')
+    build(source_tree, dest_dir)
+    assert list(extracted[0]['module']) == ['ansible.builtin.ping']
+    with open(ping_page) as f:
+        assert 'garbage' not in f.read()
+
+    # The pages of removed plugins are removed
+    os.unlink(os.path.join(source_tree[1], 'ansible_collections', 'community', 'general',
+                           'plugins', 'modules', 'thing.py'))
+    build(source_tree, dest_dir)
+    assert not os.path.exists(thing_page)
+    assert not os.path.exists(os.path.dirname(os.path.dirname(thing_page)))
+    assert os.path.isfile(ping_page)
+
+
+def test_pages_are_rebuilt_when_the_renderer_changes(source_tree, tmp_path, monkeypatch):
+    dest_dir = str(tmp_path / 'dest')
+    os.mkdir(dest_dir)
+    build(source_tree, dest_dir)
+
+    extracted = []
+    real_extract = stable.extract_plugin_info
+
+    async def extract(*args, **kwargs):
+        extracted.append(args[4])
+        return await real_extract(*args, **kwargs)
+
+    monkeypatch.setattr(stable, 'extract_plugin_info', extract)
+    # Changing the schemas can change what the pages look like
+    monkeypatch.setattr(write_docs, 'schema_fingerprint', lambda: 'changed')
+    build(source_tree, dest_dir)
+    assert sorted(extracted[0]['module']) == ['ansible.builtin.ping', 'community.general.thing']
+
+
+def test_stale_files_outside_of_dest_dir_are_kept(write_tree):
+    tmp_path = write_tree({'docs/collections/old/gone.rst': '',
+                           'docs/collections/keep/index.rst': '',
+                           'outside.rst': ''})
+    dest_dir = tmp_path / 'docs'
+    (dest_dir / 'escape').symlink_to(tmp_path)
+    outside = tmp_path / 'outside.rst'
+
+    old_manifest = DocsManifest(str(dest_dir), index_files=[
+        'collections/old/gone.rst', 'collections/keep/index.rst', '../outside.rst',
+        str(outside), 'escape/outside.rst', 'collections/../../outside.rst'])
+    manifest = DocsManifest(str(dest_dir), index_files=['collections/keep/index.rst'])
+
+    assert manifest.remove_stale_files(old_manifest) == ['collections/old/gone.rst']
+    assert outside.exists()
+    assert not (dest_dir / 'collections' / 'old').exists()
+    assert (dest_dir / 'collections' / 'keep' / 'index.rst').exists()
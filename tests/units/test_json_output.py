@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from antsibull.docs_parsing import json_output
+from antsibull.vendored.json_utils import _filter_non_json_lines
+
+
+DOC = {'ping': {'doc': {'description': ['Ünïcödé', 'a } b'], 'version_added': 2.9,
+                        'options': {'data': {'default': None, 'elements': [1, 2.5, True]}}},
+                'examples': '- ping:\n', 'return': {}}}
+
+OUTPUTS = [
+    json.dumps(DOC),
+    'Using /etc/ansible/ansible.cfg as config file\n' + json.dumps(DOC, indent=4) + '\n',
+    'WARNING: something\n  ' + json.dumps(DOC) + '  \r\n\nTrailing junk } here\n',
+    'junk\n' + json.dumps([DOC, DOC]) + '\njunk ] here\n',
+    json.dumps(DOC, ensure_ascii=False),
+]
+
+
+def old_parse(data):
+    return json.loads(_filter_non_json_lines(data.decode('utf-8', errors='surrogateescape'))[0])
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def json_backend(request, monkeypatch):
+    if request.param == 'orjson':
+        if json_output.orjson is None:
+            pytest.skip('orjson is not installed')
+    else:
+        monkeypatch.setattr(json_output, 'orjson', None)
+
+
+@pytest.mark.parametrize('output', OUTPUTS)
+def test_parse_json_output_matches_filter(output, json_backend):
+    data = output.encode('utf-8')
+    assert json_output.parse_json_output(data) == old_parse(data)
+
+
+def test_parse_json_output_invalid_utf8(json_backend):
+    data = b'junk\n{"name": "caf\xe9", "big": 123456789012345678901234567890}\n'
+    assert json_output.parse_json_output(data) == old_parse(data)
+
+
+@pytest.mark.parametrize('output', [b'', b'no json here\n', b'{"unterminated": \n'])
+def test_parse_json_output_no_json(output):
+    with pytest.raises(ValueError):
+        json_output.parse_json_output(output)
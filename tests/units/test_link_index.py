@@ -0,0 +1,117 @@
+import copy
+
+import pytest
+
+from antsibull.augment_docs import augment_docs
+from antsibull.jinja2.environment import doc_environment
+from antsibull.jinja2.filters import html_ify, rst_ify
+from antsibull.link_index import LinkChecker, build_link_index
+from antsibull.schemas.docs import DOCS_SCHEMAS
+from antsibull.write_docs import write_rst
+
+
+def module_record(name, description, aliases=()):
+    return DOCS_SCHEMAS['module']['top'].parse_obj({
+        'doc': {
+            'module': name,
+            'short_description': f'The {name} module',
+            'description': description,
+            'author': ['Nobody'],
+            'aliases': list(aliases),
+            'options': {'data': {'description': 'Data.', 'type': 'dict',
+                                 'suboptions': {'inner': {'description': 'Inner.'}}}},
+        },
+        'examples': '',
+        'return': {'result': {'description': 'The result.', 'type': 'str'}},
+    }).dict(by_alias=True)
+
+
+PLUGIN_INFO = {
+    'module': {
+        'ansible.builtin.ping': module_record('ping', 'See M(copy) and M(missing).'),
+        'ansible.builtin.copy': module_record('copy', 'Copies.', aliases=['cp']),
+        'community.general.thing': module_record(
+            'thing', 'Like M(community.general.other) and M(ping).'),
+        'community.general.other': module_record('other', 'Other.'),
+    },
+}
+
+
+@pytest.fixture
+def link_index():
+    plugin_info = copy.deepcopy(PLUGIN_INFO)
+    augment_docs(plugin_info)
+    return build_link_index(plugin_info)
+
+
+def test_link_index(link_index):
+    assert link_index.has_label('ansible_collections.ansible.builtin.plugins.module.ping')
+    assert link_index.has_label('ansible_collections.community.general.plugins.module.thing')
+    assert link_index.has_label('ping_module')
+    assert link_index.has_label('cp_module')
+    assert link_index.has_label('plugins_in_community.general')
+    # Only ansible.builtin plugins have short name labels
+    assert not link_index.has_label('thing_module')
+    assert link_index.has_anchor('module', 'community.general.thing', 'parameter-data/inner')
+    assert link_index.has_anchor('module', 'community.general.thing', 'return-result')
+    assert not link_index.has_anchor('module', 'community.general.thing', 'parameter-inner')
+
+
+def test_filters_check_links(link_index):
+    checker = LinkChecker(link_index)
+    plugin = ('module', 'community.general.thing')
+
+    text = ('M(ping), M(community.general.other), M(other), R(Guide, playbooks_intro),'
+            ' R(Bad, ansible_collections.community.general.plugins.module.nothere),'
+            ' L(Data, #parameter-data/inner), L(Bad, #parameter-nothere),'
+            ' L(Site, https://docs.ansible.com)')
+    rst = rst_ify(text, checker, plugin)
+    assert rst.startswith(':ref:`ping <ping_module>`, :ref:`community.general.other'
+                          ' <ansible_collections.community.general.plugins.module.other>`,'
+                          ' :ref:`other <other_module>`')
+    # Checking the links does not change the output
+    assert rst_ify(text) == rst
+
+    # The same broken links are only reported once
+    assert html_ify(text, checker, plugin).startswith("<span class='module'>ping</span>")
+    assert html_ify(text) == html_ify(text, checker, plugin)
+    assert checker.broken_links == {'module': {'community.general.thing': [
+        'M(other): there is no page for a module named other',
+        'L(Bad, #parameter-nothere): there is no option or return value parameter-nothere on'
+        ' this page',
+        'R(Bad, ansible_collections.community.general.plugins.module.nothere): there is no'
+        ' label ansible_collections.community.general.plugins.module.nothere',
+    ]}}
+    assert checker.count() == 3
+    assert checker.report().startswith(
+        'module community.general.thing: M(other): there is no page for a module named other\n')
+
+
+@pytest.mark.asyncio
+async def test_write_rst_checks_links(tmp_path, link_index):
+    env = doc_environment(('antsibull.data', 'docsite'))
+    plugin_tmpl = env.get_template('plugin.rst.j2')
+    error_tmpl = env.get_template('plugin-error.rst.j2')
+    checker = LinkChecker(link_index)
+
+    plugin_info = copy.deepcopy(PLUGIN_INFO)
+    augment_docs(plugin_info)
+    for plugin_name in ('ansible.builtin.ping', 'community.general.thing'):
+        plugin_file, dummy_ = await write_rst(plugin_name, 'module',
+                                              plugin_info['module'][plugin_name], [],
+                                              plugin_tmpl, error_tmpl, str(tmp_path),
+                                              link_checker=checker)
+
+    with open(plugin_file) as f:
+        with_checker = f.read()
+    label = 'ansible_collections.community.general.plugins.module.other'
+    assert f':ref:`community.general.other <{label}>`' in with_checker
+    assert checker.broken_links == {'module': {'ansible.builtin.ping': [
+        'M(missing): there is no page for a module named missing']}}
+
+    # Without a link_checker, the links are not checked but the page is the same
+    plugin_file, dummy_ = await write_rst('community.general.thing', 'module',
+                                          plugin_info['module']['community.general.thing'], [],
+                                          plugin_tmpl, error_tmpl, str(tmp_path))
+    with open(plugin_file) as f:
+        assert f.read() == with_checker
@@ -0,0 +1,168 @@
+import os.path
+
+import pytest
+import sh
+
+from antsibull import lint_plugin_docs
+from antsibull.compat import asyncio_run
+
+
+FILES = {
+    'ansible/plugins/doc_fragments/files.py': '''
+        class ModuleDocFragment(object):
+            DOCUMENTATION = r"""
+            options:
+              mode:
+                description: Permissions.
+            """
+        ''',
+    'collection/galaxy.yml': '''
+        namespace: community
+        name: lint
+        version: 1.0.0
+        ''',
+    'collection/plugins/modules/good.py': '''
+        DOCUMENTATION = """
+        module: good
+        short_description: A good module
+        description: A good module.
+        author: Someone
+        extends_documentation_fragment: files
+        """
+        ''',
+    'collection/plugins/modules/bad.py': '''
+        # A module with broken docs
+
+        DOCUMENTATION = """
+        module: bad
+        short_description: A bad module
+        description: A bad module.
+        author: Someone
+        options:
+          state:
+            description: What to do.
+            choices: [present, absent]
+            default: present
+            unknown: true
+        """
+
+        RETURN = """
+        result:
+          description: The result.
+          contains: not a dict
+        """
+        ''',
+    'collection/plugins/modules/dynamic.py': '''
+        DOCUMENTATION = build_docs()
+        ''',
+}
+
+
+@pytest.fixture
+def collection_tree(write_tree):
+    tmp_path = write_tree(FILES)
+    return str(tmp_path / 'ansible'), str(tmp_path / 'collection')
+
+
+def lint_plugin_docs_run(collection_path, ansible_base_dir, cache_dir=None):
+    return asyncio_run(lint_plugin_docs.lint_collection_docs(
+        collection_path, ansible_base_dir, cache_dir=cache_dir, max_workers=1))
+
+
+def test_lint_collection_docs(collection_tree, monkeypatch):
+    ansible_base_dir, collection_path = collection_tree
+    documented = {}
+
+    async def get_ansible_plugin_info(venv, collection_dir, plugin_names=None):
+        documented.update(plugin_names)
+        return {'module': {'community.lint.dynamic': {
+            'doc': {'module': 'dynamic', 'short_description': 'Dynamic', 'author': 'Someone',
+                    'description': 'Built at runtime.', 'options': {'x': {'type': 'str'}}},
+            'examples': '', 'return': {}, 'metadata': None}}}
+
+    monkeypatch.setattr(lint_plugin_docs, 'get_ansible_plugin_info', get_ansible_plugin_info)
+    errors = lint_plugin_docs_run(collection_path, ansible_base_dir)
+
+    bad = os.path.join(collection_path, 'plugins', 'modules', 'bad.py')
+    dynamic = os.path.join(collection_path, 'plugins', 'modules', 'dynamic.py')
+    paths = {error[0] for error in errors}
+    assert paths == {bad, dynamic}
+
+    assert (bad, 4, 1, 'DOCUMENTATION.options.state.unknown: extra fields not permitted'
+            ) in errors
+    assert any(error[:3] == (bad, 17, 1) and error[3].startswith('RETURN.result.')
+               for error in errors)
+    # Only the plugin which cannot be read statically is documented with ansible-doc
+    assert documented == {'module': ['community.lint.dynamic']}
+    assert (dynamic, 2, 1, 'DOCUMENTATION.options.x.description: field required') in errors
+
+
+def test_lint_ansible_doc_errors(collection_tree, monkeypatch, capsys):
+    ansible_base_dir, collection_path = collection_tree
+    dynamic = os.path.join(collection_path, 'plugins', 'modules', 'dynamic.py')
+
+    async def failing_ansible_doc(venv, collection_dir, plugin_names=None):
+        return {'module': {'community.lint.dynamic': {'error': 'Timed out'}}}
+
+    monkeypatch.setattr(lint_plugin_docs, 'get_ansible_plugin_info', failing_ansible_doc)
+    errors = lint_plugin_docs_run(collection_path, ansible_base_dir)
+    assert (dynamic, 0, 0, 'Timed out') in errors
+
+    async def missing_ansible_doc(venv, collection_dir, plugin_names=None):
+        raise sh.CommandNotFound('ansible-doc')
+
+    # Plugins which could not be validated at all are reported but are not lint errors
+    monkeypatch.setattr(lint_plugin_docs, 'get_ansible_plugin_info', missing_ansible_doc)
+    errors = lint_plugin_docs_run(collection_path, ansible_base_dir)
+    assert {error[0] for error in errors} == {
+        os.path.join(collection_path, 'plugins', 'modules', 'bad.py')}
+    assert f'WARNING: {dynamic} was not validated' in capsys.readouterr().err
+
+
+def test_lint_cache(collection_tree, tmp_path, monkeypatch):
+    ansible_base_dir, collection_path = collection_tree
+    cache_dir = str(tmp_path / 'cache')
+    plugins = [('module', f'community.lint.{name}',
+                os.path.join(collection_path, 'plugins', 'modules', f'{name}.py'))
+               for name in ('good', 'bad', 'dynamic')]
+    fragment_index = {'files': os.path.join(ansible_base_dir, 'plugins', 'doc_fragments',
+                                            'files.py')}
+    errors = lint_plugin_docs._lint_plugin_batch(plugins, fragment_index, '2.10.0', cache_dir)
+    assert errors[0] == []
+    assert errors[1]
+    assert errors[2] is None
+
+    validated = []
+
+    def validate(plugin_type, filename, fragment_index):
+        validated.append(filename)
+        return []
+
+    monkeypatch.setattr(lint_plugin_docs, 'validate_plugin_docs', validate)
+    assert lint_plugin_docs._lint_plugin_batch(plugins, fragment_index, '2.10.0',
+                                               cache_dir) == [[], errors[1], []]
+    # The plugin which cannot be read statically cannot be cached
+    assert validated == [plugins[2][2]]
+
+    # Results are not used with a different version of ansible-base's fragments
+    lint_plugin_docs._lint_plugin_batch(plugins, fragment_index, '2.10.1', cache_dir)
+    assert len(validated) == 4
+
+
+def test_installed_collection_uses_other_fragments(write_tree):
+    tmp_path = write_tree({
+        'collections/ansible_collections/community/general/plugins/doc_fragments/auth.py':
+            'class ModuleDocFragment:\n    DOCUMENTATION = "options: {}"\n',
+        'collections/ansible_collections/community/lint/plugins/modules/thing.py': '''
+            DOCUMENTATION = """
+            module: thing
+            short_description: A thing
+            description: A thing.
+            author: Someone
+            extends_documentation_fragment: community.general.auth
+            """
+            ''',
+    })
+
+    collection_path = tmp_path / 'collections' / 'ansible_collections' / 'community' / 'lint'
+    assert lint_plugin_docs_run(str(collection_path), str(tmp_path / 'ansible')) == []
@@ -0,0 +1,77 @@
+import pytest
+
+from antsibull import normalization_cache as nc
+from antsibull.cli.doc_commands import stable
+
+
+def record(name, filename='/tmp/venv1/ping.py', **kwargs):
+    doc = {'name': name, 'short_description': f'The {name} module', 'description': 'Does it.',
+           'filename': filename}
+    doc.update(kwargs)
+    return {'doc': doc, 'examples': '', 'return': {}}
+
+
+PLUGINS = [
+    ('module', record('ping')),
+    ('module', record('bad', short_description=None)),
+    ('module', {'error': 'ansible-doc timed out'}),
+]
+
+
+def test_cache_key():
+    fingerprint = nc.schema_fingerprint()
+    key = nc.normalization_cache_key('module', record('ping'), fingerprint)
+    assert key == nc.normalization_cache_key('module', record('ping', '/tmp/venv2/ping.py'),
+                                             fingerprint)
+    assert key != nc.normalization_cache_key('lookup', record('ping'), fingerprint)
+    assert key != nc.normalization_cache_key('module', record('pong'), fingerprint)
+    assert key != nc.normalization_cache_key('module', record('ping'), 'other schemas')
+    assert nc.normalization_cache_key('module', {'error': 'timed out'}, fingerprint) is None
+    assert nc.normalization_cache_key('module', {'doc': object()}, fingerprint) is None
+
+
+def test_normalize_batch_uses_cache(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    fingerprint = nc.schema_fingerprint()
+    first = stable._normalize_plugin_batch(PLUGINS, cache_dir, fingerprint)
+
+    calls = []
+    real_normalize = stable.normalize_plugin_info
+
+    def normalize(plugin_type, plugin_record):
+        calls.append(plugin_record)
+        return real_normalize(plugin_type, plugin_record)
+
+    monkeypatch.setattr(stable, 'normalize_plugin_info', normalize)
+    moved = [('module', record('ping', '/tmp/venv2/ping.py'))] + PLUGINS[1:]
+    second = stable._normalize_plugin_batch(moved, cache_dir, fingerprint)
+
+    # Only the record whose docs could not be extracted is normalized again
+    assert calls == [PLUGINS[2][1]]
+    assert second[0][0]['doc']['filename'] == '/tmp/venv2/ping.py'
+    second[0][0]['doc']['filename'] = '/tmp/venv1/ping.py'
+    assert second[0] == first[0]
+    assert isinstance(second[1], ValueError)
+    assert str(second[1]) == str(first[1])
+    assert str(second[2]) == str(first[2]) == 'ansible-doc timed out'
+
+
+@pytest.mark.asyncio
+async def test_normalize_all_plugin_info_with_cache(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    plugin_info = {'module': {f'ns.col.{i}': plugin_record for i, (dummy_, plugin_record)
+                             in enumerate(PLUGINS)}}
+
+    expected = await stable.normalize_all_plugin_info(plugin_info)
+    assert await stable.normalize_all_plugin_info(plugin_info, cache_dir=cache_dir) == expected
+    assert await stable.normalize_all_plugin_info(plugin_info, cache_dir=cache_dir) == expected
+
+
+def test_corrupted_entry(tmp_path):
+    cache = nc.NormalizationCache(str(tmp_path))
+    cache.set('ab' * 32, {'doc': {}}, ['warning'])
+    assert cache.get('ab' * 32) == ({'doc': {}}, ['warning'])
+
+    with open(tmp_path / 'ab' / ('ab' * 32), 'wb') as f:
+        f.write(b'garbage')
+    assert cache.get('ab' * 32) is None
@@ -0,0 +1,123 @@
+import pytest
+
+from antsibull.cli.doc_commands import stable
+from antsibull.shared_records import HAS_SHARED_MEMORY, LazyRecordMap
+
+
+def plugin_record(name, description='Does something.'):
+    return {
+        'doc': {'name': name, 'short_description': f'The {name} module',
+                'description': description, 'author': 'Nobody'},
+        'examples': '',
+        'return': {},
+    }
+
+
+PLUGIN_INFO = {
+    'module': {
+        'ansible.builtin.ping': plugin_record('ping'),
+        'ansible.builtin.big': plugin_record('big', 'x' * 10000),
+        'community.general.nodoc': {'examples': '', 'return': {}},
+        'community.general.timeout': {'error': 'ansible-doc timed out'},
+        'community.general.badreturn': dict(plugin_record('badreturn'), **{'return': 'bad'}),
+    },
+    'lookup': {
+        'community.general.thing': plugin_record('thing'),
+    },
+}
+
+
+def test_chunk_plugin_records():
+    chunks = stable._chunk_plugin_records(PLUGIN_INFO, 1000)
+    names = [[name for dummy_, name, dummy2_ in chunk] for chunk in chunks]
+    assert names == [['ansible.builtin.ping'], ['ansible.builtin.big'],
+                     ['community.general.nodoc', 'community.general.timeout',
+                      'community.general.badreturn', 'community.general.thing']]
+
+    chunks = stable._chunk_plugin_records(PLUGIN_INFO, 10 ** 6)
+    assert len(chunks) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('chunk_size', [1, 1000, 10 ** 6])
+async def test_normalize_all_plugin_info(chunk_size):
+    plugin_info, errors = await stable.normalize_all_plugin_info(PLUGIN_INFO,
+                                                                 chunk_size=chunk_size)
+
+    assert sorted(plugin_info['module']) == ['ansible.builtin.big', 'ansible.builtin.ping',
+                                             'community.general.badreturn']
+    assert plugin_info['module']['ansible.builtin.ping']['doc']['description'] == [
+        'Does something.']
+    assert plugin_info['lookup']['community.general.thing']['doc']['name'] == 'thing'
+    assert plugin_info['module']['community.general.badreturn']['return'] == {}
+
+    assert sorted(errors['module']) == ['community.general.badreturn',
+                                        'community.general.nodoc', 'community.general.timeout']
+    assert errors['module']['community.general.timeout'] == ['ansible-doc timed out']
+    assert errors['module']['community.general.nodoc'] == ["'doc'"]
+    assert errors['module']['community.general.badreturn'][0].startswith(
+        'Unable to normalize badreturn: return due to:')
+
+
+def test_normalize_documented_plugins():
+    plugin_docs = {'ansible.builtin.ping': plugin_record('ping'),
+                   'community.general.nodoc': PLUGIN_INFO['module']['community.general.nodoc']}
+    plugin_docs['ansible.builtin.ping']['doc']['options'] = {
+        'data': {'description': 'Data', 'suboptions': {'inner': {'description': 'Inner'}}}}
+    processed = stable._normalize_documented_plugins('module', plugin_docs)
+
+    ping = processed['ansible.builtin.ping']
+    assert ping['errors'] == []
+    # The records are augmented by the worker
+    assert ping['normalized']['doc']['options']['data']['suboptions']['inner']['full_key'] == (
+        'data', 'inner')
+    assert processed['community.general.nodoc'] == {'normalized': None, 'errors': ["'doc'"]}
+
+
+@pytest.mark.asyncio
+async def test_extract_normalized_plugin_info(monkeypatch):
+    async def fake_plugin_info(venv, collection_dir, plugin_names=None, postprocess=None):
+        assert plugin_names == {'module': ['ping', 'community.general.nodoc']}
+        results = {'module': postprocess('module', {
+            'ansible.builtin.ping': plugin_record('ping'),
+            'community.general.nodoc': {'examples': '', 'return': {}},
+        })}
+        results['module']['community.general.hangs'] = {'error': 'ansible-doc timed out'}
+        return results
+
+    monkeypatch.setattr(stable, 'get_ansible_plugin_info', fake_plugin_info)
+    plugin_files = {'module': {'ansible.builtin.ping': 'ping.py',
+                               'community.general.nodoc': 'nodoc.py'}}
+    plugin_info, errors = await stable.extract_normalized_plugin_info(None, 'collections',
+                                                                      plugin_files=plugin_files)
+
+    assert list(plugin_info['module']) == ['ansible.builtin.ping']
+    assert plugin_info['module']['ansible.builtin.ping']['doc']['author'] == ['Nobody']
+    assert errors == {'module': {'community.general.nodoc': ["'doc'"],
+                                 'community.general.hangs': ['ansible-doc timed out']}}
+
+
+@pytest.mark.skipif(not HAS_SHARED_MEMORY, reason='Needs shared memory')
+@pytest.mark.asyncio
+async def test_normalize_all_plugin_info_shared_memory():
+    plugin_info = {'module': {'ansible.builtin.ping': plugin_record('ping'),
+                              'community.general.nodoc': {'examples': '', 'return': {}}}}
+    plugin_info['module']['ansible.builtin.ping']['doc']['options'] = {
+        'data': {'description': 'Data'}}
+    new_info, errors = await stable.normalize_all_plugin_info(plugin_info, shared_memory=True,
+                                                              compact=True)
+
+    assert isinstance(new_info['module'], LazyRecordMap)
+    assert list(new_info['module']) == ['ansible.builtin.ping']
+    # The workers augment the records before sharing them
+    ping = new_info['module']['ansible.builtin.ping']
+    # Records in shared memory are serialized dicts rather than compact records
+    assert type(ping) is dict
+    assert ping['doc']['options']['data']['full_key'] == ('data', )
+    assert errors == {'module': {'community.general.nodoc': ["'doc'"]}}
+
+
+def test_uses_compact_records():
+    assert stable._uses_compact_records(shared_memory=False, compact=True)
+    assert not stable._uses_compact_records(shared_memory=False, compact=False)
+    assert not stable._uses_compact_records(shared_memory=True, compact=True)
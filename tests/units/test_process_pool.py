@@ -0,0 +1,29 @@
+import sys
+
+from antsibull import process_pool
+
+
+def loaded_modules():
+    return sorted(m for m in process_pool.PRELOAD_MODULES if m in sys.modules)
+
+
+def test_shared_pool_is_reused():
+    try:
+        pool = process_pool.get_process_pool()
+        with process_pool.process_pool() as executor:
+            assert executor is pool
+        assert process_pool.get_process_pool() is pool
+
+        # Workers have the schemas loaded before running any tasks
+        assert pool.submit(loaded_modules).result() == sorted(process_pool.PRELOAD_MODULES)
+    finally:
+        process_pool.shutdown_process_pool()
+
+    assert process_pool.get_process_pool() is not pool
+    process_pool.shutdown_process_pool()
+
+
+def test_separate_pool():
+    with process_pool.process_pool(max_workers=1) as executor:
+        assert executor is not process_pool._POOL
+        assert executor.submit(loaded_modules).result() == sorted(process_pool.PRELOAD_MODULES)
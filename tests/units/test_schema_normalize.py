@@ -0,0 +1,236 @@
+import glob
+import json
+import os.path
+
+import pydantic as p
+import pytest
+
+from antsibull.schemas import ansible_doc as ad
+from antsibull.schemas.docs import DOCS_SCHEMAS
+from antsibull.schemas.normalize import compile_model, normalize
+
+
+GOOD_DATA = os.path.join(os.path.dirname(__file__), '..', 'functional', 'schema', 'good_data')
+
+
+def pydantic_normalize(model, data):
+    return model.parse_obj(data).dict(by_alias=True)
+
+
+def assert_same_result(model, data):
+    """Both paths return identical data (including types and order) or the same error."""
+    try:
+        expected = pydantic_normalize(model, data)
+    except p.ValidationError as e:
+        with pytest.raises(p.ValidationError) as exc_info:
+            normalize(model, data)
+        assert str(exc_info.value) == str(e)
+        return
+
+    assert repr(normalize(model, data)) == repr(expected)
+
+
+def good_records():
+    for filename in sorted(glob.glob(os.path.join(GOOD_DATA, 'one_*.json'))):
+        if filename.endswith('_results.json'):
+            continue
+        plugin_type = os.path.basename(filename)[len('one_'):-len('.json')]
+        with open(filename) as f:
+            plugins = json.load(f)
+        for plugin_name, record in plugins.items():
+            for field in ('doc', 'examples', 'metadata', 'return'):
+                if field in record:
+                    yield pytest.param(plugin_type, field, {field: record[field]},
+                                       id=f'{plugin_type}-{plugin_name}-{field}')
+
+
+@pytest.mark.parametrize('plugin_type, field, data', list(good_records()))
+def test_good_data_uses_fast_path(plugin_type, field, data):
+    model = DOCS_SCHEMAS[plugin_type][field]
+    normalizer = compile_model(model)
+    # Well formed docs never need pydantic
+    assert repr(normalizer(data)) == repr(pydantic_normalize(model, data))
+
+
+def test_all_docs_schemas_compile():
+    for schemas in DOCS_SCHEMAS.values():
+        for model in schemas.values():
+            assert compile_model(model) is not None
+
+
+def test_custom_root_schema_uses_pydantic():
+    assert compile_model(ad.ModulePluginSchema) is None
+    with open(os.path.join(GOOD_DATA, 'one_module.json')) as f:
+        data = json.load(f)
+    assert normalize(ad.ModulePluginSchema, data) == pydantic_normalize(ad.ModulePluginSchema,
+                                                                        data)
+
+
+def module_doc(**kwargs):
+    doc = {'module': 'test', 'short_description': 'Test module', 'description': 'Testing.'}
+    doc.update(kwargs)
+    return {'doc': doc}
+
+
+def option(**kwargs):
+    opt = {'description': 'An option.'}
+    opt.update(kwargs)
+    return module_doc(options={'opt': opt})
+
+
+DOC_CASES = [
+    module_doc(),
+    module_doc(name='test', module=None),
+    module_doc(name='other'),
+    module_doc(version_added=2.9),
+    module_doc(version_added=2),
+    module_doc(version_added=True),
+    module_doc(version_added=None),
+    module_doc(version_added=['2.9']),
+    module_doc(author='Someone'),
+    module_doc(authors=['A', 'B']),
+    module_doc(authors=['A'], author='B'),
+    module_doc(note='A note'),
+    module_doc(notes=None),
+    module_doc(aliases='alias'),
+    module_doc(aliases=('a', 'b')),
+    module_doc(aliases={'a'}),
+    module_doc(plugin_type='module'),
+    module_doc(requirements=[1, 2.5]),
+    module_doc(requirements=[b'bytes']),
+    module_doc(description=None),
+    module_doc(description=['One', 'Two']),
+    module_doc(description={'not': 'a list'}),
+    module_doc(short_description=None),
+    module_doc(unknown_field='extra'),
+    module_doc(deprecated={'removed_in': '2.14', 'why': 'Old'}),
+    module_doc(deprecated={'version': '2.14', 'why': 'Old', 'alternatives': 'new'}),
+    module_doc(deprecated={'version': '2.14', 'removed_in': '2.14', 'why': 'Old'}),
+    module_doc(deprecated={'removed_in': 'never', 'why': 'Old'}),
+    module_doc(deprecated={}),
+    module_doc(deprecated=[('removed_in', '2.14'), ('why', 'Old')]),
+    module_doc(seealso=[{'module': 'ping'}, {'module': 'copy', 'description': 'Copy'}]),
+    module_doc(seealso=[{'ref': 'label', 'description': 'A ref'}]),
+    module_doc(seealso=[{'link': 'https://example.com', 'name': 'Ex', 'description': 'Link'}]),
+    module_doc(seealso=[{'ref': 'label'}]),
+    module_doc(seealso=[{'module': 'ping', 'ref': 'label', 'description': 'Both'}]),
+    module_doc(seealso='ping'),
+    option(),
+    option(name='opt'),
+    option(description=None),
+    option(required='yes'),
+    option(required='No'),
+    option(required=1),
+    option(required=1.0),
+    option(required='maybe'),
+    option(required=None),
+    option(type='integer'),
+    option(type='boolean', elements='strings'),
+    option(type='bogus'),
+    option(type=None),
+    option(element_type='str'),
+    option(element='dict', elements='dict'),
+    option(choices=[1, None, True, 'a', 2.5]),
+    option(choices='only'),
+    option(choices=[['nested']]),
+    option(aliases=5),
+    option(default=None),
+    option(default=5),
+    option(default=2.5),
+    option(default=True),
+    option(default='5'),
+    option(default=' 7 '),
+    option(default='2.5'),
+    option(default='nan'),
+    option(default='text'),
+    option(default=[1, 'a', None, {'b': 2}]),
+    option(default=('tuple',)),
+    option(default={'a': [1, 2], 'b': None}),
+    option(default={1: 'int key'}),
+    option(default=object()),
+    option(suboptions={'sub': {'description': 'A sub option.', 'type': 'dict',
+                               'suboptions': {'deep': {'description': 'Deep.'}}}}),
+    option(suboptions={'sub': {'type': 'str'}}),
+    option(env=[{'name': 'ANSIBLE_OPT'}], ini=[{'key': 'opt', 'section': 'defaults'}],
+           vars=[{'name': 'ansible_opt', 'version_added': 2.10}]),
+    option(env=[{'name': 'lowercase'}]),
+    option(ini=[{'key': 'opt'}]),
+    module_doc(options={1: {'description': 'Integer name.'}}),
+    module_doc(options=[]),
+    module_doc(options=None),
+    {'doc': None},
+    {'doc': 'not a dict'},
+    {'doc': {1: 'int key'}},
+    {},
+]
+
+
+@pytest.mark.parametrize('plugin_type', ['module', 'lookup', 'callback', 'inventory'])
+@pytest.mark.parametrize('data', DOC_CASES)
+def test_doc_equivalence(plugin_type, data):
+    if plugin_type != 'module' and 'doc' in data and isinstance(data['doc'], dict):
+        data = {'doc': dict(data['doc'])}
+        data['doc'][plugin_type] = data['doc'].pop('module', None)
+        if plugin_type == 'callback':
+            data['doc']['callback_type'] = 'stdout'
+    assert_same_result(DOCS_SCHEMAS[plugin_type]['doc'], data)
+
+
+RETURN_CASES = [
+    None,
+    {},
+    {'changed': {'description': 'Whether it changed.', 'returned': 'always', 'type': 'bool'}},
+    {'data': {'description': 'Data.', 'sample': True}},
+    {'data': {'description': 'Data.', 'sample': 5.5, 'type': 'float'}},
+    {'data': {'description': 'Data.', 'sample': '10'}},
+    {'data': {'description': 'Data.', 'sample': ['a', 1]}},
+    {'data': {'description': 'Data.', 'sample': {'a': 1}}},
+    {'data': {'description': 'Data.', 'example': 'x'}},
+    {'data': {'description': 'Data.', 'example': 'x', 'sample': 'y'}},
+    {'data': {'description': 'Data.', 'type': 'dictionary', 'elements': 'integer'}},
+    {'data': {'description': 'Data.', 'type': 'raw'}},
+    {'data': {'description': 'Data.', 'type': 'complex',
+              'contains': {'inner': {'type': 'list',
+                                     'contains': {'deeper': {'description': 'x'}}}}}},
+    {'data': {'description': 'Data.', 'choices': [1, 'a']}},
+    {'data': {'type': 'str'}},
+    {'data': {'description': 'Data.', 'unknown': True}},
+    'data:\n  description: From YAML.\n',
+    'not: [valid',
+    'just a string',
+    ['a', 'list'],
+]
+
+
+@pytest.mark.parametrize('data', RETURN_CASES)
+def test_return_equivalence(data):
+    assert_same_result(DOCS_SCHEMAS['module']['return'], {'return': data})
+
+
+@pytest.mark.parametrize('data', [None, '', '- ping:\n', 5, ['list']])
+def test_examples_equivalence(data):
+    assert_same_result(DOCS_SCHEMAS['module']['examples'], {'examples': data})
+
+
+@pytest.mark.parametrize('data', [None, {}, {'status': ['preview'], 'supported_by': 'core'},
+                                  {1: 'int key'}, 'string'])
+def test_metadata_equivalence(data):
+    assert_same_result(DOCS_SCHEMAS['module']['metadata'], {'metadata': data})
+
+
+def test_defaults_are_not_shared():
+    model = DOCS_SCHEMAS['module']['doc']
+    first = normalize(model, module_doc())
+    first['doc']['author'].append('Changed')
+    first['doc']['deprecated']['changed'] = True
+    second = normalize(model, module_doc())
+    assert second['doc']['author'] == []
+    assert second['doc']['deprecated'] == {}
+
+
+def test_input_is_not_modified():
+    data = module_doc(authors=['A'], options={'opt': {'description': 'x', 'name': 'opt',
+                                                      'element_type': 'str'}})
+    original = json.dumps(data, sort_keys=True)
+    normalize(DOCS_SCHEMAS['module']['doc'], data)
+    assert json.dumps(data, sort_keys=True) == original
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+from antsibull.schemas import docs
+from antsibull.schemas.module import ModuleSchema
+from antsibull.schemas.plugin import PluginReturnSchema, PluginSchema
+
+
+def test_registry_lookup():
+    assert docs.DOCS_SCHEMAS['module']['top'] is ModuleSchema
+    assert docs.DOCS_SCHEMAS['module']['return'] is PluginReturnSchema
+    assert docs.DOCS_SCHEMAS['lookup']['top'] is PluginSchema
+    assert docs.DOCS_SCHEMAS['lookup'] is docs.DOCS_SCHEMAS['shell']
+    assert 'callback' in docs.DOCS_SCHEMAS
+    assert 'nonexistent' not in docs.DOCS_SCHEMAS
+    assert len(docs.DOCS_SCHEMAS) == len(list(docs.DOCS_SCHEMAS))
+    assert docs.ModuleSchema is ModuleSchema
+    assert docs.VarsSchema is PluginSchema
+
+
+def test_schemas_are_loaded_on_first_use():
+    code = '''
+import sys
+from antsibull.schemas.docs import DOCS_SCHEMAS
+loaded = lambda: sorted(m for m in sys.modules if m.startswith('antsibull.schemas.'))
+print(loaded())
+DOCS_SCHEMAS['module']
+print(loaded())
+'''
+    output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout.splitlines()
+    assert output[0] == "['antsibull.schemas.docs']"
+    assert 'antsibull.schemas.module' in output[1]
+    assert 'antsibull.schemas.callback' not in output[1]
@@ -0,0 +1,45 @@
+import pickle
+
+import pytest
+
+from antsibull import shared_records as sr
+
+
+pytestmark = pytest.mark.skipif(not sr.HAS_SHARED_MEMORY, reason='Needs shared memory')
+
+
+def test_share_records():
+    records = [{'doc': {'name': 'ping', 'options': {}}}, {'doc': {'name': 'copy'}}, object()]
+    shared = sr.share_records(records)
+
+    assert isinstance(shared[0], sr.SharedRecord)
+    assert shared[0].segment is shared[1].segment
+    # Records that marshal cannot serialize are passed through
+    assert shared[2] is records[2]
+
+    # This is what happens when the references are returned from a worker
+    received = pickle.loads(pickle.dumps(shared))
+    assert received[0].segment is received[1].segment
+    assert [sr.load_record(record) for record in received[:2]] == records[:2]
+
+    # The segment was unlinked when it was received so it cannot be received again
+    with pytest.raises(FileNotFoundError):
+        pickle.loads(pickle.dumps(shared))
+
+
+def test_share_no_records():
+    assert sr.share_records([]) == []
+
+
+def test_lazy_record_map():
+    received = pickle.loads(pickle.dumps(sr.share_records([{'name': 'ping'}])))
+    records = sr.LazyRecordMap()
+    records['ansible.builtin.ping'] = received[0]
+    records['ansible.builtin.copy'] = {'name': 'copy'}
+
+    assert len(records) == 2
+    assert dict(records) == {'ansible.builtin.ping': {'name': 'ping'},
+                             'ansible.builtin.copy': {'name': 'copy'}}
+    # Each lookup deserializes a new copy
+    records['ansible.builtin.ping']['name'] = 'changed'
+    assert records['ansible.builtin.ping'] == {'name': 'ping'}
@@ -0,0 +1,124 @@
+import pytest
+
+from antsibull.docs_parsing import discovery, static
+
+
+FILES = {
+    'ansible/modules/ping.py': '''
+        DOCUMENTATION = r"""
+        module: ping
+        short_description: Try to connect to host
+        description: Try to connect to host.
+        version_added: 2020-01-01
+        options:
+          data:
+            description: Data to return.
+            default: pong
+        extends_documentation_fragment:
+          - files
+          - community.general.auth.extra
+        notes: [Own note]
+        """
+        EXAMPLES = """
+        - ping:
+        """
+        RETURN = """
+        ping:
+          description: Value provided with the data parameter.
+          returned: success
+          type: str
+        """
+        ANSIBLE_METADATA = {'status': ['stableinterface'], 'supported_by': 'core'}
+        ''',
+    'ansible/modules/_old.py': 'DOCUMENTATION = "module: old"',
+    'ansible/modules/__init__.py': '',
+    'ansible/plugins/doc_fragments/files.py': '''
+        class ModuleDocFragment(object):
+            DOCUMENTATION = r"""
+            options:
+              mode:
+                description: Permissions.
+              data:
+                description: Overridden by the module.
+            notes: [Fragment note]
+            """
+        ''',
+    'ansible/plugins/lookup/dynamic.py': '''
+        DOCUMENTATION = build_docs()
+        ''',
+    'collections/ansible_collections/community/general/plugins/doc_fragments/auth.py': '''
+        class ModuleDocFragment:
+            DOCUMENTATION = "options: {}"
+            EXTRA = """
+            options:
+              token:
+                description: Auth token.
+            requirements: [b, a]
+            """
+        ''',
+    'collections/ansible_collections/community/general/plugins/modules/thing.py': '''
+        DOCUMENTATION = """
+        module: thing
+        short_description: A thing
+        description: A thing.
+        requirements: [a, c]
+        extends_documentation_fragment: community.general.auth.extra
+        """
+        ''',
+}
+
+
+@pytest.fixture
+def source_tree(write_tree):
+    tmp_path = write_tree(FILES)
+    return str(tmp_path / 'ansible'), str(tmp_path / 'collections')
+
+
+def test_find_plugin_files(source_tree):
+    plugin_files = discovery.find_plugin_files(*source_tree)
+    assert sorted(plugin_files['module']) == ['ansible.builtin.old', 'ansible.builtin.ping',
+                                              'community.general.thing']
+    assert list(plugin_files['lookup']) == ['ansible.builtin.dynamic']
+    assert plugin_files['become'] == {}
+
+
+def test_get_static_plugin_doc(source_tree):
+    plugin_files = discovery.find_plugin_files(*source_tree)
+    fragments = discovery.find_doc_fragments(*source_tree)
+    filename = plugin_files['module']['ansible.builtin.ping']
+
+    record = static.get_static_plugin_doc('module', filename, fragments)
+
+    doc = record['doc']
+    assert doc['filename'] == filename
+    assert doc['version_added'] == '2020-01-01'
+    assert 'extends_documentation_fragment' not in doc
+    assert doc['notes'] == ['Own note', 'Fragment note']
+    assert doc['options']['data'] == {'description': 'Data to return.', 'default': 'pong'}
+    assert sorted(doc['options']) == ['data', 'mode', 'token']
+    assert doc['requirements'] == ['b', 'a']
+    assert record['examples'] == '\n- ping:\n'
+    assert record['return']['ping']['type'] == 'str'
+    assert record['metadata'] == {'status': ['stableinterface'], 'supported_by': 'core'}
+
+
+def test_merge_lists_from_fragment(source_tree):
+    plugin_files = discovery.find_plugin_files(*source_tree)
+    fragments = discovery.find_doc_fragments(*source_tree)
+    filename = plugin_files['module']['community.general.thing']
+
+    record = static.get_static_plugin_doc('module', filename, fragments)
+    assert record['doc']['requirements'] == ['a', 'b', 'c']
+    assert record['examples'] is None
+    assert record['return'] is None
+
+
+@pytest.mark.asyncio
+async def test_get_static_plugin_info(source_tree):
+    plugin_info, unhandled = await static.get_static_plugin_info(*source_tree, max_workers=2)
+
+    assert sorted(plugin_info['module']) == ['ansible.builtin.old', 'ansible.builtin.ping',
+                                             'community.general.thing']
+    assert plugin_info['lookup'] == {}
+    assert list(unhandled) == ['lookup']
+    assert 'is not a literal' in unhandled['lookup']['ansible.builtin.dynamic']
@@ -0,0 +1,81 @@
+import os
+import pkgutil
+
+import pytest
+from jinja2 import Template
+from packaging.version import Version
+
+from antsibull.jinja2.environment import (ContentHashBytecodeCache, doc_environment,
+                                          get_data_template, get_doc_environment,
+                                          template_cache_dir)
+
+
+def cached_files(directory):
+    return sorted(name for dummy_, dummy2_, files in os.walk(directory) for name in files)
+
+
+def test_bytecode_cache(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    env = doc_environment(('antsibull.data', 'docsite'),
+                          bytecode_cache=ContentHashBytecodeCache(cache_dir))
+    expected = env.get_template('list_of_collections.rst.j2').render(collections=['ns.col'])
+    assert len(cached_files(cache_dir)) == 1
+
+    # Another process would load the compiled template instead of compiling it
+    env = doc_environment(('antsibull.data', 'docsite'),
+                          bytecode_cache=ContentHashBytecodeCache(cache_dir))
+
+    def no_compile(*args, **kwargs):
+        raise AssertionError('The template was compiled again')
+
+    monkeypatch.setattr(env, 'compile', no_compile)
+    template = env.get_template('list_of_collections.rst.j2')
+    assert template.render(collections=['ns.col']) == expected
+
+    # Templates compile to different code with other settings so they get their own entries
+    data_template_dir = os.path.dirname(pkgutil.get_loader('antsibull.data').path)
+    env = doc_environment(data_template_dir, bytecode_cache=ContentHashBytecodeCache(cache_dir))
+    env.variable_start_string = '{{'
+    env.get_template('docsite/list_of_collections.rst.j2')
+    assert len(cached_files(cache_dir)) == 2
+
+
+def test_bytecode_cache_prunes_once(tmp_path, monkeypatch):
+    pruned = []
+    cache = ContentHashBytecodeCache(str(tmp_path))
+    monkeypatch.setattr(cache._cache, 'prune', lambda: pruned.append(True))
+    env = doc_environment(('antsibull.data', 'docsite'), bytecode_cache=cache)
+    env.get_template('list_of_collections.rst.j2')
+    env.get_template('plugin.rst.j2')
+
+    assert len(cached_files(str(tmp_path))) == 2
+    assert pruned == [True]
+
+
+def test_template_cache_dir(monkeypatch):
+    monkeypatch.setenv('ANTSIBULL_TEMPLATE_CACHE', '/srv/cache')
+    assert template_cache_dir() == '/srv/cache'
+    monkeypatch.setenv('ANTSIBULL_TEMPLATE_CACHE', '')
+    assert template_cache_dir() is None
+    monkeypatch.delenv('ANTSIBULL_TEMPLATE_CACHE')
+    monkeypatch.setenv('XDG_CACHE_HOME', '/srv/xdg')
+    assert template_cache_dir() == '/srv/xdg/antsibull/templates'
+
+
+def test_shared_doc_environment():
+    assert get_doc_environment() is get_doc_environment(('antsibull.data', 'docsite'))
+    assert get_doc_environment().get_template('plugin.rst.j2') is (
+        get_doc_environment().get_template('plugin.rst.j2'))
+
+
+@pytest.mark.parametrize('name', ['acd-setup_py.j2', 'collection-readme.j2',
+                                  'collection-setup_py.j2', 'debian/changelog.j2',
+                                  'galaxy_yml.j2'])
+def test_data_templates(name):
+    variables = {'version': Version('2.10.0'), 'ansible_base_version': Version('2.10.1'),
+                 'collection_deps': '', 'name': 'ns.col', 'collection_name': 'ns.col',
+                 'dependencies': '{}', 'date': 'Thu, 01 Oct 2020 00:00:00 +0000'}
+    source = pkgutil.get_data('antsibull.data', name).decode('utf-8')
+
+    # Rendered the same as by jinja2.Template()
+    assert get_data_template(name).render(**variables) == Template(source).render(**variables)
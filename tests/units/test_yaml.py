@@ -0,0 +1,48 @@
+import datetime
+
+import pytest
+import yaml
+
+from antsibull.yaml import load_yaml, load_yaml_file
+
+
+DOCUMENT = '''
+module: ping
+version_added: 2020-01-01
+options:
+  data:
+    description: Data to return.
+    default: pong
+    aliases: [d]
+'''
+
+
+def test_load_yaml_matches_safe_load():
+    assert load_yaml(DOCUMENT) == yaml.safe_load(DOCUMENT)
+    assert load_yaml('a: {b: [1, 2.5, null, true]}') == {'a': {'b': [1, 2.5, None, True]}}
+
+
+@pytest.mark.parametrize('document', [DOCUMENT, 'a: {b: [1, 2]}'])
+def test_load_yaml_returns_copies(document):
+    first = load_yaml(document)
+    first['extra'] = True
+    second = load_yaml(document)
+    assert 'extra' not in second
+    assert second == yaml.safe_load(document)
+
+
+def test_load_yaml_dates():
+    assert load_yaml(DOCUMENT)['version_added'] == datetime.date(2020, 1, 1)
+
+
+def test_load_yaml_errors(tmp_path):
+    with pytest.raises(yaml.YAMLError):
+        load_yaml('a: [')
+
+    path = tmp_path / 'runtime.yml'
+    path.write_text('a: [')
+    with pytest.raises(yaml.YAMLError):
+        load_yaml_file(str(path))
+
+    path.write_text(DOCUMENT)
+    assert load_yaml_file(str(path)) == yaml.safe_load(DOCUMENT)